@@ -0,0 +1,9 @@
+"""
+Benchmarks for Map Machine.
+
+Run a benchmark from the project root, e.g.
+`python -m benchmark.osm_reader_memory`.
+"""
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
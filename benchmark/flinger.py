@@ -0,0 +1,85 @@
+"""
+Compare projecting nodes one by one with projecting the whole node array in
+one vectorized operation, and projecting nodes for every zoom level of a
+tile pyramid with reusing pseudo-Mercator coordinates and scale factors
+cached in the node table.
+"""
+import sys
+import time
+
+import numpy as np
+
+from map_machine.geometry.boundary_box import BoundaryBox
+from map_machine.geometry.flinger import MercatorFlinger
+from map_machine.osm.osm_reader import NodeTable
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+DEFAULT_SIZE: int = 1_000_000
+ZOOM_LEVEL: float = 18.0
+EQUATOR_LENGTH: float = 40_075_017.0
+PYRAMID_ZOOM_LEVELS: range = range(12, 19)
+
+
+def main(size: int) -> None:
+    """Run benchmark on `size` random nodes."""
+    boundary_box: BoundaryBox = BoundaryBox(30.0, 59.0, 31.0, 60.0)
+    flinger: MercatorFlinger = MercatorFlinger(
+        boundary_box, ZOOM_LEVEL, EQUATOR_LENGTH
+    )
+    random: np.random.Generator = np.random.default_rng(0)
+    coordinates: np.ndarray = np.column_stack(
+        (
+            random.uniform(boundary_box.bottom, boundary_box.top, size),
+            random.uniform(boundary_box.left, boundary_box.right, size),
+        )
+    )
+
+    start: float = time.perf_counter()
+    points: list[np.ndarray] = [flinger.fling(x) for x in coordinates]
+    scales: list[float] = [flinger.get_scale(x) for x in coordinates]
+    loop: float = time.perf_counter() - start
+
+    start = time.perf_counter()
+    points_many: np.ndarray = flinger.fling_many(coordinates)
+    scales_many: np.ndarray = flinger.get_scale_many(coordinates)
+    vectorized: float = time.perf_counter() - start
+
+    assert np.allclose(points, points_many)
+    assert np.allclose(scales, scales_many)
+
+    print(f"{size} nodes")
+    print(f"fling and get_scale:           {loop:8.3f} s")
+    print(f"fling_many and get_scale_many: {vectorized:8.3f} s")
+    print(f"speedup:                       {loop / vectorized:8.1f}×")
+
+    table: NodeTable = NodeTable(size)
+    table.coordinates_buffer[:] = coordinates
+    table.size = size
+    rows: np.ndarray = np.arange(size)
+    flingers: list[MercatorFlinger] = [
+        MercatorFlinger(boundary_box, x, EQUATOR_LENGTH)
+        for x in PYRAMID_ZOOM_LEVELS
+    ]
+
+    start = time.perf_counter()
+    for flinger in flingers:
+        coordinates = table.coordinates_buffer[rows]
+        flinger.fling_many(coordinates)
+        flinger.get_scale_many(coordinates)
+    pyramid: float = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for flinger in flingers:
+        flinger.fling_table(table, rows)
+        flinger.get_scale_table(table, rows)
+    pyramid_cached: float = time.perf_counter() - start
+
+    print(f"zoom levels {PYRAMID_ZOOM_LEVELS[0]}–{PYRAMID_ZOOM_LEVELS[-1]}:")
+    print(f"fling_many and get_scale_many: {pyramid:8.3f} s")
+    print(f"cached world coordinates:      {pyramid_cached:8.3f} s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
@@ -0,0 +1,57 @@
+"""
+Measure assembling rings of a large multipolygon relation from its member
+ways.
+"""
+import random
+import sys
+import time
+
+from map_machine.constructor import glue
+from map_machine.element.grid import Grid
+from map_machine.osm.osm_reader import OSMMember, OSMNode, OSMWay
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+DEFAULT_SIZE: int = 10_000
+# Number of nodes in a member way.
+WAY_LENGTH: int = 5
+
+
+def main(size: int) -> None:
+    """Run benchmark on the relation with `size` member ways."""
+    grid: Grid = Grid()
+
+    # Nodes of one ring along the border of the square grid.
+    side: int = size * (WAY_LENGTH - 1) // 4
+    positions: list[tuple[int, int]] = (
+        [(0, j) for j in range(side)]
+        + [(i, side) for i in range(side)]
+        + [(side, j) for j in range(side, 0, -1)]
+        + [(i, 0) for i in range(side, 0, -1)]
+    )
+    nodes: list[OSMNode] = [grid.add_node({}, i, j) for i, j in positions]
+    nodes.append(nodes[0])
+
+    ways: list[OSMWay] = [
+        grid.add_way({}, nodes[index : index + WAY_LENGTH])
+        for index in range(0, len(nodes) - 1, WAY_LENGTH - 1)
+    ]
+    random.seed(0)
+    random.shuffle(ways)
+    grid.add_relation(
+        {"type": "multipolygon", "natural": "wood"},
+        [OSMMember("way", x.id_, "outer") for x in ways],
+    )
+
+    start: float = time.perf_counter()
+    rings: list[list[OSMNode]] = glue(ways)
+    duration: float = time.perf_counter() - start
+
+    assert len(rings) == 1 and rings[0][0] == rings[0][-1]
+    print(f"{len(ways)} member ways, {len(nodes) - 1} nodes")
+    print(f"ring assembly: {duration:8.3f} s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
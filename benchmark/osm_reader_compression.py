@@ -0,0 +1,50 @@
+"""
+Measure OSM XML parsing throughput for every compression format.  Files are
+decompressed while they are parsed.
+"""
+import sys
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from benchmark.synthetic import write_osm_file
+from map_machine.osm.compression import Compression, compress
+from map_machine.osm.osm_reader import OSMData
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+DEFAULT_SIZE: int = 200
+
+
+def main(size: int) -> None:
+    """Run benchmark on the synthetic grid of `size` × `size` nodes."""
+    with TemporaryDirectory() as directory:
+        source_path: Path = write_osm_file(Path(directory) / "grid.osm", size)
+        with source_path.open("rb") as input_file:
+            content: bytes = input_file.read()
+        megabytes: float = len(content) / 1024.0 / 1024.0
+
+        print(
+            f"{'Format':<8} {'file size':>12} {'time':>10} "
+            f"{'throughput':>14}"
+        )
+        for compression in Compression:
+            path: Path = Path(directory) / f"grid.osm{compression.suffix}"
+            if compression != Compression.NONE:
+                with path.open("wb") as output_file:
+                    output_file.write(compress(content, compression))
+
+            start: float = time.perf_counter()
+            OSMData().parse_file(path)
+            duration: float = time.perf_counter() - start
+
+            print(
+                f"{compression.value:<8} "
+                f"{path.stat().st_size / 1024.0 / 1024.0:8.1f} MiB "
+                f"{duration:8.2f} s {megabytes / duration:8.1f} MiB/s"
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
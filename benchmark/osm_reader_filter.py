@@ -0,0 +1,70 @@
+"""
+Compare time and peak memory of parsing the whole OSM XML file and parsing
+only the part of it inside a small boundary box.
+"""
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Callable
+
+from benchmark.synthetic import STEP, write_osm_file
+from map_machine.geometry.boundary_box import BoundaryBox
+from map_machine.osm.osm_reader import OSMData
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+DEFAULT_SIZE: int = 300
+# Part of the grid side covered by the boundary box.
+BOX_PART: float = 0.1
+
+
+def measure(function: Callable[[], OSMData], name: str) -> None:
+    """
+    Print time and peak memory of the parsing function.  Time is measured
+    without memory tracing, since tracing slows allocations down.
+    """
+    start: float = time.perf_counter()
+    osm_data: OSMData = function()
+    duration: float = time.perf_counter() - start
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:<10} {duration:8.2f} s {peak / 1024.0 / 1024.0:10.1f} MiB "
+        f"peak {len(osm_data.nodes):8} nodes {len(osm_data.ways):6} ways"
+    )
+
+
+def main(size: int) -> None:
+    """Run benchmark on the synthetic grid of `size` × `size` nodes."""
+    with TemporaryDirectory() as directory:
+        path: Path = write_osm_file(Path(directory) / "grid.osm", size)
+        print(f"File size: {path.stat().st_size / 1024.0 / 1024.0:.1f} MiB")
+
+        center: float = size * STEP / 2.0
+        radius: float = size * STEP * BOX_PART / 2.0
+        boundary_box: BoundaryBox = BoundaryBox(
+            center - radius, center - radius, center + radius, center + radius
+        )
+
+        def parse_whole() -> OSMData:
+            osm_data: OSMData = OSMData()
+            osm_data.parse_file(path)
+            return osm_data
+
+        def parse_in_box() -> OSMData:
+            osm_data: OSMData = OSMData()
+            osm_data.parse_file(path, boundary_box)
+            return osm_data
+
+        measure(parse_whole, "whole")
+        measure(parse_in_box, "in box")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
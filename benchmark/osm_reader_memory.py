@@ -0,0 +1,73 @@
+"""
+Compare peak memory and time of OSM XML parsing: the whole XML tree versus
+streaming `iterparse`, and streaming with element metadata skipped.
+"""
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Callable
+from xml.etree import ElementTree
+
+from benchmark.synthetic import write_osm_file
+from map_machine.osm.osm_reader import MetadataMode, OSMData
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+DEFAULT_SIZE: int = 300
+
+
+def parse_tree(path: Path) -> OSMData:
+    """Parse the file building the whole XML tree first."""
+    osm_data: OSMData = OSMData()
+    osm_data.parse_osm(ElementTree.parse(path).getroot())
+    return osm_data
+
+
+def parse_stream(path: Path) -> OSMData:
+    """Parse the file incrementally."""
+    osm_data: OSMData = OSMData()
+    osm_data.parse_osm_file(path)
+    return osm_data
+
+
+def parse_stream_skip(path: Path) -> OSMData:
+    """Parse the file incrementally without element metadata."""
+    osm_data: OSMData = OSMData(MetadataMode.SKIP)
+    osm_data.parse_osm_file(path)
+    return osm_data
+
+
+def measure(function: Callable[[Path], OSMData], path: Path) -> None:
+    """
+    Print time and peak memory of the parsing function.  Time is measured
+    without memory tracing, since tracing slows allocations down.
+    """
+    start: float = time.perf_counter()
+    function(path)
+    duration: float = time.perf_counter() - start
+
+    tracemalloc.start()
+    function(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{function.__name__:<18} {duration:8.2f} s "
+        f"{peak / 1024.0 / 1024.0:10.1f} MiB peak"
+    )
+
+
+def main(size: int) -> None:
+    """Run benchmark on the synthetic grid of `size` × `size` nodes."""
+    with TemporaryDirectory() as directory:
+        path: Path = write_osm_file(Path(directory) / "grid.osm", size)
+        print(f"File size: {path.stat().st_size / 1024.0 / 1024.0:.1f} MiB")
+        measure(parse_tree, path)
+        measure(parse_stream, path)
+        measure(parse_stream_skip, path)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
@@ -0,0 +1,52 @@
+"""
+Measure scaling of OSM XML parsing with the number of worker processes.
+
+The synthetic grid of `size` × `size` nodes is parsed in one process and by
+chunks in 2, 4, and 8 processes.
+"""
+import os
+import sys
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Optional
+
+from benchmark.synthetic import write_osm_file
+from map_machine.osm.osm_reader import OSMData
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+DEFAULT_SIZE: int = 300
+WORKERS: list[int] = [1, 2, 4, 8]
+
+
+def parse(path: Path, workers: Optional[int]) -> float:
+    """Parse the file and get parsing time in seconds."""
+    start: float = time.perf_counter()
+    osm_data: OSMData = OSMData()
+    osm_data.parse_osm_file(path, workers)
+    return time.perf_counter() - start
+
+
+def main(size: int) -> None:
+    """Run benchmark on the synthetic grid of `size` × `size` nodes."""
+    with TemporaryDirectory() as directory:
+        path: Path = write_osm_file(Path(directory) / "grid.osm", size)
+        print(
+            f"File size: {path.stat().st_size / 1024.0 / 1024.0:.1f} MiB, "
+            f"processors: {os.cpu_count()}"
+        )
+        sequential: float = parse(path, None)
+        for workers in WORKERS:
+            duration: float = (
+                sequential if workers == 1 else parse(path, workers)
+            )
+            print(
+                f"{f'{workers} workers':<12} {duration:8.2f} s "
+                f"{sequential / duration:8.2f}×"
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
@@ -0,0 +1,73 @@
+"""
+Compare time of cold OSM XML parsing and warm loading of the binary snapshot.
+
+By default, test fixtures from `tests/data` are used.  With an argument,
+synthetic grid of `size` × `size` nodes is used as well.
+"""
+import shutil
+import sys
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Callable
+
+from benchmark.synthetic import write_osm_file
+from map_machine.osm.osm_reader import OSMData
+from map_machine.osm.snapshot import read_snapshot, write_snapshot
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+FIXTURES_PATH: Path = Path("tests/data")
+
+
+def parse(path: Path) -> OSMData:
+    """Parse the file without snapshot."""
+    osm_data: OSMData = OSMData()
+    osm_data.parse_file(path)
+    return osm_data
+
+
+def load(path: Path) -> OSMData:
+    """Load the snapshot and read all node coordinates."""
+    osm_data: OSMData = read_snapshot(path)
+    osm_data.node_table.coordinates.sum()
+    return osm_data
+
+
+def get_time(function: Callable[[Path], OSMData], path: Path) -> float:
+    """Get minimal time of the function over several runs."""
+    repeat: int = max(1, min(100, int(1e6 / path.stat().st_size)))
+    durations: list[float] = []
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        function(path)
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def measure(path: Path) -> None:
+    """Print cold parsing and warm loading time for the file."""
+    write_snapshot(parse(path), path)
+    cold: float = get_time(parse, path)
+    warm: float = get_time(load, path)
+    print(
+        f"{path.name:<36} {cold * 1000.0:10.3f} ms {warm * 1000.0:10.3f} ms "
+        f"{cold / warm:8.1f}×"
+    )
+
+
+def main(size: int) -> None:
+    """Run benchmark on fixtures and, if size is set, on synthetic grid."""
+    print(f"{'File':<36} {'cold parse':>13} {'warm load':>13}")
+    with TemporaryDirectory() as directory:
+        # Snapshots are written next to the source files, so fixtures are
+        # copied to keep `tests/data` clean.
+        for fixture in sorted(FIXTURES_PATH.glob("*.osm")):
+            measure(Path(shutil.copy(fixture, directory)))
+        if size:
+            measure(write_osm_file(Path(directory) / "grid.osm", size))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 0)
@@ -0,0 +1,65 @@
+"""
+Compare loading map data for many small tiles: parsing the OSM file for
+every tile versus importing it into the store once and querying the store.
+"""
+import sys
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from benchmark.synthetic import STEP, write_osm_file
+from map_machine.geometry.boundary_box import BoundaryBox
+from map_machine.osm.osm_reader import OSMData
+from map_machine.osm.store import OSMStore
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+DEFAULT_SIZE: int = 300
+# Number of tiles along one side of the grid.
+TILES: int = 16
+# Number of tiles loaded by parsing the file, the time is extrapolated.
+PARSED_TILES: int = 4
+
+
+def main(size: int) -> None:
+    """Run benchmark on the synthetic grid of `size` × `size` nodes."""
+    tile_size: float = size * STEP / TILES
+    boxes: list[BoundaryBox] = [
+        BoundaryBox(
+            j * tile_size,
+            i * tile_size,
+            (j + 1) * tile_size,
+            (i + 1) * tile_size,
+        )
+        for i in range(TILES)
+        for j in range(TILES)
+    ]
+    with TemporaryDirectory() as directory:
+        path: Path = write_osm_file(Path(directory) / "grid.osm", size)
+
+        start: float = time.perf_counter()
+        for boundary_box in boxes[:PARSED_TILES]:
+            osm_data: OSMData = OSMData()
+            osm_data.parse_file(path, boundary_box)
+        parse: float = (time.perf_counter() - start) * len(boxes) / PARSED_TILES
+
+        start = time.perf_counter()
+        with OSMStore(Path(directory) / "grid.db") as store:
+            store.import_file(path)
+            import_time: float = time.perf_counter() - start
+
+            start = time.perf_counter()
+            ways: int = 0
+            for boundary_box in boxes:
+                ways += len(store.get_osm_data(boundary_box).ways)
+            query: float = time.perf_counter() - start
+
+    print(f"{len(boxes)} tiles, {ways} ways in all tiles")
+    print(f"parse file per tile: {parse:10.2f} s")
+    print(f"store import:        {import_time:10.2f} s")
+    print(f"store queries:       {query:10.2f} s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
@@ -0,0 +1,77 @@
+"""
+Compare finding node matchers for element tags: checking every matcher of
+the scheme versus checking only candidates from the matcher index.
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+from map_machine.osm.osm_reader import Tags
+from map_machine.scheme import NodeMatcher, Scheme
+from map_machine.workspace import Workspace
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+DEFAULT_SIZE: int = 10_000
+# Tags that are not matched by the scheme, added to every element.
+NOISE: list[tuple[str, str]] = [
+    ("name", "Name"),
+    ("source", "survey"),
+    ("addr:housenumber", "1"),
+    ("opening_hours", "24/7"),
+]
+
+
+def get_elements(scheme: Scheme, size: int) -> list[Tags]:
+    """Generate tags of elements matched by random matchers of the scheme."""
+    random.seed(0)
+    elements: list[Tags] = []
+    for _ in range(size):
+        matcher: NodeMatcher = random.choice(scheme.node_matchers)
+        tags: Tags = {
+            key: "yes" if value == "*" or value.startswith("^") else value
+            for key, value in matcher.tags.items()
+        }
+        tags.update(random.sample(NOISE, 2))
+        elements.append(tags)
+    return elements
+
+
+def main(size: int) -> None:
+    """Run benchmark on `size` elements."""
+    workspace: Workspace = Workspace(Path("temp"))
+    scheme: Scheme = Scheme.from_file(workspace.DEFAULT_SCHEME_PATH)
+    elements: list[Tags] = get_elements(scheme, size)
+
+    start: float = time.perf_counter()
+    linear: list[list[int]] = [
+        [
+            index
+            for index, matcher in enumerate(scheme.node_matchers)
+            if matcher.is_matched(tags)[0]
+        ]
+        for tags in elements
+    ]
+    linear_time: float = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed: list[list[int]] = [
+        [
+            index
+            for index in scheme.node_matcher_index.get_candidates(tags)
+            if scheme.node_matchers[index].is_matched(tags)[0]
+        ]
+        for tags in elements
+    ]
+    indexed_time: float = time.perf_counter() - start
+
+    assert linear == indexed
+    print(f"{size} elements, {len(scheme.node_matchers)} matchers")
+    print(f"linear scan:   {linear_time:8.3f} s")
+    print(f"matcher index: {indexed_time:8.3f} s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
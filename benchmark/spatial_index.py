@@ -0,0 +1,91 @@
+"""
+Compare selection of elements for many small tiles: checking all nodes and
+ways for every tile versus querying the spatial index built once.
+"""
+import sys
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import numpy as np
+
+from benchmark.synthetic import STEP, write_osm_file
+from map_machine.geometry.boundary_box import BoundaryBox
+from map_machine.osm.osm_reader import OSMData, OSMWay
+from map_machine.osm.spatial_index import QueryResult, SpatialIndex
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+DEFAULT_SIZE: int = 300
+# Number of tiles along one side of the grid.
+TILES: int = 16
+
+
+def select_all(osm_data: OSMData, boundary_box: BoundaryBox) -> int:
+    """Select nodes and ways inside the boundary box checking all of them."""
+    coordinates: np.ndarray = osm_data.node_table.coordinates
+    count: int = int(
+        np.count_nonzero(
+            (coordinates[:, 0] >= boundary_box.bottom)
+            & (coordinates[:, 0] <= boundary_box.top)
+            & (coordinates[:, 1] >= boundary_box.left)
+            & (coordinates[:, 1] <= boundary_box.right)
+        )
+    )
+    way: OSMWay
+    for way in osm_data.ways.values():
+        way_coordinates: np.ndarray = way.nodes.coordinates
+        if (
+            way_coordinates[:, 0].min() <= boundary_box.top
+            and way_coordinates[:, 0].max() >= boundary_box.bottom
+            and way_coordinates[:, 1].min() <= boundary_box.right
+            and way_coordinates[:, 1].max() >= boundary_box.left
+        ):
+            count += 1
+    return count
+
+
+def main(size: int) -> None:
+    """Run benchmark on the synthetic grid of `size` × `size` nodes."""
+    with TemporaryDirectory() as directory:
+        path: Path = write_osm_file(Path(directory) / "grid.osm", size)
+        osm_data: OSMData = OSMData()
+        osm_data.parse_file(path)
+
+    tile_size: float = size * STEP / TILES
+    boxes: list[BoundaryBox] = [
+        BoundaryBox(
+            j * tile_size,
+            i * tile_size,
+            (j + 1) * tile_size,
+            (i + 1) * tile_size,
+        )
+        for i in range(TILES)
+        for j in range(TILES)
+    ]
+    print(
+        f"{len(osm_data.nodes)} nodes, {len(osm_data.ways)} ways, "
+        f"{len(boxes)} tiles"
+    )
+
+    start: float = time.perf_counter()
+    expected: list[int] = [select_all(osm_data, x) for x in boxes]
+    full_scan: float = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index: SpatialIndex = SpatialIndex(osm_data)
+    build: float = time.perf_counter() - start
+    start = time.perf_counter()
+    results: list[QueryResult] = [index.query(x) for x in boxes]
+    query: float = time.perf_counter() - start
+
+    assert expected == [len(x.node_rows) + len(x.way_ids) for x in results]
+
+    print(f"full scan:    {full_scan * 1000.0:10.1f} ms")
+    print(f"index build:  {build * 1000.0:10.1f} ms")
+    print(f"index query:  {query * 1000.0:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
@@ -0,0 +1,92 @@
+"""Synthetic OpenStreetMap data for benchmarks."""
+from pathlib import Path
+from typing import TextIO
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+STEP: float = 0.0001
+BUILDING_SIZE: int = 4
+
+
+def write_osm_file(path: Path, size: int) -> Path:
+    """
+    Write OSM XML file with a grid of `size` × `size` nodes, a closed building
+    way for every `BUILDING_SIZE` × `BUILDING_SIZE` block of the grid, and a
+    road way for every row.
+
+    :param path: output file path
+    :param size: number of nodes in one row of the grid
+    :return: output file path
+    """
+    with path.open("w", encoding="utf-8") as output_file:
+        output_file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        output_file.write('<osm version="0.6">\n')
+        output_file.write(
+            f' <bounds minlat="0.0" minlon="0.0" maxlat="{size * STEP}" '
+            f'maxlon="{size * STEP}"/>\n'
+        )
+        write_nodes(output_file, size)
+        write_ways(output_file, size)
+        output_file.write("</osm>\n")
+
+    return path
+
+
+def get_node_id(i: int, j: int, size: int) -> int:
+    """Get identifier of the grid node."""
+    return i * size + j + 1
+
+
+def write_nodes(output_file: TextIO, size: int) -> None:
+    """Write grid nodes, every tenth of them with tags."""
+    for i in range(size):
+        for j in range(size):
+            node_id: int = get_node_id(i, j, size)
+            output_file.write(
+                f' <node id="{node_id}" visible="true" version="1" '
+                f'changeset="{node_id}" timestamp="2020-01-01T00:00:00Z" '
+                f'user="User {node_id % 100}" uid="{node_id % 100}" '
+                f'lat="{i * STEP:.7f}" lon="{j * STEP:.7f}"'
+            )
+            if node_id % 10 == 0:
+                output_file.write(">\n")
+                output_file.write('  <tag k="natural" v="tree"/>\n')
+                output_file.write(" </node>\n")
+            else:
+                output_file.write("/>\n")
+
+
+def write_ways(output_file: TextIO, size: int) -> None:
+    """Write building ways and road ways."""
+    way_id: int = 0
+
+    for i in range(0, size - 1, BUILDING_SIZE):
+        for j in range(0, size - 1, BUILDING_SIZE):
+            way_id += 1
+            corners: list[tuple[int, int]] = [
+                (i, j),
+                (i, j + 1),
+                (i + 1, j + 1),
+                (i + 1, j),
+                (i, j),
+            ]
+            output_file.write(
+                f' <way id="{way_id}" visible="true" version="1" '
+                f'changeset="{way_id}" timestamp="2020-01-01T00:00:00Z" '
+                f'user="User {way_id % 100}" uid="{way_id % 100}">\n'
+            )
+            for corner_i, corner_j in corners:
+                output_file.write(
+                    f'  <nd ref="{get_node_id(corner_i, corner_j, size)}"/>\n'
+                )
+            output_file.write('  <tag k="building" v="yes"/>\n')
+            output_file.write(" </way>\n")
+
+    for i in range(2, size, BUILDING_SIZE):
+        way_id += 1
+        output_file.write(f' <way id="{way_id}">\n')
+        for j in range(size):
+            output_file.write(f'  <nd ref="{get_node_id(i, j, size)}"/>\n')
+        output_file.write('  <tag k="highway" v="residential"/>\n')
+        output_file.write(" </way>\n")
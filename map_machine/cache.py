@@ -0,0 +1,238 @@
+"""
+Cache directory with limited size.
+
+Cache directory keeps downloaded OSM data files, their snapshots, and drawn
+SVG and PNG files.  Access times of cached files are recorded in the index
+file, and least recently used files are removed when the directory exceeds
+the size limit.
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from map_machine.osm.snapshot import SNAPSHOT_SUFFIX
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+ACCESS_FILE_NAME: str = "access.json"
+MEGABYTE: int = 1024 * 1024
+# Minimal time in seconds between writes of the index file on access, so that
+# accesses are persisted even if no file is added, but not on every access.
+SAVE_INTERVAL: float = 10.0
+# Only these files are managed, other files in the cache directory are never
+# removed.  Snapshot of a file belongs to the file.
+CACHED_SUFFIXES: tuple[str, ...] = (
+    ".osm",
+    ".osm.gz",
+    ".osm.bz2",
+    ".osm.xz",
+    ".svg",
+    ".png",
+)
+
+
+@dataclass
+class CacheStatistics:
+    """Counters of cache usage since the start of the process."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    # Total size of removed files in bytes.
+    evicted_size: int = 0
+
+
+def get_entry_name(path: Path) -> Optional[str]:
+    """Get name of the cached file the path belongs to, if it is managed."""
+    name: str = path.name
+    if name.endswith(SNAPSHOT_SUFFIX):
+        name = name[: -len(SNAPSHOT_SUFFIX)]
+    if name.endswith(CACHED_SUFFIXES):
+        return name
+    return None
+
+
+class CacheManager:
+    """
+    Cache directory with access time tracking and least recently used
+    eviction.  Thread-safe.
+
+    Several processes may share the directory: access times are merged when
+    the index is saved.
+    """
+
+    def __init__(self, path: Path, max_size: Optional[int] = None) -> None:
+        """
+        :param path: cache directory
+        :param max_size: maximum total size of cached files in bytes; if not
+            specified, files are never removed
+        """
+        self.path: Path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_size: Optional[int] = max_size
+        self.access_path: Path = path / ACCESS_FILE_NAME
+        self.statistics: CacheStatistics = CacheStatistics()
+        self.lock: threading.Lock = threading.Lock()
+        self.access_times: dict[str, float] = self.read_access_times()
+        # Time of the last write of the index file.
+        self.save_time: Optional[float] = None
+
+    @classmethod
+    def from_options(cls, options: argparse.Namespace) -> "CacheManager":
+        """Create manager of the cache directory from command-line options."""
+        return cls(
+            Path(options.cache),
+            None
+            if options.cache_size is None
+            else int(options.cache_size * MEGABYTE),
+        )
+
+    def read_access_times(self) -> dict[str, float]:
+        """Read access times of cached files from the index file."""
+        if not self.access_path.is_file():
+            return {}
+        try:
+            with self.access_path.open(encoding="utf-8") as input_file:
+                return json.load(input_file)
+        except (OSError, json.JSONDecodeError) as error:
+            logging.warning(f"Cannot read cache index: {error}.")
+            return {}
+
+    def save(self) -> None:
+        """Merge access times with the index file and write it."""
+        with self.lock:
+            access_times: dict[str, float] = self.read_access_times()
+            for name, access_time in self.access_times.items():
+                access_times[name] = max(
+                    access_time, access_times.get(name, 0.0)
+                )
+            self.access_times = {
+                name: access_time
+                for name, access_time in access_times.items()
+                if (self.path / name).exists()
+            }
+            temporary_path: Path = self.access_path.with_name(
+                f"{ACCESS_FILE_NAME}.{os.getpid()}.{threading.get_ident()}"
+            )
+            with temporary_path.open("w", encoding="utf-8") as output_file:
+                json.dump(self.access_times, output_file)
+            temporary_path.replace(self.access_path)
+            self.save_time = time.time()
+
+    def record(self, path: Path) -> bool:
+        """
+        Record access to the cached file in memory.  Files outside of the
+        cache directory are not managed.
+
+        :return: true if the file is managed
+        """
+        name: Optional[str] = get_entry_name(path)
+        if name is None or path.parent.resolve() != self.path.resolve():
+            return False
+        with self.lock:
+            self.access_times[name] = time.time()
+        return True
+
+    def touch(self, path: Path) -> None:
+        """
+        Record access to the cached file.  The index file is updated if it
+        was not written for `SAVE_INTERVAL` seconds, so that accesses from
+        short processes are not lost.
+        """
+        if self.record(path) and (
+            self.save_time is None
+            or time.time() - self.save_time >= SAVE_INTERVAL
+        ):
+            self.save()
+
+    def lookup(self, path: Path) -> bool:
+        """
+        Check whether the file is in the cache and record the access.
+
+        :param path: file in the cache directory
+        :return: true if the file exists
+        """
+        if path.exists():
+            self.touch(path)
+            with self.lock:
+                self.statistics.hits += 1
+            return True
+        with self.lock:
+            self.statistics.misses += 1
+        return False
+
+    def add(self, path: Path) -> None:
+        """
+        Record new cached file and remove least recently used files if the
+        cache is too large.  The new file itself is never removed.
+
+        :param path: new file in the cache directory
+        """
+        self.record(path)
+        self.evict({get_entry_name(path)})
+        self.save()
+
+    def get_entries(self) -> dict[str, tuple[float, int]]:
+        """Get access times and sizes of all cached files with snapshots."""
+        entries: dict[str, tuple[float, int]] = {}
+        with os.scandir(self.path) as iterator:
+            for entry in iterator:
+                if not entry.is_file():
+                    continue
+                name: Optional[str] = get_entry_name(Path(entry.name))
+                if name is None:
+                    continue
+                stat: os.stat_result = entry.stat()
+                access_time, size = entries.get(name, (0.0, 0))
+                entries[name] = (
+                    max(
+                        access_time,
+                        self.access_times.get(name, stat.st_mtime),
+                    ),
+                    size + stat.st_size,
+                )
+        return entries
+
+    def get_size(self) -> int:
+        """Get total size of cached files in bytes."""
+        return sum(size for _, size in self.get_entries().values())
+
+    def evict(self, keep: set[Optional[str]]) -> None:
+        """
+        Remove least recently used files until the cache fits the size limit.
+
+        :param keep: names of files that should not be removed
+        """
+        if self.max_size is None:
+            return
+
+        with self.lock:
+            entries: dict[str, tuple[float, int]] = self.get_entries()
+        total_size: int = sum(size for _, size in entries.values())
+
+        for name in sorted(entries, key=lambda x: entries[x][0]):
+            if total_size <= self.max_size:
+                break
+            if name in keep:
+                continue
+            for path in (
+                self.path / name,
+                self.path / f"{name}{SNAPSHOT_SUFFIX}",
+            ):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            total_size -= entries[name][1]
+            logging.info(f"Cached file {name} is removed.")
+            with self.lock:
+                self.access_times.pop(name, None)
+                self.statistics.evictions += 1
+                self.statistics.evicted_size += entries[name][1]
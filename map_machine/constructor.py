@@ -1,9 +1,12 @@
 """Construct Map Machine nodes and ways."""
 import logging
 import sys
+from collections import defaultdict, deque
+from dataclasses import replace
 from datetime import datetime
 from hashlib import sha256
-from typing import Any, Iterator, Optional, Union
+from itertools import islice
+from typing import Any, Iterable, Optional, Sequence, Union
 
 import numpy as np
 from colour import Color
@@ -15,16 +18,24 @@ from map_machine.feature.direction import DirectionSector
 from map_machine.feature.road import Road, Roads
 from map_machine.feature.tree import Tree
 from map_machine.figure import StyledFigure
-from map_machine.geometry.flinger import Flinger
+from map_machine.geometry.boundary_box import BoundaryBox
+from map_machine.geometry.flinger import (
+    CachedFlinger,
+    Flinger,
+    MercatorFlinger,
+)
 from map_machine.map_configuration import DrawingMode, MapConfiguration
 from map_machine.osm.osm_reader import (
+    NodeTable,
     OSMData,
     OSMNode,
     OSMRelation,
     OSMWay,
+    get_coordinates,
     parse_levels,
     Tags,
 )
+from map_machine.osm.spatial_index import QueryResult, SpatialIndex, scan
 from map_machine.pictogram.icon import (
     DEFAULT_SMALL_SHAPE_ID,
     Icon,
@@ -33,7 +44,7 @@ from map_machine.pictogram.icon import (
     ShapeExtractor,
     ShapeSpecification,
 )
-from map_machine.pictogram.point import Point
+from map_machine.pictogram.point import MAX_POINT_EXTENT, Point
 from map_machine.scheme import LineStyle, RoadMatcher, Scheme
 from map_machine.text import Label, TextConstructor
 from map_machine.ui.cli import BuildingMode
@@ -43,6 +54,9 @@ __author__ = "Sergey Vartanov"
 __email__ = "me@enzet.ru"
 
 DEBUG: bool = False
+# Margin of the area to construct in pixels, so that icons and labels of points
+# outside the image that reach into it are not lost, e.g. on tile borders.
+CLIP_MARGIN: float = MAX_POINT_EXTENT
 TIME_COLOR_SCALE: list[Color] = [
     Color("#581845"),
     Color("#900C3F"),
@@ -62,14 +76,10 @@ def line_center(
     :param nodes: node list
     :param flinger: flinger that remap geo positions
     """
-    boundary: list[MinMax] = [MinMax(), MinMax()]
-
-    for node in nodes:
-        boundary[0].update(node.coordinates[0])
-        boundary[1].update(node.coordinates[1])
-    center_coordinates: np.ndarray = np.array(
-        (boundary[0].center(), boundary[1].center())
-    )
+    coordinates: np.ndarray = get_coordinates(nodes)
+    center_coordinates: np.ndarray = (
+        coordinates.min(axis=0) + coordinates.max(axis=0)
+    ) / 2.0
     return flinger.fling(center_coordinates), center_coordinates
 
 
@@ -94,59 +104,79 @@ def get_time_color(time: Optional[datetime], boundaries: MinMax) -> Color:
 
 def glue(ways: list[OSMWay]) -> list[list[OSMNode]]:
     """
-    Try to glue ways that share nodes.
+    Assemble rings from ways that share endpoints.
+
+    Open chains are indexed by identifiers of their endpoint nodes, so every
+    join takes constant time, and the shorter chain is always added to the
+    longer one.  Chains that cannot be closed are returned as they are.
 
     :param ways: ways to glue
     """
     result: list[list[OSMNode]] = []
-    to_process: set[tuple[OSMNode]] = set()
 
-    for way in ways:
+    # Open chains by chain identifiers and chain identifiers by identifiers
+    # of their endpoint nodes.
+    chains: dict[int, deque[OSMNode]] = {}
+    endpoints: dict[int, list[int]] = defaultdict(list)
+
+    for chain_id, way in enumerate(ways):
         if way.is_cycle():
             result.append(way.nodes)
-        else:
-            to_process.add(tuple(way.nodes))
-
-    while to_process:
-        nodes: list[OSMNode] = list(to_process.pop())
-        glued: Optional[list[OSMNode]] = None
-        other_nodes: Optional[tuple[OSMNode]] = None
-
-        for other_nodes in to_process:
-            glued = try_to_glue(nodes, list(other_nodes))
-            if glued is not None:
+            continue
+
+        chain: deque[OSMNode] = deque(way.nodes)
+        while True:
+            other_id: Optional[int] = None
+            for node in chain[0], chain[-1]:
+                if endpoints.get(node.id_):
+                    other_id = endpoints[node.id_][0]
+                    break
+            if other_id is None:
+                break
+            other: deque[OSMNode] = chains.pop(other_id)
+            for node in other[0], other[-1]:
+                endpoints[node.id_].remove(other_id)
+            chain = join(chain, other)
+            if is_cycle(chain):
                 break
 
-        if glued is not None:
-            to_process.remove(other_nodes)
-            if is_cycle(glued):
-                result.append(glued)
-            else:
-                to_process.add(tuple(glued))
+        if is_cycle(chain):
+            result.append(list(chain))
         else:
-            result.append(nodes)
+            chains[chain_id] = chain
+            for node in chain[0], chain[-1]:
+                endpoints[node.id_].append(chain_id)
+
+    result += [list(x) for x in chains.values()]
 
     return result
 
 
-def is_cycle(nodes: list[OSMNode]) -> bool:
+def is_cycle(nodes: Sequence[OSMNode]) -> bool:
     """Is way a cycle way or an area boundary."""
-    return nodes[0] == nodes[-1]
+    return nodes[0].id_ == nodes[-1].id_
 
 
-def try_to_glue(
-    nodes: list[OSMNode], other: list[OSMNode]
-) -> Optional[list[OSMNode]]:
-    """Create new combined way if ways share endpoints."""
-    if nodes[0] == other[0]:
-        return list(reversed(other[1:])) + nodes
-    if nodes[0] == other[-1]:
-        return other[:-1] + nodes
-    if nodes[-1] == other[-1]:
-        return nodes + list(reversed(other[:-1]))
-    if nodes[-1] == other[0]:
-        return nodes + other[1:]
-    return None
+def join(chain: deque[OSMNode], other: deque[OSMNode]) -> deque[OSMNode]:
+    """
+    Join two chains of nodes that share an endpoint.  The shorter chain is
+    added to the longer one, which is modified and returned.
+    """
+    if len(other) > len(chain):
+        chain, other = other, chain
+
+    if chain[-1].id_ == other[0].id_:
+        chain.extend(islice(other, 1, None))
+    elif chain[-1].id_ == other[-1].id_:
+        other.pop()
+        chain.extend(reversed(other))
+    elif chain[0].id_ == other[-1].id_:
+        other.pop()
+        chain.extendleft(reversed(other))
+    else:
+        chain.extendleft(islice(other, 1, None))
+
+    return chain
 
 
 class Constructor:
@@ -158,9 +188,26 @@ class Constructor:
         flinger: Flinger,
         extractor: ShapeExtractor,
         configuration: MapConfiguration,
+        spatial_index: Optional[SpatialIndex] = None,
+        clip_boundary_box: Optional[BoundaryBox] = None,
     ) -> None:
+        """
+        :param osm_data: OpenStreetMap data
+        :param flinger: converter of geo coordinates to the image ones
+        :param extractor: extractor of icon shapes
+        :param configuration: drawing configuration
+        :param spatial_index: index of OpenStreetMap data, should be specified
+            if the data is used for several images
+        :param clip_boundary_box: only elements intersecting this area are
+            constructed; by default it is the area of the Mercator flinger
+            with a margin for icons and labels
+        """
         self.osm_data: OSMData = osm_data
-        self.flinger: Flinger = flinger
+        # Every node is projected once for the render and shared by all
+        # features.
+        self.flinger: CachedFlinger = CachedFlinger(
+            flinger, osm_data.node_table
+        )
         self.scheme: Scheme = configuration.scheme
         self.extractor: ShapeExtractor = extractor
         self.configuration: MapConfiguration = configuration
@@ -187,6 +234,25 @@ class Constructor:
 
         self.heights: set[float] = {0.25 / BUILDING_SCALE, 0.5 / BUILDING_SCALE}
 
+        if clip_boundary_box is None and isinstance(flinger, MercatorFlinger):
+            clip_boundary_box = flinger.get_extended_boundaries(CLIP_MARGIN)
+        self.clip_boundary_box: Optional[BoundaryBox] = clip_boundary_box
+
+        # Elements to construct.  Elements outside the clip boundary box are
+        # skipped by their boundary boxes without constructing features.
+        self.query: Optional[QueryResult] = None
+        if clip_boundary_box is not None:
+            self.query = (
+                scan(osm_data, clip_boundary_box)
+                if spatial_index is None
+                else spatial_index.query(clip_boundary_box)
+            )
+            logging.debug(
+                f"Clipped: {len(self.query.way_ids)} of "
+                f"{len(osm_data.ways)} ways, {len(self.query.relation_ids)} "
+                f"of {len(osm_data.relations)} relations."
+            )
+
     def add_building(self, building: Building) -> None:
         """Add building and update levels."""
         self.buildings.append(building)
@@ -199,10 +265,20 @@ class Constructor:
         self.construct_relations()
         self.construct_nodes()
 
+        for name, statistics in self.scheme.get_memo_statistics().items():
+            logging.debug(
+                f"Scheme {name} memo: {statistics.hits} hits, "
+                f"{statistics.misses} misses, {statistics.evictions} "
+                f"evictions."
+            )
+
     def construct_ways(self) -> None:
         """Construct Map Machine ways."""
         logging.info("Constructing ways...")
-        for way_id in self.osm_data.ways:
+        way_ids: Iterable[int] = (
+            self.query.way_ids if self.query is not None else self.osm_data.ways
+        )
+        for way_id in way_ids:
             way: OSMWay = self.osm_data.ways[way_id]
             self.construct_line(way, [], [way.nodes])
 
@@ -386,7 +462,12 @@ class Constructor:
 
     def construct_relations(self) -> None:
         """Construct Map Machine ways from OSM relations."""
-        for relation_id in self.osm_data.relations:
+        relation_ids: Iterable[int] = (
+            self.query.relation_ids
+            if self.query is not None
+            else self.osm_data.relations
+        )
+        for relation_id in relation_ids:
             relation: OSMRelation = self.osm_data.relations[relation_id]
             tags: dict[str, str] = relation.tags
             if not self.check_level(tags):
@@ -408,20 +489,32 @@ class Constructor:
             if outer_ways:
                 inners_path: list[list[OSMNode]] = glue(inner_ways)
                 outers_path: list[list[OSMNode]] = glue(outer_ways)
+                unclosed: int = sum(
+                    not is_cycle(x) for x in inners_path + outers_path
+                )
+                if unclosed:
+                    logging.debug(
+                        f"Multipolygon {relation.id_} has {unclosed} unclosed "
+                        f"rings."
+                    )
                 self.construct_line(relation, inners_path, outers_path)
 
     def construct_nodes(self) -> None:
         """Construct point and add them to the collection."""
         logging.info("Constructing nodes...")
 
+        # Only tagged nodes may produce points, so untagged rows of the node
+        # table are skipped without constructing node objects.
+        table: NodeTable = self.osm_data.node_table
+        rows: np.ndarray = table.get_tagged_rows()
+        if self.query is not None:
+            rows = rows[np.isin(rows, self.query.node_rows)]
+
         # Sort node vertically (using latitude values) to draw them from top to
         # bottom.
-        sorted_node_ids: Iterator[int] = sorted(
-            self.osm_data.nodes.keys(),
-            key=lambda x: -self.osm_data.nodes[x].coordinates[0],
-        )
-        for node_id in sorted_node_ids:
-            self.construct_node(self.osm_data.nodes[node_id])
+        rows = rows[np.argsort(-table.coordinates[rows, 0], kind="stable")]
+        for row in rows:
+            self.construct_node(table.get_node(int(row)))
 
     def construct_node(self, node: OSMNode) -> None:
         """Create new point if needed and add it to the point collection."""
@@ -434,7 +527,7 @@ class Constructor:
 
         processed: set[str] = set()
 
-        flung: np.ndarray = self.flinger.fling(node.coordinates)
+        flung: np.ndarray = self.flinger.fling_node(node)
 
         priority: int
         icon_set: IconSet
@@ -455,9 +548,9 @@ class Constructor:
             dot: Shape = self.extractor.get_shape(DEFAULT_SMALL_SHAPE_ID)
             icon_set: IconSet = IconSet(
                 Icon([ShapeSpecification(dot, color)]),
-                [],
+                (),
                 Icon([ShapeSpecification(dot, color)]),
-                set(),
+                frozenset(),
             )
             point: Point = Point(
                 icon_set,
@@ -485,7 +578,10 @@ class Constructor:
             icon_set, priority = self.configuration.get_icon(
                 self.extractor, tags, processed
             )
-            icon_set.main_icon.recolor(color)
+            # Icon sets are shared, so the recolored icon is a copy.
+            icon_set = replace(
+                icon_set, main_icon=icon_set.main_icon.get_recolored(color)
+            )
             point: Point = Point(
                 icon_set,
                 [],
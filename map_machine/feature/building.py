@@ -62,9 +62,8 @@ class Building(Figure):
         self.parts: list[Segment] = []
 
         for nodes in self.inners + self.outers:
-            for i in range(len(nodes) - 1):
-                flung_1: np.ndarray = flinger.fling(nodes[i].coordinates)
-                flung_2: np.ndarray = flinger.fling(nodes[i + 1].coordinates)
+            points: np.ndarray = flinger.fling_nodes(nodes)
+            for flung_1, flung_2 in zip(points[:-1], points[1:]):
                 self.parts.append(Segment(flung_1, flung_2))
 
         self.parts = sorted(self.parts)
@@ -128,9 +127,8 @@ class Building(Figure):
         )
         building_shade.add(path)
         for nodes in self.inners + self.outers:
-            for i in range(len(nodes) - 1):
-                flung_1 = flinger.fling(nodes[i].coordinates)
-                flung_2 = flinger.fling(nodes[i + 1].coordinates)
+            points: np.ndarray = flinger.fling_nodes(nodes)
+            for flung_1, flung_2 in zip(points[:-1], points[1:]):
                 command: PathCommands = [
                     "M",
                     np.add(flung_1, shift_1),
@@ -379,9 +379,7 @@ class Road(Tagged):
         self.nodes: list[OSMNode] = nodes
         self.matcher: RoadMatcher = matcher
 
-        self.line: Polyline = Polyline(
-            [flinger.fling(node.coordinates) for node in self.nodes]
-        )
+        self.line: Polyline = Polyline(list(flinger.fling_nodes(self.nodes)))
         self.width: Optional[float] = matcher.default_width
         self.lanes: list[Lane] = []
 
@@ -685,7 +683,7 @@ class SimpleConnector(Connector):
         self.index_2: int = connections[1][1]
 
         node: OSMNode = self.road_1.nodes[self.index_1]
-        self.point: np.ndarray = flinger.fling(node.coordinates)
+        self.point: np.ndarray = flinger.fling_node(node)
 
     def draw(self, svg: Drawing) -> None:
         """Draw connection fill."""
@@ -726,9 +724,9 @@ class ComplexConnector(Connector):
         self.road_2.line.shorten(self.index_2, length)
 
         node_1: OSMNode = self.road_1.nodes[self.index_1]
-        point_1: np.ndarray = flinger.fling(node_1.coordinates)
+        point_1: np.ndarray = flinger.fling_node(node_1)
         node_2: OSMNode = self.road_2.nodes[self.index_2]
-        point_2: np.ndarray = flinger.fling(node_2.coordinates)
+        point_2: np.ndarray = flinger.fling_node(node_2)
         point = (point_1 + point_2) / 2.0
 
         points_1: list[np.ndarray] = get_curve_points(
@@ -786,7 +784,7 @@ class SimpleIntersection(Connector):
             self.connections, key=lambda x: x[0].matcher.priority
         ):
             node: OSMNode = self.road_1.nodes[self.index_1]
-            point: np.ndarray = self.flinger.fling(node.coordinates)
+            point: np.ndarray = self.flinger.fling_node(node)
             circle: Circle = svg.circle(
                 point,
                 road.width * self.scale / 2.0,
@@ -798,7 +796,7 @@ class SimpleIntersection(Connector):
         """Draw connection outline."""
         for road, _ in self.connections:
             node: OSMNode = self.road_1.nodes[self.index_1]
-            point: np.ndarray = self.flinger.fling(node.coordinates)
+            point: np.ndarray = self.flinger.fling_node(node)
             circle: Circle = svg.circle(
                 point,
                 road.width * self.scale / 2.0 + 1.0,
@@ -2,7 +2,7 @@
 import numpy as np
 
 from map_machine.geometry.flinger import Flinger
-from map_machine.osm.osm_reader import OSMNode, Tagged
+from map_machine.osm.osm_reader import OSMNode, Tagged, get_coordinates
 from map_machine.scheme import LineStyle
 
 __author__ = "Sergey Vartanov"
@@ -118,12 +118,12 @@ def is_clockwise(polygon: list[OSMNode]) -> bool:
 
     :param polygon: list of OpenStreetMap nodes
     """
-    count: float = 0.0
-    for index, node in enumerate(polygon):
-        next_index: int = 0 if index == len(polygon) - 1 else index + 1
-        count += (polygon[next_index].coordinates[0] - node.coordinates[0]) * (
-            polygon[next_index].coordinates[1] + node.coordinates[1]
-        )
+    coordinates: np.ndarray = get_coordinates(polygon)
+    next_coordinates: np.ndarray = np.roll(coordinates, -1, axis=0)
+    count: float = np.sum(
+        (next_coordinates[:, 0] - coordinates[:, 0])
+        * (next_coordinates[:, 1] + coordinates[:, 1])
+    )
     return count >= 0.0
 
 
@@ -133,7 +133,7 @@ def make_clockwise(polygon: list[OSMNode]) -> list[OSMNode]:
 
     :param polygon: list of OpenStreetMap nodes
     """
-    return polygon if is_clockwise(polygon) else list(reversed(polygon))
+    return polygon if is_clockwise(polygon) else polygon[::-1]
 
 
 def make_counter_clockwise(polygon: list[OSMNode]) -> list[OSMNode]:
@@ -142,7 +142,7 @@ def make_counter_clockwise(polygon: list[OSMNode]) -> list[OSMNode]:
 
     :param polygon: list of OpenStreetMap nodes
     """
-    return polygon if not is_clockwise(polygon) else list(reversed(polygon))
+    return polygon if not is_clockwise(polygon) else polygon[::-1]
 
 
 def get_path(
@@ -152,6 +152,6 @@ def get_path(
     parallel_offset: float = 0.0,
 ) -> str:
     """Construct SVG path commands from nodes."""
-    return Polyline(
-        [flinger.fling(node.coordinates) + shift for node in nodes]
-    ).get_path(parallel_offset)
+    return Polyline(list(flinger.fling_nodes(nodes) + shift)).get_path(
+        parallel_offset
+    )
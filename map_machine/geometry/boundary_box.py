@@ -169,3 +169,76 @@ class BoundaryBox:
         self.bottom = min(self.bottom, other.bottom)
         self.right = max(self.right, other.right)
         self.top = max(self.top, other.top)
+
+    def intersects(self, other: "BoundaryBox") -> bool:
+        """Check whether boundary boxes have common area."""
+        return (
+            self.left < other.right
+            and other.left < self.right
+            and self.bottom < other.top
+            and other.bottom < self.top
+        )
+
+    def contains(self, other: "BoundaryBox") -> bool:
+        """Check whether another boundary box is inside this one."""
+        return (
+            self.left <= other.left
+            and other.right <= self.right
+            and self.bottom <= other.bottom
+            and other.top <= self.top
+        )
+
+    def subtract(self, other: "BoundaryBox") -> list["BoundaryBox"]:
+        """
+        Get parts of the boundary box not covered by another boundary box:
+        up to four boxes, bottom and top ones of the full width and left and
+        right ones between them.
+        """
+        if not self.intersects(other):
+            return [BoundaryBox(self.left, self.bottom, self.right, self.top)]
+
+        parts: list[BoundaryBox] = []
+        if self.bottom < other.bottom:
+            parts.append(
+                BoundaryBox(self.left, self.bottom, self.right, other.bottom)
+            )
+        if other.top < self.top:
+            parts.append(
+                BoundaryBox(self.left, other.top, self.right, self.top)
+            )
+
+        bottom: float = max(self.bottom, other.bottom)
+        top: float = min(self.top, other.top)
+        if self.left < other.left:
+            parts.append(BoundaryBox(self.left, bottom, other.left, top))
+        if other.right < self.right:
+            parts.append(BoundaryBox(other.right, bottom, self.right, top))
+
+        return parts
+
+    def split(self) -> list["BoundaryBox"]:
+        """Split boundary box into four quadrants."""
+        latitude: float = (self.bottom + self.top) / 2.0
+        longitude: float = (self.left + self.right) / 2.0
+        return [
+            BoundaryBox(self.left, self.bottom, longitude, latitude),
+            BoundaryBox(longitude, self.bottom, self.right, latitude),
+            BoundaryBox(self.left, latitude, longitude, self.top),
+            BoundaryBox(longitude, latitude, self.right, self.top),
+        ]
+
+    def extend(self, margin: float) -> "BoundaryBox":
+        """
+        Get boundary box extended on all sides.
+
+        :param margin: extension in fractions of the boundary box width and
+            height
+        """
+        width: float = self.right - self.left
+        height: float = self.top - self.bottom
+        return BoundaryBox(
+            self.left - width * margin,
+            self.bottom - height * margin,
+            self.right + width * margin,
+            self.top + height * margin,
+        )
@@ -1,33 +1,27 @@
 """Geo projection."""
-from typing import Optional
+from dataclasses import dataclass
+from typing import Optional, Sequence
 
 import numpy as np
 
 from map_machine.geometry.boundary_box import BoundaryBox
+from map_machine.geometry.mercator import (
+    get_scale_factors,
+    inverse_pseudo_mercator,
+    pseudo_mercator,
+    pseudo_mercator_many,
+)
+from map_machine.osm.osm_reader import (
+    NodeList,
+    NodeTable,
+    OSMNode,
+    get_coordinates,
+)
 
 __author__ = "Sergey Vartanov"
 __email__ = "me@enzet.ru"
 
 
-def pseudo_mercator(coordinates: np.ndarray) -> np.ndarray:
-    """
-    Use spherical pseudo-Mercator projection to convert geo coordinates.
-
-    The result is (x, y), where x is a longitude value, so x is in [-180, 180],
-    and y is a stretched latitude and may have any real value:
-    (-infinity, +infinity).
-
-    :param coordinates: geo positional in the form of (latitude, longitude)
-    :return: position on the plane in the form of (x, y)
-    """
-    latitude, longitude = coordinates
-
-    y: float = (
-        180.0 / np.pi * np.log(np.tan(np.pi / 4.0 + latitude * np.pi / 360.0))
-    )
-    return np.array((longitude, y))
-
-
 def osm_zoom_level_to_pixels_per_meter(
     zoom_level: float, equator_length: float
 ) -> float:
@@ -53,9 +47,64 @@ class Flinger:
         """Do nothing but return coordinates unchanged."""
         return coordinates
 
+    def fling_many(self, coordinates: np.ndarray) -> np.ndarray:
+        """
+        Convert array of coordinates at once.
+
+        :param coordinates: coordinates in the form of N × 2 array
+        :return: points in the form of N × 2 array
+        """
+        return np.array([self.fling(x) for x in coordinates]).reshape(-1, 2)
+
+    def fling_nodes(self, nodes: Sequence[OSMNode]) -> np.ndarray:
+        """
+        Convert coordinates of nodes.
+
+        :param nodes: node list
+        :return: points in the form of N × 2 array
+        """
+        return self.fling_many(get_coordinates(nodes))
+
+    def fling_node(self, node: OSMNode) -> np.ndarray:
+        """Convert coordinates of the node."""
+        return self.fling(node.coordinates)
+
+    def fling_table(self, table: NodeTable, rows: np.ndarray) -> np.ndarray:
+        """
+        Convert coordinates of nodes in the node table.
+
+        :param table: node table
+        :param rows: row indices of nodes
+        :return: points in the form of N × 2 array
+        """
+        return self.fling_many(table.coordinates_buffer[rows])
+
+    def get_scale_table(self, table: NodeTable, rows: np.ndarray) -> np.ndarray:
+        """
+        Get scales for nodes in the node table.
+
+        :param table: node table
+        :param rows: row indices of nodes
+        """
+        return self.get_scale_many(table.coordinates_buffer[rows])
+
+    def get_scale_nodes(self, nodes: Sequence[OSMNode]) -> np.ndarray:
+        """Get scales for nodes."""
+        if isinstance(nodes, NodeList):
+            return self.get_scale_table(nodes.table, nodes.rows)
+        return self.get_scale_many(get_coordinates(nodes))
+
     def get_scale(self, coordinates: Optional[np.ndarray] = None) -> float:
         return 1.0
 
+    def get_scale_many(self, coordinates: np.ndarray) -> np.ndarray:
+        """
+        Get scales for array of coordinates at once.
+
+        :param coordinates: coordinates in the form of N × 2 array
+        """
+        return np.array([self.get_scale(x) for x in coordinates])
+
 
 class MercatorFlinger(Flinger):
     """Convert geographical coordinates into (x, y) points on the plane."""
@@ -88,6 +137,20 @@ class MercatorFlinger(Flinger):
 
         self.min_ = self.ratio * pseudo_mercator(self.geo_boundaries.min_())
 
+    def get_extended_boundaries(self, margin: float) -> BoundaryBox:
+        """
+        Get geo boundary box of the image extended on all sides.
+
+        :param margin: extension in pixels
+        """
+        bottom, left = inverse_pseudo_mercator(
+            pseudo_mercator(self.geo_boundaries.min_()) - margin / self.ratio
+        )
+        top, right = inverse_pseudo_mercator(
+            pseudo_mercator(self.geo_boundaries.max_()) + margin / self.ratio
+        )
+        return BoundaryBox(float(left), float(bottom), float(right), float(top))
+
     def fling(self, coordinates: np.ndarray) -> np.ndarray:
         """
         Convert geo coordinates into (x, y) position points on the plane.
@@ -104,6 +167,46 @@ class MercatorFlinger(Flinger):
 
         return result
 
+    def fling_many(self, coordinates: np.ndarray) -> np.ndarray:
+        """
+        Convert array of geo coordinates into (x, y) points on the plane in
+        one vectorized operation.
+
+        :param coordinates: geographical coordinates to fling in the form of
+            N × (latitude, longitude)
+        :return: points in the form of N × (x, y)
+        """
+        return self.fling_world(
+            pseudo_mercator_many(
+                np.asarray(coordinates, dtype=float).reshape(-1, 2)
+            )
+        )
+
+    def fling_world(self, world_coordinates: np.ndarray) -> np.ndarray:
+        """
+        Convert zoom-independent pseudo-Mercator coordinates into (x, y)
+        points on the plane.  This is an affine transformation only.
+
+        :param world_coordinates: pseudo-Mercator coordinates in the form of
+            N × (x, y)
+        :return: points in the form of N × (x, y)
+        """
+        result: np.ndarray = self.ratio * world_coordinates
+        result[:, 0] -= self.min_[0]
+
+        # Invert y axis on coordinate plane.
+        np.subtract(self.size[1] + self.min_[1], result[:, 1], out=result[:, 1])
+
+        return result
+
+    def fling_table(self, table: NodeTable, rows: np.ndarray) -> np.ndarray:
+        """
+        Convert coordinates of nodes in the node table using pseudo-Mercator
+        coordinates cached in the table, so that they are computed once for
+        all zoom levels.
+        """
+        return self.fling_world(table.get_world_coordinates(rows))
+
     def get_scale(self, coordinates: Optional[np.ndarray] = None) -> float:
         """
         Return pixels per meter ratio for the given geo coordinates.
@@ -118,6 +221,25 @@ class MercatorFlinger(Flinger):
         scale_factor: float = abs(1.0 / np.cos(coordinates[0] / 180.0 * np.pi))
         return self.pixels_per_meter * scale_factor
 
+    def get_scale_many(self, coordinates: np.ndarray) -> np.ndarray:
+        """
+        Return pixels per meter ratios for array of geo coordinates.
+
+        :param coordinates: geographical coordinates in the form of
+            N × (latitude, longitude)
+        """
+        latitudes: np.ndarray = np.asarray(coordinates, dtype=float).reshape(
+            -1, 2
+        )[:, 0]
+        return self.pixels_per_meter * get_scale_factors(latitudes)
+
+    def get_scale_table(self, table: NodeTable, rows: np.ndarray) -> np.ndarray:
+        """
+        Get scales for nodes in the node table using scale factors cached in
+        the table, so that they are computed once for all zoom levels.
+        """
+        return self.pixels_per_meter * table.get_scale_factors(rows)
+
 
 class TranslateFlinger(Flinger):
     def __init__(
@@ -129,3 +251,118 @@ class TranslateFlinger(Flinger):
 
     def fling(self, coordinates: np.ndarray) -> np.ndarray:
         return self.scale * (coordinates + self.offset)
+
+    def fling_many(self, coordinates: np.ndarray) -> np.ndarray:
+        return self.scale * (
+            np.asarray(coordinates, dtype=float).reshape(-1, 2) + self.offset
+        )
+
+
+@dataclass
+class ProjectionStatistics:
+    """Counters of projected coordinate cache usage."""
+
+    # Number of nodes projected and stored in the cache.
+    projected: int = 0
+    # Number of node positions taken from the cache.
+    hits: int = 0
+    # Number of node positions projected without the cache, because nodes are
+    # not in the node table.
+    uncached: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.projected} nodes projected, {self.hits} cache hits, "
+            f"{self.uncached} uncached"
+        )
+
+
+class CachedFlinger(Flinger):
+    """
+    Flinger that projects every node of the node table at most once.
+
+    Projected points are stored by node table rows, so that all features
+    referencing the same node share its position during the render.
+    """
+
+    def __init__(self, flinger: Flinger, node_table: NodeTable) -> None:
+        """
+        :param flinger: flinger that does the projection
+        :param node_table: nodes to project
+        """
+        super().__init__(flinger.size)
+        self.flinger: Flinger = flinger
+        self.node_table: NodeTable = node_table
+        self.points: np.ndarray = np.empty((node_table.size, 2))
+        self.projected: np.ndarray = np.zeros(node_table.size, dtype=bool)
+        self.statistics: ProjectionStatistics = ProjectionStatistics()
+
+    def fling(self, coordinates: np.ndarray) -> np.ndarray:
+        return self.flinger.fling(coordinates)
+
+    def fling_many(self, coordinates: np.ndarray) -> np.ndarray:
+        return self.flinger.fling_many(coordinates)
+
+    def get_scale(self, coordinates: Optional[np.ndarray] = None) -> float:
+        return self.flinger.get_scale(coordinates)
+
+    def get_scale_many(self, coordinates: np.ndarray) -> np.ndarray:
+        return self.flinger.get_scale_many(coordinates)
+
+    def get_scale_table(self, table: NodeTable, rows: np.ndarray) -> np.ndarray:
+        return self.flinger.get_scale_table(table, rows)
+
+    def grow(self) -> None:
+        """Extend the cache to nodes added to the table."""
+        size: int = self.node_table.size
+        points: np.ndarray = np.empty((size, 2))
+        points[: len(self.points)] = self.points
+        projected: np.ndarray = np.zeros(size, dtype=bool)
+        projected[: len(self.projected)] = self.projected
+        self.points, self.projected = points, projected
+
+    def fling_rows(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Get points of nodes by row indices in the node table, projecting
+        nodes that are not in the cache yet.
+
+        :param rows: row indices
+        :return: points in the form of N × 2 array
+        """
+        if self.node_table.size > len(self.projected):
+            self.grow()
+
+        new_rows: np.ndarray = np.unique(rows[~self.projected[rows]])
+        if len(new_rows):
+            self.points[new_rows] = self.flinger.fling_table(
+                self.node_table, new_rows
+            )
+            self.projected[new_rows] = True
+            self.statistics.projected += len(new_rows)
+        self.statistics.hits += len(rows) - len(new_rows)
+
+        return self.points[rows]
+
+    def fling_nodes(self, nodes: Sequence[OSMNode]) -> np.ndarray:
+        if isinstance(nodes, NodeList) and nodes.table is self.node_table:
+            return self.fling_rows(nodes.rows)
+
+        index: dict[int, int] = self.node_table.index
+        if all(node.id_ in index for node in nodes):
+            return self.fling_rows(
+                np.fromiter(
+                    (index[node.id_] for node in nodes),
+                    dtype=np.int64,
+                    count=len(nodes),
+                )
+            )
+
+        self.statistics.uncached += len(nodes)
+        return self.flinger.fling_nodes(nodes)
+
+    def fling_node(self, node: OSMNode) -> np.ndarray:
+        row: Optional[int] = self.node_table.index.get(node.id_)
+        if row is None:
+            self.statistics.uncached += 1
+            return self.flinger.fling_node(node)
+        return self.fling_rows(np.array((row,)))[0]
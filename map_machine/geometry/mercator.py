@@ -0,0 +1,63 @@
+"""Spherical pseudo-Mercator projection independent of zoom level."""
+import numpy as np
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+
+def pseudo_mercator(coordinates: np.ndarray) -> np.ndarray:
+    """
+    Use spherical pseudo-Mercator projection to convert geo coordinates.
+
+    The result is (x, y), where x is a longitude value, so x is in [-180, 180],
+    and y is a stretched latitude and may have any real value:
+    (-infinity, +infinity).
+
+    :param coordinates: geo positional in the form of (latitude, longitude)
+    :return: position on the plane in the form of (x, y)
+    """
+    latitude, longitude = coordinates
+
+    y: float = (
+        180.0 / np.pi * np.log(np.tan(np.pi / 4.0 + latitude * np.pi / 360.0))
+    )
+    return np.array((longitude, y))
+
+
+def pseudo_mercator_many(coordinates: np.ndarray) -> np.ndarray:
+    """
+    Use spherical pseudo-Mercator projection to convert array of geo
+    coordinates at once.
+
+    :param coordinates: geo positions in the form of N × (latitude, longitude)
+    :return: positions on the plane in the form of N × (x, y)
+    """
+    result: np.ndarray = np.empty((len(coordinates), 2))
+    result[:, 0] = coordinates[:, 1]
+    result[:, 1] = np.log(
+        np.tan(np.pi / 4.0 + coordinates[:, 0] * np.pi / 360.0)
+    )
+    result[:, 1] *= 180.0 / np.pi
+    return result
+
+
+def inverse_pseudo_mercator(point: np.ndarray) -> np.ndarray:
+    """
+    Convert position on the plane back to geo coordinates.
+
+    :param point: position on the plane in the form of (x, y)
+    :return: geo position in the form of (latitude, longitude)
+    """
+    x, y = point
+    latitude: float = 180.0 / np.pi * np.arctan(np.sinh(y * np.pi / 180.0))
+    return np.array((latitude, x))
+
+
+def get_scale_factors(latitudes: np.ndarray) -> np.ndarray:
+    """
+    Get stretching of pseudo-Mercator projection relative to the equator.
+
+    :param latitudes: latitudes in degrees
+    :return: absolute values of 1 / cos(latitude)
+    """
+    return np.abs(1.0 / np.cos(latitudes / 180.0 * np.pi))
@@ -6,6 +6,7 @@ from typing import Optional, Any
 
 from colour import Color
 
+from map_machine.osm.osm_reader import MetadataMode
 from map_machine.pictogram.icon import ShapeExtractor, IconSet
 from map_machine.scheme import Scheme
 
@@ -91,6 +92,12 @@ class MapConfiguration:
         """Whether drawing mode is special."""
         return self.drawing_mode != DrawingMode.NORMAL
 
+    def get_metadata_mode(self) -> MetadataMode:
+        """Get metadata of OSM elements required for the drawing mode."""
+        if self.drawing_mode in (DrawingMode.AUTHOR, DrawingMode.TIME):
+            return MetadataMode.FULL
+        return MetadataMode.SKIP
+
     def background_color(self) -> Optional[Color]:
         """Get background map color based on drawing mode."""
         if self.drawing_mode not in (DrawingMode.NORMAL, DrawingMode.BLACK):
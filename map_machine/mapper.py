@@ -13,6 +13,7 @@ from svgwrite.path import Path as SVGPath
 from svgwrite.shapes import Rect
 
 from map_machine import __project__
+from map_machine.cache import CacheManager
 from map_machine.constructor import Constructor
 from map_machine.drawing import draw_text
 from map_machine.feature.building import Building, draw_walls, BUILDING_SCALE
@@ -22,8 +23,10 @@ from map_machine.geometry.boundary_box import BoundaryBox
 from map_machine.geometry.flinger import Flinger, MercatorFlinger
 from map_machine.geometry.vector import Segment
 from map_machine.map_configuration import LabelMode, MapConfiguration
+from map_machine.osm.compression import Compression
 from map_machine.osm.osm_getter import NetworkError, get_osm
 from map_machine.osm.osm_reader import OSMData, OSMNode
+from map_machine.osm.snapshot import read_osm_data
 from map_machine.pictogram.icon import ShapeExtractor
 from map_machine.pictogram.point import Occupied, Point
 from map_machine.scheme import Scheme
@@ -57,6 +60,8 @@ class Map:
 
     def draw(self, constructor: Constructor) -> None:
         """Draw map."""
+        # Use the flinger of the constructor to share projected nodes.
+        self.flinger = constructor.flinger
         self.svg.add(
             Rect((0.0, 0.0), self.flinger.size, fill=self.background_color)
         )
@@ -141,6 +146,8 @@ class Map:
         if self.configuration.show_credit:
             self.draw_credits(constructor.flinger.size)
 
+        logging.debug(f"Projection: {constructor.flinger.statistics}.")
+
     def draw_buildings(
         self, constructor: Constructor, use_building_colors: bool
     ) -> None:
@@ -205,12 +212,14 @@ class Map:
         nodes: dict[OSMNode, set[RoadPart]] = {}
 
         for road in roads:
+            points: np.ndarray = self.flinger.fling_nodes(road.nodes)
+            scales: np.ndarray = self.flinger.get_scale_nodes(road.nodes)
             for index in range(len(road.nodes) - 1):
                 node_1: OSMNode = road.nodes[index]
                 node_2: OSMNode = road.nodes[index + 1]
-                point_1: np.ndarray = self.flinger.fling(node_1.coordinates)
-                point_2: np.ndarray = self.flinger.fling(node_2.coordinates)
-                scale: float = self.flinger.get_scale(node_1.coordinates)
+                point_1: np.ndarray = points[index]
+                point_2: np.ndarray = points[index + 1]
+                scale: float = scales[index]
                 part_1: RoadPart = RoadPart(point_1, point_2, road.lanes, scale)
                 part_2: RoadPart = RoadPart(point_2, point_1, road.lanes, scale)
                 # part_1.draw_normal(self.svg)
@@ -335,37 +344,40 @@ def render_map(arguments: argparse.Namespace) -> None:
             coordinates, configuration.zoom_level, width, height
         )
 
-    # Determine files.
+    # Get OpenStreetMap data.
 
-    input_file_names: Optional[list[Path]] = None
+    osm_data: OSMData = OSMData(configuration.get_metadata_mode())
     if arguments.input_file_names:
-        input_file_names = list(map(Path, arguments.input_file_names))
+        for input_file_name in map(Path, arguments.input_file_names):
+            if not input_file_name.is_file():
+                logging.fatal(f"No such file: {input_file_name}.")
+                sys.exit(1)
+
+            osm_data.parse_file(
+                input_file_name, boundary_box, arguments.parse_workers
+            )
     elif boundary_box:
+        compression: Compression = Compression(arguments.cache_compression)
         try:
             cache_file_path: Path = (
-                cache_path / f"{boundary_box.get_format()}.osm"
+                cache_path
+                / f"{boundary_box.get_format()}.osm{compression.suffix}"
+            )
+            get_osm(
+                boundary_box,
+                cache_file_path,
+                compression=compression,
+                cache_manager=CacheManager.from_options(arguments),
             )
-            get_osm(boundary_box, cache_file_path)
-            input_file_names = [cache_file_path]
         except NetworkError as error:
             logging.fatal(error.message)
             sys.exit(1)
+        osm_data = read_osm_data(
+            cache_file_path, configuration.get_metadata_mode()
+        )
     else:
         fatal("Specify either --input, or --boundary-box, or --coordinates.")
 
-    # Get OpenStreetMap data.
-
-    osm_data: OSMData = OSMData()
-    for input_file_name in input_file_names:
-        if not input_file_name.is_file():
-            logging.fatal(f"No such file: {input_file_name}.")
-            sys.exit(1)
-
-        if input_file_name.name.endswith(".json"):
-            osm_data.parse_overpass(input_file_name)
-        else:
-            osm_data.parse_osm_file(input_file_name)
-
     if not boundary_box:
         boundary_box = osm_data.view_box
     if not boundary_box:
@@ -0,0 +1,88 @@
+"""
+Compressed input files.
+
+Compression is detected by magic bytes, so files may have any names.  Files
+are decompressed while they are read, no intermediate files are written.
+"""
+import bz2
+import gzip
+import lzma
+from enum import Enum
+from pathlib import Path
+from typing import BinaryIO
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+
+class Compression(Enum):
+    """Compression format of OSM data file."""
+
+    NONE = "none"
+    GZIP = "gzip"
+    BZIP2 = "bz2"
+    XZ = "xz"
+
+    @property
+    def suffix(self) -> str:
+        """File name suffix of the compressed file."""
+        return COMPRESSION_SUFFIXES[self]
+
+
+COMPRESSION_SUFFIXES: dict[Compression, str] = {
+    Compression.NONE: "",
+    Compression.GZIP: ".gz",
+    Compression.BZIP2: ".bz2",
+    Compression.XZ: ".xz",
+}
+MAGIC_BYTES: dict[Compression, bytes] = {
+    Compression.GZIP: b"\x1f\x8b",
+    Compression.BZIP2: b"BZh",
+    Compression.XZ: b"\xfd7zXZ\x00",
+}
+
+
+def detect_compression(path: Path) -> Compression:
+    """Detect compression of the file by its first bytes."""
+    with path.open("rb") as input_file:
+        header: bytes = input_file.read(max(map(len, MAGIC_BYTES.values())))
+
+    for compression, magic_bytes in MAGIC_BYTES.items():
+        if header.startswith(magic_bytes):
+            return compression
+    return Compression.NONE
+
+
+def open_input_file(path: Path) -> BinaryIO:
+    """
+    Open possibly compressed file for reading.  Data is decompressed on the
+    fly.
+    """
+    compression: Compression = detect_compression(path)
+
+    if compression == Compression.GZIP:
+        return gzip.open(path, "rb")
+    if compression == Compression.BZIP2:
+        return bz2.open(path, "rb")
+    if compression == Compression.XZ:
+        return lzma.open(path, "rb")
+    return path.open("rb")
+
+
+def compress(content: bytes, compression: Compression) -> bytes:
+    """Compress data with the specified format."""
+    if compression == Compression.GZIP:
+        return gzip.compress(content)
+    if compression == Compression.BZIP2:
+        return bz2.compress(content)
+    if compression == Compression.XZ:
+        return lzma.compress(content)
+    return content
+
+
+def get_uncompressed_name(path: Path) -> str:
+    """Get file name without compression suffix: `map.osm.gz` → `map.osm`."""
+    for suffix in COMPRESSION_SUFFIXES.values():
+        if suffix and path.name.endswith(suffix):
+            return path.name[: -len(suffix)]
+    return path.name
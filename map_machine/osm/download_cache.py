@@ -0,0 +1,250 @@
+"""
+Cache of downloaded OpenStreetMap data with known coverage.
+
+Every cached file is recorded in the index together with its boundary box.
+Data for a new boundary box is extracted from cached files covering it, and
+only uncovered parts are downloaded.  The index also records boundary boxes
+with too many nodes to be downloaded at once, so they are split without
+trying.
+"""
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+from xml.etree import ElementTree
+
+from map_machine.cache import CacheManager
+from map_machine.geometry.boundary_box import BoundaryBox
+from map_machine.osm.osm_reader import get_xml_node_ids, iterate_xml_elements
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+INDEX_FILE_NAME: str = "index.json"
+# Uncovered parts narrower than this in degrees are ignored.
+MIN_PART_SIZE: float = 1e-7
+
+
+@dataclass
+class CachedFile:
+    """OSM data file with all map elements inside the boundary box."""
+
+    path: Path
+    boundary_box: BoundaryBox
+
+
+class CacheIndex:
+    """
+    Coverage of OSM data files in the cache directory, stored as JSON file in
+    the same directory.
+
+    Index is reread for every request, so it may be shared by several
+    processes.  Simultaneous updates from different processes may lose
+    records, which only leads to repeated downloads.
+    """
+
+    lock: threading.Lock = threading.Lock()
+
+    def __init__(
+        self, cache_path: Path, cache_manager: Optional[CacheManager] = None
+    ) -> None:
+        """
+        :param cache_path: directory with cached OSM data files
+        :param cache_manager: manager of the cache directory size, it is
+            notified about new files
+        """
+        self.cache_path: Path = cache_path
+        self.cache_manager: Optional[CacheManager] = cache_manager
+        self.path: Path = cache_path / INDEX_FILE_NAME
+
+    def read_structure(self) -> dict[str, list]:
+        """Read the index file."""
+        structure: dict[str, list] = {"files": [], "oversized": []}
+        if not self.path.is_file():
+            return structure
+        try:
+            with self.path.open(encoding="utf-8") as input_file:
+                structure.update(json.load(input_file))
+        except json.JSONDecodeError:
+            logging.warning(f"Cache index {self.path} is broken.")
+        return structure
+
+    def write_structure(self, structure: dict[str, list]) -> None:
+        """
+        Replace the index file at once, so that readers never see a
+        partially written file.
+        """
+        temporary_path: Path = self.path.with_name(
+            f"{INDEX_FILE_NAME}.{os.getpid()}.{threading.get_ident()}"
+        )
+        with temporary_path.open("w", encoding="utf-8") as output_file:
+            json.dump(structure, output_file)
+        temporary_path.replace(self.path)
+
+    def read(self) -> list[CachedFile]:
+        """Get all recorded files in the order of adding."""
+        return [
+            CachedFile(self.cache_path / x["file"], BoundaryBox(*x["bbox"]))
+            for x in self.read_structure()["files"]
+        ]
+
+    def add(self, path: Path, boundary_box: BoundaryBox) -> None:
+        """
+        Record cached file.  Records of removed files are dropped.
+
+        :param path: file in the cache directory
+        :param boundary_box: area where the file has all map elements
+        """
+        with self.lock:
+            structure: dict[str, list] = self.read_structure()
+            structure["files"] = [
+                x
+                for x in structure["files"]
+                if x["file"] != path.name
+                and (self.cache_path / x["file"]).is_file()
+            ]
+            structure["files"].append(
+                {"file": path.name, "bbox": get_coordinates(boundary_box)}
+            )
+            self.write_structure(structure)
+
+        if self.cache_manager is not None:
+            self.cache_manager.add(path)
+
+    def add_oversized(self, boundary_box: BoundaryBox) -> None:
+        """Record boundary box with too many nodes to download at once."""
+        with self.lock:
+            structure: dict[str, list] = self.read_structure()
+            structure["oversized"].append(get_coordinates(boundary_box))
+            self.write_structure(structure)
+
+    def is_oversized(self, boundary_box: BoundaryBox) -> bool:
+        """
+        Check whether the boundary box has too many nodes to download at
+        once: it contains a boundary box known to have too many nodes.
+        """
+        return any(
+            boundary_box.contains(BoundaryBox(*x))
+            for x in self.read_structure()["oversized"]
+        )
+
+    def find(self, boundary_box: BoundaryBox) -> list[CachedFile]:
+        """Get existing files intersecting the boundary box, newest first."""
+        return [
+            x
+            for x in reversed(self.read())
+            if x.boundary_box.intersects(boundary_box) and x.path.is_file()
+        ]
+
+
+def get_coordinates(boundary_box: BoundaryBox) -> list[float]:
+    """Get boundary box as it is stored in the index."""
+    return [
+        boundary_box.left,
+        boundary_box.bottom,
+        boundary_box.right,
+        boundary_box.top,
+    ]
+
+
+def get_uncovered_parts(
+    boundary_box: BoundaryBox, covering: list[BoundaryBox]
+) -> list[BoundaryBox]:
+    """Split the area not covered by boundary boxes into boundary boxes."""
+    parts: list[BoundaryBox] = [boundary_box]
+    for other in covering:
+        parts = [x for part in parts for x in part.subtract(other)]
+    return [
+        x
+        for x in parts
+        if x.right - x.left > MIN_PART_SIZE and x.top - x.bottom > MIN_PART_SIZE
+    ]
+
+
+def crop_xml_files(paths: list[Path], boundary_box: BoundaryBox) -> bytes:
+    """
+    Construct OSM XML data for the boundary box from OSM XML files: nodes
+    inside the boundary box, ways that reference them with all their nodes,
+    and relations that reference kept elements.  Elements found in several
+    files are taken from the first one.
+
+    Every file should be complete, as downloaded from the OpenStreetMap API:
+    files should have all nodes of their ways.
+
+    :param paths: OSM XML files, possibly compressed
+    :param boundary_box: area of the new data
+    """
+    nodes: dict[int, bytes] = {}
+    ways: dict[int, bytes] = {}
+    relations: dict[int, bytes] = {}
+    kept: dict[str, dict[int, bytes]] = {
+        "node": nodes,
+        "way": ways,
+        "relation": relations,
+    }
+
+    for path in paths:
+        nodes_in_box: set[int] = set()
+        missing: set[int] = set()
+
+        for element in iterate_xml_elements(path):
+            if element.tag == "node":
+                attributes = element.attrib
+                latitude: float = float(attributes["lat"])
+                longitude: float = float(attributes["lon"])
+                if (
+                    boundary_box.bottom <= latitude <= boundary_box.top
+                    and boundary_box.left <= longitude <= boundary_box.right
+                ):
+                    id_: int = int(attributes["id"])
+                    nodes_in_box.add(id_)
+                    nodes.setdefault(id_, ElementTree.tostring(element))
+            elif element.tag == "way":
+                node_ids: list[int] = get_xml_node_ids(element)
+                if any(x in nodes_in_box for x in node_ids):
+                    ways.setdefault(
+                        int(element.attrib["id"]), ElementTree.tostring(element)
+                    )
+                    missing.update(x for x in node_ids if x not in nodes)
+            elif element.tag == "relation":
+                if any(
+                    int(member.attrib["ref"])
+                    in kept.get(member.attrib["type"], {})
+                    for member in element.findall("member")
+                ):
+                    relations.setdefault(
+                        int(element.attrib["id"]), ElementTree.tostring(element)
+                    )
+
+        if not missing:
+            continue
+
+        # Nodes outside the boundary box are found after the ways that
+        # reference them.
+        for element in iterate_xml_elements(path):
+            if element.tag != "node":
+                continue
+            id_: int = int(element.attrib["id"])
+            if id_ in missing:
+                nodes.setdefault(id_, ElementTree.tostring(element))
+                missing.remove(id_)
+                if not missing:
+                    break
+
+    parts: list[bytes] = [
+        b'<?xml version="1.0" encoding="UTF-8"?>\n',
+        b'<osm version="0.6" generator="Map Machine">\n',
+        (
+            f' <bounds minlat="{boundary_box.bottom}" '
+            f'minlon="{boundary_box.left}" maxlat="{boundary_box.top}" '
+            f'maxlon="{boundary_box.right}"/>\n'
+        ).encode(),
+    ]
+    for elements in nodes, ways, relations:
+        parts += [b" " + elements[x].strip() + b"\n" for x in sorted(elements)]
+    parts.append(b"</osm>\n")
+
+    return b"".join(parts)
@@ -1,17 +1,46 @@
 """Getting OpenStreetMap data from the web."""
 import logging
+import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 
 import urllib3
 
+from map_machine.cache import CacheManager
 from map_machine.geometry.boundary_box import BoundaryBox
+from map_machine.osm.compression import Compression, compress, open_input_file
+from map_machine.osm.download_cache import (
+    CacheIndex,
+    CachedFile,
+    crop_xml_files,
+    get_uncovered_parts,
+)
 
 __author__ = "Sergey Vartanov"
 __email__ = "me@enzet.ru"
 
-SLEEP_TIME_BETWEEN_REQUESTS: float = 2.0
+OSM_API_ADDRESS: str = "https://api.openstreetmap.org/api/0.6/map"
+
+# Sustained request rate and the number of requests that may be sent at once
+# after a pause.
+REQUESTS_PER_SECOND: float = 0.5
+BURST_SIZE: int = 4
+# Maximum number of simultaneous downloads.
+MAX_DOWNLOADS: int = 4
+# Number of attempts for one request and the base delay between attempts in
+# seconds, the delay is doubled after every attempt.
+ATTEMPTS: int = 4
+BACKOFF_TIME: float = 2.0
+TIMEOUT: float = 180.0
+# Server responses that are worth retrying.
+RETRY_STATUSES: set[int] = {429, 500, 502, 503, 504}
+# Boundary boxes with too many nodes are split into quadrants while they are
+# larger than this in degrees: API requests are rounded to 0.001 degrees.
+MIN_SPLIT_SIZE: float = 0.002
 
 
 @dataclass
@@ -21,8 +50,351 @@ class NetworkError(Exception):
     message: str
 
 
+@dataclass
+class TooManyNodesError(NetworkError):
+    """OpenStreetMap API refused to return data with too many nodes."""
+
+
+class RateLimiter:
+    """
+    Token bucket: requests are allowed at the sustained rate, and unused
+    allowance is accumulated up to the bucket capacity.  Thread-safe.
+    """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        """
+        :param rate: number of requests per second
+        :param capacity: maximum number of requests sent without waiting
+        """
+        self.rate: float = rate
+        self.capacity: float = float(capacity)
+        self.tokens: float = float(capacity)
+        self.last_time: float = time.monotonic()
+        self.lock: threading.Lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Wait until a request is allowed."""
+        while True:
+            with self.lock:
+                now: float = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.last_time) * self.rate,
+                )
+                self.last_time = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                waiting_time: float = (1.0 - self.tokens) / self.rate
+            time.sleep(waiting_time)
+
+
+class Downloader:
+    """
+    Downloader of OpenStreetMap data with one shared connection pool.  Number
+    of requests is limited by the rate limiter, failed requests are retried
+    with exponential backoff and random jitter.
+    """
+
+    def __init__(
+        self,
+        address: str = OSM_API_ADDRESS,
+        rate: float = REQUESTS_PER_SECOND,
+        burst_size: int = BURST_SIZE,
+        max_downloads: int = MAX_DOWNLOADS,
+        attempts: int = ATTEMPTS,
+        backoff_time: float = BACKOFF_TIME,
+    ) -> None:
+        """
+        :param address: OpenStreetMap API map request URL
+        :param rate: sustained number of requests per second
+        :param burst_size: maximum number of requests sent without waiting
+        :param max_downloads: maximum number of simultaneous downloads
+        :param attempts: maximum number of attempts for one request
+        :param backoff_time: delay before the second attempt in seconds
+        """
+        self.address: str = address
+        self.max_downloads: int = max_downloads
+        self.attempts: int = attempts
+        self.backoff_time: float = backoff_time
+        self.rate_limiter: RateLimiter = RateLimiter(rate, burst_size)
+        urllib3.disable_warnings()
+        self.pool_manager: urllib3.PoolManager = urllib3.PoolManager(
+            maxsize=max_downloads, block=True
+        )
+
+    def get_data(self, address: str, parameters: dict[str, str]) -> bytes:
+        """
+        Construct Internet page URL and get its content.
+
+        :param address: URL without parameters
+        :param parameters: URL parameters
+        :return: response content
+        """
+        for attempt in range(self.attempts):
+            if attempt:
+                delay: float = self.backoff_time * 2 ** (attempt - 1)
+                time.sleep(random.uniform(delay / 2.0, delay))
+
+            self.rate_limiter.acquire()
+            logging.info(f"Getting {address}...")
+            try:
+                result = self.pool_manager.request(
+                    "GET",
+                    address,
+                    fields=parameters,
+                    retries=False,
+                    timeout=TIMEOUT,
+                )
+            except urllib3.exceptions.HTTPError as error:
+                logging.warning(f"Request to {address} failed: {error}.")
+                continue
+
+            if result.status not in RETRY_STATUSES:
+                return result.data
+            logging.warning(
+                f"Request to {address} failed with status {result.status}."
+            )
+
+        raise NetworkError("Cannot download data: too many attempts.")
+
+    def download(self, boundary_box: BoundaryBox) -> bytes:
+        """Download OSM XML data for the boundary box from the web."""
+        content: bytes = self.get_data(
+            self.address, {"bbox": boundary_box.get_format()}
+        )
+
+        if not content.startswith(b"<"):
+            if content == (
+                b"You requested too many nodes (limit is 50000). Either "
+                b"request a smaller area, or use planet.osm"
+            ):
+                raise TooManyNodesError(
+                    "Cannot download data: too many nodes (limit is 50000). "
+                    "Try to request smaller area."
+                )
+
+            raise NetworkError("Cannot download data.")
+
+        return content
+
+    def download_file(
+        self,
+        boundary_box: BoundaryBox,
+        path: Path,
+        compression: Compression,
+        cache_index: CacheIndex,
+    ) -> Optional[CachedFile]:
+        """
+        Download data for the boundary box into the cache file.
+
+        :return: cached file or None if the boundary box has too many nodes
+        """
+        if cache_index.is_oversized(boundary_box):
+            return None
+        try:
+            content: bytes = self.download(boundary_box)
+        except TooManyNodesError:
+            cache_index.add_oversized(boundary_box)
+            return None
+
+        with path.open("bw+") as output_file:
+            output_file.write(compress(content, compression))
+        cache_index.add(path, boundary_box)
+
+        return CachedFile(path, boundary_box)
+
+    def download_parts(
+        self,
+        boundary_box: BoundaryBox,
+        path: Path,
+        compression: Compression,
+        cache_index: CacheIndex,
+    ) -> list[CachedFile]:
+        """
+        Download data for the boundary box into cache files.  Boundary boxes
+        with too many nodes are split into quadrants recursively, quadrants of
+        one level are downloaded simultaneously.
+
+        :param boundary_box: area to download
+        :param path: cache file for the whole boundary box, quadrants are
+            stored in files named after their boundary boxes
+        :param compression: compression of new cache files
+        :param cache_index: index of the cache directory
+        """
+        cached_file: Optional[CachedFile] = self.download_file(
+            boundary_box, path, compression, cache_index
+        )
+        if cached_file is not None:
+            return [cached_file]
+
+        files: list[CachedFile] = []
+        parts: list[BoundaryBox] = [boundary_box]
+
+        with ThreadPoolExecutor(self.max_downloads) as executor:
+            while parts:
+                if any(
+                    x.right - x.left < MIN_SPLIT_SIZE
+                    or x.top - x.bottom < MIN_SPLIT_SIZE
+                    for x in parts
+                ):
+                    raise TooManyNodesError(
+                        "Cannot download data: too many nodes in a small "
+                        "area."
+                    )
+                parts = [x for part in parts for x in part.split()]
+                logging.info(f"Splitting request into {len(parts)} parts...")
+                results: list[Optional[CachedFile]] = list(
+                    executor.map(
+                        lambda x: self.download_file(
+                            x,
+                            path.parent
+                            / f"{x.get_format()}.osm{compression.suffix}",
+                            compression,
+                            cache_index,
+                        ),
+                        parts,
+                    )
+                )
+                files += [x for x in results if x is not None]
+                parts = [
+                    part
+                    for part, result in zip(parts, results)
+                    if result is None
+                ]
+
+        return files
+
+    def get_osm(
+        self,
+        boundary_box: BoundaryBox,
+        cache_file_path: Path,
+        to_update: bool = False,
+        compression: Compression = Compression.NONE,
+        cache_manager: Optional[CacheManager] = None,
+    ) -> str:
+        """
+        Download OSM data from the web or get if from the cache.
+
+        If other cached files in the cache directory intersect the boundary
+        box, data is extracted from them, and only the parts of the boundary
+        box they do not cover are downloaded.  Parts with too many nodes are
+        downloaded by quadrants.
+
+        :param boundary_box: borders of the map part to download
+        :param cache_file_path: cache file to store downloaded OSM data
+        :param to_update: update cache files
+        :param compression: compression of the new cache file; existing
+            cache file may have any compression
+        :param cache_manager: manager of the cache directory size
+        """
+        if not to_update and (
+            cache_file_path.is_file()
+            if cache_manager is None
+            else cache_manager.lookup(cache_file_path)
+        ):
+            with open_input_file(cache_file_path) as input_file:
+                return input_file.read().decode("utf-8")
+
+        # Cache file name is given by the rounded boundary box, so the file
+        # should have all elements inside the rounded boundary box.
+        boundary_box = BoundaryBox.from_text(boundary_box.get_format())
+
+        cache_path: Path = cache_file_path.parent
+        cache_index: CacheIndex = CacheIndex(cache_path, cache_manager)
+        cached: list[CachedFile] = (
+            [] if to_update else cache_index.find(boundary_box)
+        )
+        if cache_manager is not None:
+            for cached_file in cached:
+                cache_manager.touch(cached_file.path)
+
+        files: list[CachedFile] = []
+        if cached:
+            for part in get_uncovered_parts(
+                boundary_box, [x.boundary_box for x in cached]
+            ):
+                files += self.download_parts(
+                    part,
+                    cache_path / f"{part.get_format()}.osm{compression.suffix}",
+                    compression,
+                    cache_index,
+                )
+        else:
+            files = self.download_parts(
+                boundary_box, cache_file_path, compression, cache_index
+            )
+            if files == [CachedFile(cache_file_path, boundary_box)]:
+                with open_input_file(cache_file_path) as input_file:
+                    return input_file.read().decode("utf-8")
+
+        content: bytes = crop_xml_files(
+            [x.path for x in files + cached], boundary_box
+        )
+        with cache_file_path.open("bw+") as output_file:
+            output_file.write(compress(content, compression))
+        cache_index.add(cache_file_path, boundary_box)
+
+        return content.decode("utf-8")
+
+    def get_osm_many(
+        self,
+        boundary_boxes: list[BoundaryBox],
+        cache_path: Path,
+        to_update: bool = False,
+        compression: Compression = Compression.NONE,
+        cache_manager: Optional[CacheManager] = None,
+    ) -> list[Path]:
+        """
+        Download OSM data for several boundary boxes simultaneously.
+
+        :param boundary_boxes: borders of the map parts to download
+        :param cache_path: directory to store downloaded OSM data files
+        :param to_update: update cache files
+        :param compression: compression of new cache files
+        :param cache_manager: manager of the cache directory size
+        :return: cache file paths in the order of boundary boxes
+        """
+        paths: list[Path] = [
+            cache_path / f"{x.get_format()}.osm{compression.suffix}"
+            for x in boundary_boxes
+        ]
+        with ThreadPoolExecutor(self.max_downloads) as executor:
+            futures = [
+                executor.submit(
+                    self.get_osm,
+                    boundary_box,
+                    path,
+                    to_update,
+                    compression,
+                    cache_manager,
+                )
+                for boundary_box, path in zip(boundary_boxes, paths)
+            ]
+            for future in futures:
+                future.result()
+
+        return paths
+
+
+_downloader: Optional[Downloader] = None
+
+
+def get_downloader() -> Downloader:
+    """Get downloader shared by all requests of the process."""
+    global _downloader
+
+    if _downloader is None:
+        _downloader = Downloader()
+    return _downloader
+
+
 def get_osm(
-    boundary_box: BoundaryBox, cache_file_path: Path, to_update: bool = False
+    boundary_box: BoundaryBox,
+    cache_file_path: Path,
+    to_update: bool = False,
+    compression: Compression = Compression.NONE,
+    cache_manager: Optional[CacheManager] = None,
 ) -> str:
     """
     Download OSM data from the web or get if from the cache.
@@ -30,51 +402,43 @@ def get_osm(
     :param boundary_box: borders of the map part to download
     :param cache_file_path: cache file to store downloaded OSM data
     :param to_update: update cache files
+    :param compression: compression of the new cache file; existing cache
+        file may have any compression
+    :param cache_manager: manager of the cache directory size
     """
-    if not to_update and cache_file_path.is_file():
-        with cache_file_path.open(encoding="utf-8") as output_file:
-            return output_file.read()
-
-    content: bytes = get_data(
-        "https://api.openstreetmap.org/api/0.6/map",
-        {"bbox": boundary_box.get_format()},
+    return get_downloader().get_osm(
+        boundary_box, cache_file_path, to_update, compression, cache_manager
     )
 
-    if not content.startswith(b"<"):
-        if content == (
-            b"You requested too many nodes (limit is 50000). Either request a "
-            b"smaller area, or use planet.osm"
-        ):
-            raise NetworkError(
-                "Cannot download data: too many nodes (limit is 50000). Try "
-                "to request smaller area."
-            )
-
-        raise NetworkError("Cannot download data.")
 
-    with cache_file_path.open("bw+") as output_file:
-        output_file.write(content)
+def get_osm_many(
+    boundary_boxes: list[BoundaryBox],
+    cache_path: Path,
+    to_update: bool = False,
+    compression: Compression = Compression.NONE,
+    cache_manager: Optional[CacheManager] = None,
+) -> list[Path]:
+    """
+    Download OSM data for several boundary boxes simultaneously.
 
-    return content.decode("utf-8")
+    :param boundary_boxes: borders of the map parts to download
+    :param cache_path: directory to store downloaded OSM data files
+    :param to_update: update cache files
+    :param compression: compression of new cache files
+    :param cache_manager: manager of the cache directory size
+    :return: cache file paths in the order of boundary boxes
+    """
+    return get_downloader().get_osm_many(
+        boundary_boxes, cache_path, to_update, compression, cache_manager
+    )
 
 
 def get_data(address: str, parameters: dict[str, str]) -> bytes:
     """
-    Construct Internet page URL and get its descriptor.
+    Construct Internet page URL and get its content.
 
     :param address: URL without parameters
     :param parameters: URL parameters
-    :return: connection descriptor
+    :return: response content
     """
-    logging.info(f"Getting {address}...")
-    pool_manager: urllib3.PoolManager = urllib3.PoolManager()
-    urllib3.disable_warnings()
-
-    try:
-        result = pool_manager.request("GET", address, fields=parameters)
-    except urllib3.exceptions.MaxRetryError:
-        raise NetworkError("Cannot download data: too many attempts.")
-
-    pool_manager.clear()
-    time.sleep(SLEEP_TIME_BETWEEN_REQUESTS)
-    return result.data
+    return get_downloader().get_data(address, parameters)
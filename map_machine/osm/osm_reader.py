@@ -1,17 +1,51 @@
 """Parse OSM XML file."""
-import json
 import logging
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
+from enum import Enum
+from io import BytesIO
 from pathlib import Path
-from typing import Any, Optional
+from typing import (
+    Any,
+    BinaryIO,
+    Iterable,
+    Iterator,
+    Mapping,
+    Optional,
+    Sequence,
+    Union,
+)
 from xml.etree import ElementTree
 from xml.etree.ElementTree import Element
 
 import numpy as np
 
 from map_machine.geometry.boundary_box import BoundaryBox
+from map_machine.geometry.mercator import (
+    get_scale_factors,
+    pseudo_mercator,
+    pseudo_mercator_many,
+)
+from map_machine.osm.compression import (
+    Compression,
+    detect_compression,
+    get_uncompressed_name,
+    open_input_file,
+)
+from map_machine.osm.overpass_reader import (
+    iterate_elements,
+    open_overpass_file,
+)
+from map_machine.osm.pbf_reader import (
+    COMPLETE_RELATION_TYPES,
+    NO_METADATA,
+    Metadata,
+    PBFData,
+    read_pbf_file,
+)
 from map_machine.util import MinMax
 
 __author__ = "Sergey Vartanov"
@@ -25,6 +59,19 @@ MILES_PATTERN: re.Pattern = re.compile("^(?P<value>\\d*\\.?\\d*)\\s*mi$")
 
 EARTH_EQUATOR_LENGTH: float = 40_075_017.0
 
+# Start of the top-level element of OSM XML file.  Nested elements (`<tag>`,
+# `<nd>`, and `<member>`) are never matched.
+ELEMENT_START_PATTERN: re.Pattern = re.compile(
+    rb"<(?:node|way|relation|bounds|object)[\s/>]"
+)
+XML_SEARCH_SIZE: int = 1 << 16
+CHUNKS_PER_WORKER: int = 4
+
+# Margin added to the area of interest when input files are filtered, in
+# fractions of the area size.  Ways that cross the area without nodes inside
+# it are kept if they have nodes within the margin.
+FILTER_MARGIN: float = 0.25
+
 Tags = dict[str, str]
 
 # See https://wiki.openstreetmap.org/wiki/Lifecycle_prefix#Stages_of_decay
@@ -58,6 +105,173 @@ def parse_levels(string: str) -> list[float]:
         return []
 
 
+# Keys with free-form values, that are usually unique, so their values are
+# not interned.
+FREE_FORM_KEY_PREFIXES: tuple[str, ...] = (
+    "addr:",
+    "alt_name",
+    "description",
+    "email",
+    "fixme",
+    "name",
+    "note",
+    "official_name",
+    "old_name",
+    "opening_hours",
+    "phone",
+    "ref",
+    "source",
+    "website",
+    "wikidata",
+    "wikipedia",
+)
+
+
+class FrozenTags(dict):
+    """
+    Immutable tag dictionary that may be shared between several elements.
+
+    Hash is computed once on demand, so frozen tags may be used as a cache
+    key.
+    """
+
+    __slots__ = ("hash_",)
+
+    def __hash__(self) -> int:
+        try:
+            return self.hash_
+        except AttributeError:
+            self.hash_: int = hash(frozenset(self.items()))
+            return self.hash_
+
+    def __reduce__(self):
+        return FrozenTags, (dict(self),)
+
+    def frozen(self, *args, **kwargs) -> None:
+        """Prohibit modification of shared tags."""
+        raise TypeError("Frozen tags cannot be modified.")
+
+    __setitem__ = __delitem__ = __ior__ = frozen
+    clear = pop = popitem = setdefault = update = frozen
+
+
+EMPTY_TAGS: FrozenTags = FrozenTags()
+
+
+class TagTable:
+    """
+    Interned tag strings and shared tag dictionaries.
+
+    Tag keys and values of non-free-form keys are interned, and identical
+    tag sets in the same order are represented by the same frozen tags.
+    """
+
+    def __init__(self) -> None:
+        self.strings: dict[str, str] = {}
+        self.free_form_keys: dict[str, bool] = {}
+        self.tag_sets: dict[tuple[tuple[str, str], ...], FrozenTags] = {}
+
+    def intern(self, string: str) -> str:
+        """Get the interned copy of the string."""
+        return self.strings.setdefault(string, string)
+
+    def is_free_form(self, key: str) -> bool:
+        """Check whether values of the key are usually unique."""
+        if key not in self.free_form_keys:
+            self.free_form_keys[key] = key.startswith(FREE_FORM_KEY_PREFIXES)
+        return self.free_form_keys[key]
+
+    def get_tags(self, pairs: Iterable[tuple[str, str]]) -> FrozenTags:
+        """
+        Get shared tags.
+
+        :param pairs: tag keys and values
+        """
+        key: tuple[tuple[str, str], ...] = tuple(pairs)
+        if not key:
+            return EMPTY_TAGS
+        if key in self.tag_sets:
+            return self.tag_sets[key]
+
+        tags: FrozenTags = FrozenTags(
+            (
+                self.intern(tag_key),
+                value if self.is_free_form(tag_key) else self.intern(value),
+            )
+            for tag_key, value in key
+        )
+        self.tag_sets[key] = tags
+        return tags
+
+    def share(self, tags: Tags) -> FrozenTags:
+        """Get shared tags equal to the tag dictionary."""
+        if isinstance(tags, FrozenTags):
+            return tags
+        return self.get_tags(tags.items())
+
+
+class MetadataMode(Enum):
+    """
+    Which metadata of OpenStreetMap elements should be parsed.  Metadata is
+    only required for special drawing modes, and parsing timestamps is
+    expensive.
+    """
+
+    FULL = "full"  # Visible, changeset, timestamp, user, and uid.
+    SKIP = "skip"
+
+
+def get_xml_metadata(attributes: Mapping[str, str]) -> Metadata:
+    """
+    Get metadata from attributes of OSM XML element.
+
+    :param attributes: node, way, or relation element attributes
+    :return: visible, changeset, timestamp, user, and uid
+    """
+    return (
+        attributes.get("visible", None),
+        attributes.get("changeset", None),
+        datetime.strptime(attributes["timestamp"], OSM_TIME_PATTERN)
+        if "timestamp" in attributes
+        else None,
+        attributes.get("user", None),
+        attributes.get("uid", None),
+    )
+
+
+def get_xml_boundary_box(element: Element) -> BoundaryBox:
+    """Parse boundary box from OSM XML `<bounds>` element."""
+    attributes = element.attrib
+    return BoundaryBox(
+        float(attributes["minlon"]),
+        float(attributes["minlat"]),
+        float(attributes["maxlon"]),
+        float(attributes["maxlat"]),
+    )
+
+
+def get_xml_node_ids(element: Element) -> list[int]:
+    """Get identifiers of nodes referenced by OSM XML `<way>` element."""
+    return [int(x.attrib["ref"]) for x in element if x.tag == "nd"]
+
+
+def get_xml_tags(
+    element: Element, tag_table: Optional[TagTable] = None
+) -> Tags:
+    """
+    Get tags from `<tag>` subelements of OSM XML element.
+
+    :param element: node, way, or relation element
+    :param tag_table: table to share tags, tags are not shared if not
+        specified
+    """
+    if tag_table is None:
+        return {x.attrib["k"]: x.attrib["v"] for x in element if x.tag == "tag"}
+    return tag_table.get_tags(
+        (x.attrib["k"], x.attrib["v"]) for x in element if x.tag == "tag"
+    )
+
+
 @dataclass
 class Tagged:
     """Something with tags (string to string mapping)."""
@@ -137,23 +351,27 @@ class OSMNode(Tagged):
     uid: Optional[str] = None
 
     @classmethod
-    def from_xml_structure(cls, element: Element) -> "OSMNode":
-        """Parse node from OSM XML `<node>` element."""
+    def from_xml_structure(
+        cls,
+        element: Element,
+        tag_table: Optional[TagTable] = None,
+        parse_metadata: bool = True,
+    ) -> "OSMNode":
+        """
+        Parse node from OSM XML `<node>` element.
+
+        :param element: `<node>` element
+        :param tag_table: table to share tags, tags are not shared if not
+            specified
+        :param parse_metadata: whether metadata should be parsed
+        """
         attributes = element.attrib
-        tags: Tags = {
-            x.attrib["k"]: x.attrib["v"] for x in element if x.tag == "tag"
-        }
+        tags: Tags = get_xml_tags(element, tag_table)
         return cls(
             tags,
             int(attributes["id"]),
             np.array((float(attributes["lat"]), float(attributes["lon"]))),
-            attributes.get("visible", None),
-            attributes.get("changeset", None),
-            datetime.strptime(attributes["timestamp"], OSM_TIME_PATTERN)
-            if "timestamp" in attributes
-            else None,
-            attributes.get("user", None),
-            attributes.get("uid", None),
+            *(get_xml_metadata(attributes) if parse_metadata else NO_METADATA),
         )
 
     @classmethod
@@ -194,6 +412,350 @@ class OSMNode(Tagged):
         )
 
 
+# Node metadata: visible, changeset, timestamp, user, and uid.
+NodeMetadata = Metadata
+
+NODE_TABLE_INITIAL_CAPACITY: int = 1024
+
+
+class NodeTable:
+    """
+    Columnar storage for OpenStreetMap nodes.
+
+    Node identifiers and coordinates are stored in contiguous NumPy arrays
+    and are addressed by row index.  Tags and metadata are stored only for
+    nodes that have them.
+    """
+
+    def __init__(self, capacity: int = NODE_TABLE_INITIAL_CAPACITY) -> None:
+        self.size: int = 0
+        self.id_buffer: np.ndarray = np.empty(capacity, dtype=np.int64)
+        self.coordinates_buffer: np.ndarray = np.empty(
+            (capacity, 2), dtype=np.float64
+        )
+        # Node identifier to row index.
+        self.index: dict[int, int] = {}
+        # Row index to tags, only for tagged nodes.
+        self.tags: dict[int, Tags] = {}
+        # Row index to metadata, only for nodes with metadata.
+        self.metadata: dict[int, NodeMetadata] = {}
+        # Zoom-independent pseudo-Mercator coordinates and scale factors of
+        # the first `world_size` rows, computed on demand.
+        self.world_buffer: np.ndarray = np.empty((0, 2), dtype=np.float64)
+        self.scale_buffer: np.ndarray = np.empty(0, dtype=np.float64)
+        self.world_size: int = 0
+
+    @classmethod
+    def from_arrays(
+        cls,
+        ids: np.ndarray,
+        coordinates: np.ndarray,
+        tags: dict[int, Tags],
+        metadata: dict[int, NodeMetadata],
+    ) -> "NodeTable":
+        """
+        Create table from decoded node arrays at once.
+
+        :param ids: node identifiers
+        :param coordinates: node coordinates in the form of N × (latitude,
+            longitude)
+        :param tags: row index to tags, only for tagged nodes
+        :param metadata: row index to metadata, only for nodes with metadata
+        """
+        table: NodeTable = cls(0)
+        table.id_buffer = np.ascontiguousarray(ids, dtype=np.int64)
+        table.coordinates_buffer = np.ascontiguousarray(
+            coordinates, dtype=np.float64
+        )
+        table.index = dict(zip(ids.tolist(), range(len(ids))))
+        table.tags = tags
+        table.metadata = metadata
+        table.size = len(ids)
+        return table
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Identifiers of all nodes in the table."""
+        return self.id_buffer[: self.size]
+
+    @property
+    def coordinates(self) -> np.ndarray:
+        """Coordinates of all nodes in the form of N × (latitude, longitude)."""
+        return self.coordinates_buffer[: self.size]
+
+    def add(
+        self,
+        id_: int,
+        coordinates: np.ndarray,
+        tags: Tags,
+        metadata: Optional[NodeMetadata] = None,
+    ) -> int:
+        """
+        Add node to the table.
+
+        :param id_: node identifier
+        :param coordinates: node coordinates in the form of (latitude,
+            longitude)
+        :param tags: node tags
+        :param metadata: visible, changeset, timestamp, user, and uid
+        :return: row index of the node
+        """
+        if self.size == len(self.id_buffer):
+            self.grow()
+
+        row: int = self.size
+        self.id_buffer[row] = id_
+        self.coordinates_buffer[row] = coordinates
+        self.index[id_] = row
+        if tags:
+            self.tags[row] = tags
+        if metadata is not None and any(x is not None for x in metadata):
+            self.metadata[row] = metadata
+        self.size += 1
+
+        return row
+
+    def add_node(self, node: OSMNode) -> int:
+        """Add node to the table and return its row index."""
+        return self.add(
+            node.id_,
+            node.coordinates,
+            node.tags,
+            (node.visible, node.changeset, node.timestamp, node.user, node.uid),
+        )
+
+    def grow(self) -> None:
+        """Double the capacity of the table."""
+        capacity: int = max(2 * len(self.id_buffer), 1)
+
+        id_buffer: np.ndarray = np.empty(capacity, dtype=np.int64)
+        id_buffer[: self.size] = self.ids
+        coordinates_buffer: np.ndarray = np.empty(
+            (capacity, 2), dtype=np.float64
+        )
+        coordinates_buffer[: self.size] = self.coordinates
+
+        self.id_buffer = id_buffer
+        self.coordinates_buffer = coordinates_buffer
+
+    def trim(self) -> None:
+        """Drop free capacity of the table, e.g. before pickling."""
+        self.id_buffer = self.ids.copy()
+        self.coordinates_buffer = self.coordinates.copy()
+
+    def extend(self, other: "NodeTable") -> None:
+        """
+        Add all nodes of another table.  Nodes should not be in this table
+        yet.
+        """
+        start: int = self.size
+        size: int = start + other.size
+        if size > len(self.id_buffer):
+            capacity: int = max(size, 2 * len(self.id_buffer))
+            id_buffer: np.ndarray = np.empty(capacity, dtype=np.int64)
+            id_buffer[:start] = self.ids
+            coordinates_buffer: np.ndarray = np.empty(
+                (capacity, 2), dtype=np.float64
+            )
+            coordinates_buffer[:start] = self.coordinates
+            self.id_buffer = id_buffer
+            self.coordinates_buffer = coordinates_buffer
+
+        self.id_buffer[start:size] = other.ids
+        self.coordinates_buffer[start:size] = other.coordinates
+        self.index.update(zip(other.ids.tolist(), range(start, size)))
+        self.tags.update((start + row, x) for row, x in other.tags.items())
+        self.metadata.update(
+            (start + row, x) for row, x in other.metadata.items()
+        )
+        self.size = size
+
+    def update_world(self) -> None:
+        """
+        Compute pseudo-Mercator coordinates and scale factors of nodes added
+        since the last update.
+        """
+        if self.world_size == self.size:
+            return
+
+        start: int = self.world_size
+        coordinates: np.ndarray = self.coordinates_buffer[start : self.size]
+
+        world_buffer: np.ndarray = np.empty((self.size, 2), dtype=np.float64)
+        world_buffer[:start] = self.world_buffer[:start]
+        world_buffer[start:] = pseudo_mercator_many(coordinates)
+
+        scale_buffer: np.ndarray = np.empty(self.size, dtype=np.float64)
+        scale_buffer[:start] = self.scale_buffer[:start]
+        scale_buffer[start:] = get_scale_factors(coordinates[:, 0])
+
+        self.world_buffer = world_buffer
+        self.scale_buffer = scale_buffer
+        self.world_size = self.size
+
+    def get_world_coordinates(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Get pseudo-Mercator coordinates of nodes.  They do not depend on the
+        zoom level, so they are computed once for every node and reused by
+        flingers of all zoom levels.
+
+        :param rows: row indices of nodes
+        :return: coordinates in the form of N × (x, y)
+        """
+        self.update_world()
+        return self.world_buffer[rows]
+
+    def get_scale_factors(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Get stretching of pseudo-Mercator projection at nodes relative to the
+        equator.  Like pseudo-Mercator coordinates, it is computed once for
+        every node and reused by flingers of all zoom levels.
+
+        :param rows: row indices of nodes
+        :return: absolute values of 1 / cos(latitude)
+        """
+        self.update_world()
+        return self.scale_buffer[rows]
+
+    def set_node(self, row: int, node: OSMNode) -> None:
+        """Replace coordinates, tags, and metadata of the node in the row."""
+        # Buffers of the table loaded from the snapshot are read-only.
+        if not self.coordinates_buffer.flags.writeable:
+            self.coordinates_buffer = self.coordinates_buffer.copy()
+
+        self.coordinates_buffer[row] = node.coordinates
+        if row < self.world_size:
+            self.world_buffer[row] = pseudo_mercator(node.coordinates)
+            self.scale_buffer[row] = get_scale_factors(node.coordinates[0])
+        self.tags.pop(row, None)
+        if node.tags:
+            self.tags[row] = node.tags
+        metadata: NodeMetadata = (
+            node.visible,
+            node.changeset,
+            node.timestamp,
+            node.user,
+            node.uid,
+        )
+        self.metadata.pop(row, None)
+        if any(x is not None for x in metadata):
+            self.metadata[row] = metadata
+
+    def remove(self, id_: int) -> None:
+        """
+        Remove node from the table.  The row itself is kept, since it may be
+        still referenced by ways, but the node is no longer accessible by its
+        identifier.
+        """
+        row: int = self.index.pop(id_)
+        self.tags.pop(row, None)
+        self.metadata.pop(row, None)
+
+    def get_rows(self, ids: Iterable[int]) -> np.ndarray:
+        """Get row indices of nodes by their identifiers."""
+        return np.fromiter((self.index[id_] for id_ in ids), dtype=np.int64)
+
+    def get_node(self, row: int) -> OSMNode:
+        """Construct node object from the table row."""
+        metadata: NodeMetadata = self.metadata.get(row, NO_METADATA)
+        return OSMNode(
+            self.tags.get(row, {}),
+            int(self.id_buffer[row]),
+            self.coordinates_buffer[row].copy(),
+            *metadata,
+        )
+
+    def get_tagged_rows(self) -> np.ndarray:
+        """Get row indices of nodes that have tags, in insertion order."""
+        return np.fromiter(sorted(self.tags.keys()), dtype=np.int64)
+
+
+class NodeView(Mapping[int, OSMNode]):
+    """
+    Read-only mapping from node identifiers to nodes stored in the node table.
+
+    Node objects are constructed on access.
+    """
+
+    def __init__(self, table: NodeTable) -> None:
+        self.table: NodeTable = table
+
+    def __getitem__(self, id_: int) -> OSMNode:
+        return self.table.get_node(self.table.index[id_])
+
+    def __contains__(self, id_: Any) -> bool:
+        return id_ in self.table.index
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.table.index)
+
+    def __len__(self) -> int:
+        return len(self.table.index)
+
+
+class NodeList(Sequence[OSMNode]):
+    """
+    Sequence of nodes referenced by row indices in the node table.
+
+    Node objects are constructed on access, but coordinates of all nodes can
+    be read directly as one array.
+    """
+
+    def __init__(self, table: NodeTable, rows: np.ndarray) -> None:
+        self.table: NodeTable = table
+        self.rows: np.ndarray = rows
+
+    @property
+    def coordinates(self) -> np.ndarray:
+        """Node coordinates in the form of N × (latitude, longitude)."""
+        return self.table.coordinates_buffer[self.rows]
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Node identifiers."""
+        return self.table.id_buffer[self.rows]
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return NodeList(self.table, self.rows[index])
+        return self.table.get_node(int(self.rows[index]))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __add__(self, other: Sequence[OSMNode]):
+        if isinstance(other, NodeList) and other.table is self.table:
+            return NodeList(self.table, np.concatenate((self.rows, other.rows)))
+        return list(self) + list(other)
+
+    def __radd__(self, other: Sequence[OSMNode]) -> list[OSMNode]:
+        return list(other) + list(self)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, NodeList) and other.table is self.table:
+            return np.array_equal(self.rows, other.rows)
+        if isinstance(other, (list, tuple, NodeList)):
+            return list(self) == list(other)
+        return False
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+def get_coordinates(nodes: Sequence[OSMNode]) -> np.ndarray:
+    """
+    Get coordinates of nodes as one array.
+
+    :param nodes: node list
+    :return: coordinates in the form of N × (latitude, longitude)
+    """
+    if isinstance(nodes, NodeList):
+        return nodes.coordinates
+    if not nodes:
+        return np.empty((0, 2), dtype=np.float64)
+    return np.array([node.coordinates for node in nodes], dtype=np.float64)
+
+
 @dataclass
 class OSMWay(Tagged):
     """
@@ -203,7 +765,7 @@ class OSMWay(Tagged):
     """
 
     id_: int
-    nodes: Optional[list[OSMNode]] = field(default_factory=list)
+    nodes: Optional[Sequence[OSMNode]] = field(default_factory=list)
     visible: Optional[str] = None
     changeset: Optional[str] = None
     timestamp: Optional[datetime] = None
@@ -212,40 +774,50 @@ class OSMWay(Tagged):
 
     @classmethod
     def from_xml_structure(
-        cls, element: Element, nodes: dict[int, OSMNode]
+        cls,
+        element: Element,
+        nodes: Optional[NodeTable],
+        tag_table: Optional[TagTable] = None,
+        parse_metadata: bool = True,
     ) -> "OSMWay":
-        """Parse way from OSM XML `<way>` element."""
+        """
+        Parse way from OSM XML `<way>` element.
+
+        :param element: `<way>` element
+        :param nodes: table of already parsed nodes; if not specified, nodes
+            are not resolved and should be set later (see
+            `get_xml_node_ids`)
+        :param tag_table: table to share tags, tags are not shared if not
+            specified
+        :param parse_metadata: whether metadata should be parsed
+        """
         attributes = element.attrib
-        tags: Tags = {
-            x.attrib["k"]: x.attrib["v"] for x in element if x.tag == "tag"
-        }
+        tags: Tags = get_xml_tags(element, tag_table)
         return cls(
             tags,
             int(element.attrib["id"]),
-            [nodes[int(x.attrib["ref"])] for x in element if x.tag == "nd"],
-            attributes.get("visible", None),
-            attributes.get("changeset", None),
-            datetime.strptime(attributes["timestamp"], OSM_TIME_PATTERN)
-            if "timestamp" in attributes
-            else None,
-            attributes.get("user", None),
-            attributes.get("uid", None),
+            (
+                NodeList(nodes, nodes.get_rows(get_xml_node_ids(element)))
+                if nodes is not None
+                else []
+            ),
+            *(get_xml_metadata(attributes) if parse_metadata else NO_METADATA),
         )
 
     @classmethod
     def parse_from_structure(
-        cls, structure: dict[str, Any], nodes: dict[int, OSMNode]
+        cls, structure: dict[str, Any], nodes: NodeTable
     ) -> "OSMWay":
         """
         Parse way from Overpass-like structure.
 
         :param structure: input structure
-        :param nodes: node structure
+        :param nodes: table of already parsed nodes
         """
         return cls(
             structure.get("tags", {}),
             structure["id"],
-            [nodes[x] for x in structure["nodes"]],
+            NodeList(nodes, nodes.get_rows(structure["nodes"])),
         )
 
     def is_cycle(self) -> bool:
@@ -285,11 +857,22 @@ class OSMRelation(Tagged):
     uid: Optional[str] = None
 
     @classmethod
-    def from_xml_structure(cls, element: Element) -> "OSMRelation":
-        """Parse relation from OSM XML `<relation>` element."""
+    def from_xml_structure(
+        cls,
+        element: Element,
+        tag_table: Optional[TagTable] = None,
+        parse_metadata: bool = True,
+    ) -> "OSMRelation":
+        """
+        Parse relation from OSM XML `<relation>` element.
+
+        :param element: `<relation>` element
+        :param tag_table: table to share tags, tags are not shared if not
+            specified
+        :param parse_metadata: whether metadata should be parsed
+        """
         attributes = element.attrib
         members: list[OSMMember] = []
-        tags: Tags = {}
         for subelement in element:
             if subelement.tag == "member":
                 subattributes = subelement.attrib
@@ -300,19 +883,11 @@ class OSMRelation(Tagged):
                         subattributes["role"],
                     )
                 )
-            if subelement.tag == "tag":
-                tags[subelement.attrib["k"]] = subelement.attrib["v"]
         return cls(
-            tags,
+            get_xml_tags(element, tag_table),
             int(attributes["id"]),
             members,
-            attributes.get("visible", None),
-            attributes.get("changeset", None),
-            datetime.strptime(attributes["timestamp"], OSM_TIME_PATTERN)
-            if "timestamp" in attributes
-            else None,
-            attributes.get("user", None),
-            attributes.get("uid", None),
+            *(get_xml_metadata(attributes) if parse_metadata else NO_METADATA),
         )
 
     @classmethod
@@ -332,25 +907,154 @@ class OSMRelation(Tagged):
         )
 
 
+def iterate_xml_elements(source: Union[Path, BinaryIO]) -> Iterator[Element]:
+    """
+    Parse OSM XML data using `iterparse` and yield direct children of the
+    `<osm>` element one by one.  Every element is cleared after it is
+    processed, so the whole XML tree is never kept in memory.
+
+    :param source: input file path or binary file object; file may be
+        compressed, see `open_input_file`
+    """
+    if isinstance(source, Path):
+        with open_input_file(source) as input_file:
+            yield from iterate_xml_elements(input_file)
+        return
+
+    root: Optional[Element] = None
+    depth: int = 0
+
+    for event, element in ElementTree.iterparse(
+        source, events=("start", "end")
+    ):
+        if event == "start":
+            if root is None:
+                root = element
+            depth += 1
+            continue
+
+        depth -= 1
+        # Only direct children of `<osm>` are complete map elements.  Nested
+        # `<tag>`, `<nd>`, and `<member>` elements are processed together with
+        # their parent.
+        if depth != 1:
+            continue
+
+        yield element
+        element.clear()
+        root.clear()
+
+
 class NotWellFormedOSMDataException(Exception):
     """OSM data structure is not well-formed."""
 
 
+@dataclass
+class ElementChange:
+    """Map element touched by the osmChange file."""
+
+    type_: str
+    id_: int
+    # Boundary box of the element before the change, None if the element was
+    # not in the map.
+    old_boundary_box: Optional[BoundaryBox] = None
+    # Boundary box of the element after the change, None if the element was
+    # deleted.
+    new_boundary_box: Optional[BoundaryBox] = None
+
+
+@dataclass
+class ChangeReport:
+    """Elements touched by the osmChange file and their boundary boxes."""
+
+    changes: dict[tuple[str, int], ElementChange] = field(default_factory=dict)
+
+    def get_ids(self, type_: str) -> set[int]:
+        """Get identifiers of touched elements of the type."""
+        return {
+            id_ for element_type, id_ in self.changes if element_type == type_
+        }
+
+    def get_boundary_box(self) -> Optional[BoundaryBox]:
+        """
+        Get the area that should be redrawn: the union of old and new
+        boundary boxes of all touched elements.
+        """
+        result: Optional[BoundaryBox] = None
+        for change in self.changes.values():
+            for boundary_box in (
+                change.old_boundary_box,
+                change.new_boundary_box,
+            ):
+                if boundary_box is None:
+                    continue
+                if result is None:
+                    result = BoundaryBox(
+                        boundary_box.left,
+                        boundary_box.bottom,
+                        boundary_box.right,
+                        boundary_box.top,
+                    )
+                else:
+                    result.combine(boundary_box)
+        return result
+
+
 class OSMData:
     """The whole OpenStreetMap information about nodes, ways, and relations."""
 
-    def __init__(self) -> None:
-        self.nodes: dict[int, OSMNode] = {}
+    def __init__(self, metadata_mode: MetadataMode = MetadataMode.FULL) -> None:
+        """
+        :param metadata_mode: which metadata of elements should be parsed
+        """
+        self.metadata_mode: MetadataMode = metadata_mode
+        self.node_table: NodeTable = NodeTable()
+        self.nodes: NodeView = NodeView(self.node_table)
+        self.tag_table: TagTable = TagTable()
         self.ways: dict[int, OSMWay] = {}
         self.relations: dict[int, OSMRelation] = {}
 
-        self.authors: set[str] = set()
         self.levels: set[float] = set()
-        self.time: MinMax = MinMax()
         self.view_box: Optional[BoundaryBox] = None
         self.boundary_box: Optional[BoundaryBox] = None
         self.equator_length: float = EARTH_EQUATOR_LENGTH
 
+        # Computed on demand from element metadata, see `authors` and `time`.
+        self._authors: Optional[set[str]] = None
+        self._time: Optional[MinMax] = None
+
+    @property
+    def authors(self) -> set[str]:
+        """Users that last modified nodes and ways."""
+        if self._authors is None:
+            self._authors = {
+                metadata[3]
+                for metadata in self.node_table.metadata.values()
+                if metadata[3]
+            }
+            self._authors |= {
+                way.user for way in self.ways.values() if way.user
+            }
+        return self._authors
+
+    @property
+    def time(self) -> MinMax:
+        """Time interval of the last modifications of nodes and ways."""
+        if self._time is None:
+            self._time = MinMax()
+            for metadata in self.node_table.metadata.values():
+                if metadata[2]:
+                    self._time.update(metadata[2])
+            for way in self.ways.values():
+                if way.timestamp:
+                    self._time.update(way.timestamp)
+        return self._time
+
+    @property
+    def parse_metadata(self) -> bool:
+        """Whether metadata of elements should be parsed."""
+        return self.metadata_mode == MetadataMode.FULL
+
     def add_node(self, node: OSMNode) -> None:
         """Add node and update map parameters."""
         if node.id_ in self.nodes:
@@ -359,17 +1063,47 @@ class OSMData:
                     f"Node with duplicate id {node.id_}."
                 )
             return
-        self.nodes[node.id_] = node
-        if node.user:
-            self.authors.add(node.user)
+        node.tags = self.tag_table.share(node.tags)
+        self.node_table.add_node(node)
+        if node.user or node.timestamp:
+            self._authors = self._time = None
         if node.tags.get("level"):
             self.levels.union(parse_levels(node.tags["level"]))
-        self.time.update(node.timestamp)
 
         if not self.boundary_box:
             self.boundary_box = node.get_boundary_box()
         self.boundary_box.update(node.coordinates)
 
+    def add_node_table(self, node_table: NodeTable) -> None:
+        """
+        Add all nodes of the table and update map parameters.  Nodes that are
+        already in the map are checked one by one.
+        """
+        if not self.node_table.index.keys().isdisjoint(node_table.index):
+            for row in range(node_table.size):
+                self.add_node(node_table.get_node(row))
+            return
+        if not node_table.size:
+            return
+
+        node_table.tags = {
+            row: self.tag_table.share(tags)
+            for row, tags in node_table.tags.items()
+        }
+        self.node_table.extend(node_table)
+        if node_table.metadata:
+            self._authors = self._time = None
+
+        minimum: np.ndarray = node_table.coordinates.min(axis=0)
+        maximum: np.ndarray = node_table.coordinates.max(axis=0)
+        boundary_box: BoundaryBox = BoundaryBox(
+            minimum[1], minimum[0], maximum[1], maximum[0]
+        )
+        if self.boundary_box:
+            self.boundary_box.combine(boundary_box)
+        else:
+            self.boundary_box = boundary_box
+
     def add_way(self, way: OSMWay) -> None:
         """Add way and update map parameters."""
         if way.id_ in self.ways:
@@ -378,13 +1112,12 @@ class OSMData:
                     f"Way with duplicate id {way.id_}."
                 )
             return
+        way.tags = self.tag_table.share(way.tags)
         self.ways[way.id_] = way
-        if way.user:
-            self.authors.add(way.user)
+        if way.user or way.timestamp:
+            self._authors = self._time = None
         if way.tags.get("level"):
             self.levels.union(parse_levels(way.tags["level"]))
-        if way.timestamp:
-            self.time.update(way.timestamp)
 
     def add_relation(self, relation: OSMRelation) -> None:
         """Add relation and update map parameters."""
@@ -394,55 +1127,498 @@ class OSMData:
                     f"Relation with duplicate id {relation.id_}."
                 )
             return
+        relation.tags = self.tag_table.share(relation.tags)
         self.relations[relation.id_] = relation
 
+    def get_element_boundary_box(
+        self, type_: str, id_: int
+    ) -> Optional[BoundaryBox]:
+        """
+        Get boundary box of the node, the way, or the relation.  Boundary box
+        of the relation covers its member nodes and ways.
+
+        :param type_: element type: `node`, `way`, or `relation`
+        :param id_: element identifier
+        :return: boundary box or None if there is no such element in the map
+            or it has no nodes
+        """
+        coordinates: np.ndarray
+        if type_ == "node":
+            if id_ not in self.node_table.index:
+                return None
+            coordinates = self.node_table.coordinates_buffer[
+                [self.node_table.index[id_]]
+            ]
+        elif type_ == "way":
+            if id_ not in self.ways:
+                return None
+            coordinates = get_coordinates(self.ways[id_].nodes)
+        elif type_ == "relation":
+            if id_ not in self.relations:
+                return None
+            parts: list[np.ndarray] = [np.empty((0, 2), dtype=np.float64)]
+            for member in self.relations[id_].members:
+                if (
+                    member.type_ == "node"
+                    and member.ref in self.node_table.index
+                ):
+                    parts.append(
+                        self.node_table.coordinates_buffer[
+                            [self.node_table.index[member.ref]]
+                        ]
+                    )
+                elif member.type_ == "way" and member.ref in self.ways:
+                    parts.append(get_coordinates(self.ways[member.ref].nodes))
+            coordinates = np.concatenate(parts)
+        else:
+            return None
+
+        if not len(coordinates):
+            return None
+        minimum: np.ndarray = coordinates.min(axis=0)
+        maximum: np.ndarray = coordinates.max(axis=0)
+        return BoundaryBox(minimum[1], minimum[0], maximum[1], maximum[0])
+
+    def apply_change(self, file_name: Path) -> ChangeReport:
+        """
+        Apply osmChange file: create, modify, and delete nodes, ways, and
+        relations in place.  File may be compressed.
+
+        Ways with nodes that are not in the map cannot be constructed, so
+        they are removed from the map, e.g. when the way is extended outside
+        the loaded area.  Ways with moved or deleted nodes are reported as
+        touched, since their geometry is changed.
+
+        See https://wiki.openstreetmap.org/wiki/OsmChange
+
+        :param file_name: osmChange XML file
+        :return: touched elements with boundary boxes before and after the
+            change
+        """
+        with open_input_file(file_name) as input_file:
+            root: Element = ElementTree.parse(input_file).getroot()
+
+        actions: list[tuple[str, Element]] = [
+            (block.tag, element)
+            for block in root
+            if block.tag in ("create", "modify", "delete")
+            for element in block
+            if element.tag in ("node", "way", "relation")
+        ]
+        report: ChangeReport = ChangeReport()
+
+        def touch(type_: str, id_: int) -> None:
+            """Remember the element and its boundary box before the change."""
+            if (type_, id_) not in report.changes:
+                report.changes[(type_, id_)] = ElementChange(
+                    type_, id_, self.get_element_boundary_box(type_, id_)
+                )
+
+        for _, element in actions:
+            touch(element.tag, int(element.attrib["id"]))
+
+        rows: set[int] = {
+            self.node_table.index[id_]
+            for id_ in report.get_ids("node")
+            if id_ in self.node_table.index
+        }
+        if rows:
+            for way in self.ways.values():
+                if isinstance(way.nodes, NodeList) and not rows.isdisjoint(
+                    way.nodes.rows.tolist()
+                ):
+                    touch("way", way.id_)
+
+        for action, element in actions:
+            self.apply_element_change(action, element)
+
+        for change in report.changes.values():
+            change.new_boundary_box = self.get_element_boundary_box(
+                change.type_, change.id_
+            )
+        self._authors = self._time = None
+
+        return report
+
+    def apply_element_change(self, action: str, element: Element) -> None:
+        """
+        Create, modify, or delete one element.
+
+        :param action: `create`, `modify`, or `delete`
+        :param element: `<node>`, `<way>`, or `<relation>` element
+        """
+        id_: int = int(element.attrib["id"])
+
+        if action == "delete":
+            if element.tag == "node" and id_ in self.node_table.index:
+                self.node_table.remove(id_)
+            elif element.tag == "way":
+                self.ways.pop(id_, None)
+            elif element.tag == "relation":
+                self.relations.pop(id_, None)
+            return
+
+        if element.tag == "node":
+            node: OSMNode = OSMNode.from_xml_structure(
+                element, self.tag_table, self.parse_metadata
+            )
+            if id_ not in self.node_table.index:
+                self.add_node(node)
+                return
+            self.node_table.set_node(self.node_table.index[id_], node)
+            if self.boundary_box:
+                self.boundary_box.update(node.coordinates)
+
+        elif element.tag == "way":
+            if not all(
+                x in self.node_table.index for x in get_xml_node_ids(element)
+            ):
+                logging.debug(f"Way {id_} references unknown nodes.")
+                self.ways.pop(id_, None)
+                return
+            way: OSMWay = OSMWay.from_xml_structure(
+                element, self.node_table, self.tag_table, self.parse_metadata
+            )
+            self.ways.pop(id_, None)
+            self.add_way(way)
+
+        elif element.tag == "relation":
+            self.relations.pop(id_, None)
+            self.add_relation(
+                OSMRelation.from_xml_structure(
+                    element, self.tag_table, self.parse_metadata
+                )
+            )
+
     def parse_overpass(self, file_name: Path) -> None:
         """
-        Parse JSON structure extracted from Overpass API.
+        Parse JSON structure extracted from Overpass API.  File may be
+        compressed with gzip, bzip2, or xz.
+
+        Elements are decoded one by one in a single pass.  Nodes of ways that
+        precede their nodes in the file are resolved at the end.
 
         See https://wiki.openstreetmap.org/wiki/Overpass_API
         """
-        with file_name.open(encoding="utf-8") as input_file:
-            structure = json.load(input_file)
+        # Ways with unresolved nodes and their node identifiers.
+        unresolved: list[tuple[OSMWay, list[int]]] = []
+
+        with open_overpass_file(file_name) as input_file:
+            for element in iterate_elements(input_file):
+                if element["type"] == "node":
+                    node = OSMNode.parse_from_structure(element)
+                    self.add_node(node)
+                    if not self.view_box:
+                        self.view_box = BoundaryBox(
+                            node.coordinates[1],
+                            node.coordinates[0],
+                            node.coordinates[1],
+                            node.coordinates[0],
+                        )
+                    self.view_box.update(node.coordinates)
+                elif element["type"] == "way":
+                    if all(
+                        x in self.node_table.index for x in element["nodes"]
+                    ):
+                        way = OSMWay.parse_from_structure(
+                            element, self.node_table
+                        )
+                    else:
+                        way = OSMWay(element.get("tags", {}), element["id"])
+                        unresolved.append((way, element["nodes"]))
+                    self.add_way(way)
+                elif element["type"] == "relation":
+                    self.add_relation(OSMRelation.parse_from_structure(element))
+
+        for way, node_ids in unresolved:
+            way.nodes = NodeList(
+                self.node_table, self.node_table.get_rows(node_ids)
+            )
+
+    def parse_file(
+        self,
+        file_name: Path,
+        boundary_box: Optional[BoundaryBox] = None,
+        workers: Optional[int] = None,
+    ) -> None:
+        """
+        Parse OSM XML, Overpass JSON, or PBF file selecting the format by file
+        extension.  OSM XML and Overpass JSON files may be compressed with
+        gzip, bzip2, or xz: compression is detected by the file content, and
+        its suffix is ignored while selecting the format.
+
+        :param file_name: input file
+        :param boundary_box: area of interest; if specified, OSM XML and PBF
+            data is filtered while parsing: only elements inside the area
+            extended by `FILTER_MARGIN` and elements required for their
+            complete geometry are kept
+        :param workers: number of worker processes for OSM XML and PBF files;
+            by default, OSM XML file is parsed in one process and PBF file in
+            all processors
+        """
+        if boundary_box is not None:
+            boundary_box = boundary_box.extend(FILTER_MARGIN)
+
+        name: str = get_uncompressed_name(file_name)
+        if name.endswith(".json"):
+            self.parse_overpass(file_name)
+        elif name.endswith(".pbf"):
+            self.parse_pbf_file(file_name, boundary_box, workers)
+        elif boundary_box is not None:
+            self.parse_osm_file_in_box(file_name, boundary_box)
+        else:
+            self.parse_osm_file(file_name, workers)
+
+    def parse_pbf_file(
+        self,
+        file_name: Path,
+        boundary_box: Optional[BoundaryBox] = None,
+        workers: Optional[int] = None,
+    ) -> None:
+        """
+        Parse OSM PBF file.
 
-        node_map: dict[int, OSMNode] = {}
-        way_map: dict[int, OSMWay] = {}
+        Blobs are decoded in parallel by a process pool.  If boundary box is
+        specified, only nodes inside it and elements that reference them are
+        added (see `read_pbf_file`).
 
-        for element in structure["elements"]:
-            if element["type"] == "node":
-                node = OSMNode.parse_from_structure(element)
-                node_map[node.id_] = node
-                self.add_node(node)
-                if not self.view_box:
-                    self.view_box = BoundaryBox(
-                        node.coordinates[1],
-                        node.coordinates[0],
-                        node.coordinates[1],
-                        node.coordinates[0],
-                    )
-                self.view_box.update(node.coordinates)
+        See https://wiki.openstreetmap.org/wiki/PBF_Format
 
-        for element in structure["elements"]:
-            if element["type"] == "way":
-                way = OSMWay.parse_from_structure(element, node_map)
-                way_map[way.id_] = way
-                self.add_way(way)
+        :param file_name: input PBF file
+        :param boundary_box: area to filter nodes, ways, and relations
+        :param workers: number of worker processes, all processors by default
+        """
+        pbf_data: PBFData = read_pbf_file(
+            file_name, boundary_box, workers, self.parse_metadata
+        )
 
-        for element in structure["elements"]:
-            if element["type"] == "relation":
-                relation = OSMRelation.parse_from_structure(element)
-                self.add_relation(relation)
+        if pbf_data.view_box:
+            if self.view_box:
+                self.view_box.combine(pbf_data.view_box)
+            else:
+                self.view_box = pbf_data.view_box
+
+        for block in pbf_data.blocks:
+            self.add_node_table(
+                NodeTable.from_arrays(
+                    block.node_ids,
+                    block.node_coordinates,
+                    block.node_tags,
+                    block.node_metadata,
+                )
+            )
+
+        for block in pbf_data.blocks:
+            for way in block.ways:
+                self.add_way(
+                    OSMWay(
+                        way.tags,
+                        way.id_,
+                        NodeList(
+                            self.node_table, self.node_table.get_rows(way.refs)
+                        ),
+                        *way.metadata,
+                    )
+                )
+
+        for block in pbf_data.blocks:
+            for relation in block.relations:
+                self.add_relation(
+                    OSMRelation(
+                        relation.tags,
+                        relation.id_,
+                        [OSMMember(*member) for member in relation.members],
+                        *relation.metadata,
+                    )
+                )
 
-    def parse_osm_file(self, file_name: Path) -> None:
+    def parse_osm_file(
+        self, file_name: Path, workers: Optional[int] = None
+    ) -> None:
         """
         Parse OSM XML file.
 
+        The file is parsed incrementally: every top-level element is processed
+        as soon as its end tag arrives and is cleared right after that, so the
+        whole XML tree is never kept in memory.
+
+        If several workers are requested, the file is split into chunks at
+        element boundaries, chunks are parsed by a process pool, and node
+        references of ways are resolved after all nodes are merged.
+        Compressed files cannot be split, so they are always parsed in one
+        process.
+
         See https://wiki.openstreetmap.org/wiki/OSM_XML
 
         :param file_name: input XML file
+        :param workers: number of worker processes, one by default
         :return: parsed map
         """
-        self.parse_osm(ElementTree.parse(file_name).getroot())
+        if (
+            workers is None
+            or workers == 1
+            or detect_compression(file_name) != Compression.NONE
+        ):
+            self.parse_osm_stream(file_name)
+            return
+
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        ranges: list[tuple[int, int]] = split_xml_file(
+            file_name, workers * CHUNKS_PER_WORKER
+        )
+        if not ranges:
+            self.parse_osm_stream(file_name)
+            return
+
+        tasks: list[XMLChunkTask] = [
+            (file_name, offset, size, self.metadata_mode)
+            for offset, size in ranges
+        ]
+        if len(tasks) == 1:
+            chunks: list[XMLChunk] = [parse_xml_chunk(tasks[0])]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunks = list(executor.map(parse_xml_chunk, tasks))
+
+        self.add_xml_chunks(chunks)
+
+    def parse_osm_file_in_box(
+        self, file_name: Path, boundary_box: BoundaryBox
+    ) -> None:
+        """
+        Parse only the part of OSM XML file inside the boundary box.
+
+        Only nodes inside the boundary box, ways that reference these nodes,
+        and relations that reference kept nodes and ways are added.  Missing
+        member ways of kept multipolygon and boundary relations are read by
+        the second pass over the file, and nodes outside the boundary box
+        referenced by kept ways are read by the last pass, so the geometry of
+        ways and relations is complete.  Other elements are skipped before
+        node and way objects are constructed, so memory scales with the area,
+        not with the file.
+
+        :param file_name: input XML file
+        :param boundary_box: area to filter nodes, ways, and relations
+        """
+        index: dict[int, int] = self.node_table.index
+        # Ways with unresolved nodes and their node identifiers.
+        unresolved: list[tuple[OSMWay, list[int]]] = []
+        missing: set[int] = set()
+        missing_ways: set[int] = set()
+
+        for element in iterate_xml_elements(file_name):
+            if element.tag == "node":
+                attributes = element.attrib
+                latitude: float = float(attributes["lat"])
+                longitude: float = float(attributes["lon"])
+                if (
+                    boundary_box.bottom <= latitude <= boundary_box.top
+                    and boundary_box.left <= longitude <= boundary_box.right
+                ):
+                    self.parse_element(element)
+            elif element.tag == "way":
+                node_ids: list[int] = get_xml_node_ids(element)
+                if not any(x in index for x in node_ids):
+                    continue
+                way: OSMWay = OSMWay.from_xml_structure(
+                    element, None, self.tag_table, self.parse_metadata
+                )
+                self.add_way(way)
+                unresolved.append((way, node_ids))
+                missing.update(x for x in node_ids if x not in index)
+            elif element.tag == "relation":
+                relation: OSMRelation = OSMRelation.from_xml_structure(
+                    element, self.tag_table, self.parse_metadata
+                )
+                if self.is_relation_kept(relation):
+                    self.add_relation(relation)
+                    missing_ways.update(self.get_missing_ways(relation))
+            else:
+                self.parse_element(element)
+
+        if missing_ways:
+            for element in iterate_xml_elements(file_name):
+                if element.tag != "way":
+                    continue
+                id_: int = int(element.attrib["id"])
+                if id_ in missing_ways:
+                    node_ids: list[int] = get_xml_node_ids(element)
+                    way: OSMWay = OSMWay.from_xml_structure(
+                        element, None, self.tag_table, self.parse_metadata
+                    )
+                    self.add_way(way)
+                    unresolved.append((way, node_ids))
+                    missing.update(x for x in node_ids if x not in index)
+                    missing_ways.remove(id_)
+                    if not missing_ways:
+                        break
+
+        if missing:
+            for element in iterate_xml_elements(file_name):
+                if element.tag != "node":
+                    continue
+                id_: int = int(element.attrib["id"])
+                if id_ in missing:
+                    self.parse_element(element)
+                    missing.remove(id_)
+                    if not missing:
+                        break
+
+        for way, node_ids in unresolved:
+            way.nodes = NodeList(
+                self.node_table, self.node_table.get_rows(node_ids)
+            )
+
+    def is_relation_kept(self, relation: OSMRelation) -> bool:
+        """Check whether relation references any element of the map."""
+        for member in relation.members:
+            if (
+                member.type_ == "node"
+                and member.ref in self.nodes
+                or member.type_ == "way"
+                and member.ref in self.ways
+                or member.type_ == "relation"
+                and member.ref in self.relations
+            ):
+                return True
+        return False
+
+    def get_missing_ways(self, relation: OSMRelation) -> list[int]:
+        """
+        Get identifiers of member ways that are not loaded, if all member ways
+        are required for the relation geometry.
+        """
+        if relation.tags.get("type") not in COMPLETE_RELATION_TYPES:
+            return []
+        return [
+            member.ref
+            for member in relation.members
+            if member.type_ == "way" and member.ref not in self.ways
+        ]
+
+    def add_xml_chunks(self, chunks: list["XMLChunk"]) -> None:
+        """Merge chunks of OSM XML file parsed separately."""
+        for chunk in chunks:
+            for view_box in chunk.view_boxes:
+                if self.view_box:
+                    self.view_box.combine(view_box)
+                else:
+                    self.view_box = view_box
+            if chunk.equator_length is not None:
+                self.equator_length = chunk.equator_length
+            self.add_node_table(chunk.node_table)
+
+        for chunk in chunks:
+            for way, node_ids in chunk.ways:
+                way.nodes = NodeList(
+                    self.node_table, self.node_table.get_rows(node_ids)
+                )
+                self.add_way(way)
+
+        for chunk in chunks:
+            for relation in chunk.relations:
+                self.add_relation(relation)
 
     def parse_osm_text(self, text: str) -> None:
         """
@@ -453,6 +1629,27 @@ class OSMData:
         """
         self.parse_osm(ElementTree.fromstring(text))
 
+    def parse_osm_stream(
+        self,
+        source: Union[Path, BinaryIO],
+        parse_nodes: bool = True,
+        parse_ways: bool = True,
+        parse_relations: bool = True,
+    ) -> None:
+        """
+        Parse OSM XML data from file or binary stream using `iterparse`.
+
+        :param source: input file path or binary file object; file may be
+            compressed, see `open_input_file`
+        :param parse_nodes: whether nodes should be parsed
+        :param parse_ways: whether ways should be parsed
+        :param parse_relations: whether relations should be parsed
+        """
+        for element in iterate_xml_elements(source):
+            self.parse_element(
+                element, parse_nodes, parse_ways, parse_relations
+            )
+
     def parse_osm(
         self,
         root: Element,
@@ -469,27 +1666,55 @@ class OSMData:
         :param parse_relations: whether relations should be parsed
         """
         for element in root:
-            if element.tag == "bounds":
-                self.parse_bounds(element)
-            elif element.tag == "object":
-                self.parse_object(element)
-            elif element.tag == "node" and parse_nodes:
-                node = OSMNode.from_xml_structure(element)
-                self.add_node(node)
-            elif element.tag == "way" and parse_ways:
-                self.add_way(OSMWay.from_xml_structure(element, self.nodes))
-            elif element.tag == "relation" and parse_relations:
-                self.add_relation(OSMRelation.from_xml_structure(element))
+            self.parse_element(
+                element, parse_nodes, parse_ways, parse_relations
+            )
+
+    def parse_element(
+        self,
+        element: Element,
+        parse_nodes: bool = True,
+        parse_ways: bool = True,
+        parse_relations: bool = True,
+    ) -> None:
+        """
+        Parse one top-level OSM XML element: bounds, object, node, way, or
+        relation.
+
+        :param element: direct child of the `<osm>` element
+        :param parse_nodes: whether nodes should be parsed
+        :param parse_ways: whether ways should be parsed
+        :param parse_relations: whether relations should be parsed
+        """
+        if element.tag == "bounds":
+            self.parse_bounds(element)
+        elif element.tag == "object":
+            self.parse_object(element)
+        elif element.tag == "node" and parse_nodes:
+            self.add_node(
+                OSMNode.from_xml_structure(
+                    element, self.tag_table, self.parse_metadata
+                )
+            )
+        elif element.tag == "way" and parse_ways:
+            self.add_way(
+                OSMWay.from_xml_structure(
+                    element,
+                    self.node_table,
+                    self.tag_table,
+                    self.parse_metadata,
+                )
+            )
+        elif element.tag == "relation" and parse_relations:
+            self.add_relation(
+                OSMRelation.from_xml_structure(
+                    element, self.tag_table, self.parse_metadata
+                )
+            )
 
     def parse_bounds(self, element: Element) -> None:
         """Parse view box from XML element."""
-        attributes = element.attrib
-        boundary_box: BoundaryBox = BoundaryBox(
-            float(attributes["minlon"]),
-            float(attributes["minlat"]),
-            float(attributes["maxlon"]),
-            float(attributes["maxlat"]),
-        )
+        boundary_box: BoundaryBox = get_xml_boundary_box(element)
         if self.view_box:
             self.view_box.combine(boundary_box)
         else:
@@ -498,3 +1723,127 @@ class OSMData:
     def parse_object(self, element: Element) -> None:
         """Parse astronomical object properties from XML element."""
         self.equator_length = float(element.get("equator"))
+
+
+# Input file, offset and size of the chunk, and metadata mode.
+XMLChunkTask = tuple[Path, int, int, MetadataMode]
+
+
+@dataclass
+class XMLChunk:
+    """Elements of OSM XML file chunk parsed by a worker process."""
+
+    node_table: NodeTable
+    # Ways without nodes and identifiers of their nodes.
+    ways: list[tuple[OSMWay, list[int]]]
+    relations: list[OSMRelation]
+    view_boxes: list[BoundaryBox]
+    equator_length: Optional[float] = None
+
+
+def find_element_start(input_file: BinaryIO, position: int, end: int) -> int:
+    """
+    Find the start of the first top-level element after the position.
+
+    :return: position of the element start or `end` if there is none
+    """
+    # Overlap of search windows, should be longer than any element start.
+    overlap: int = 16
+
+    while position < end:
+        input_file.seek(position)
+        data: bytes = input_file.read(min(XML_SEARCH_SIZE, end - position))
+        if not data:
+            break
+        match: Optional[re.Match] = ELEMENT_START_PATTERN.search(data)
+        if match:
+            return min(position + match.start(), end)
+        if len(data) <= overlap:
+            break
+        position += len(data) - overlap
+
+    return end
+
+
+def split_xml_file(path: Path, count: int) -> list[tuple[int, int]]:
+    """
+    Split OSM XML file into approximately equal byte ranges at top-level
+    element boundaries.
+
+    :param path: input OSM XML file
+    :param count: maximum number of ranges
+    :return: offsets and sizes of ranges or empty list if the file structure
+        is not recognized
+    """
+    file_size: int = path.stat().st_size
+
+    with path.open("rb") as input_file:
+        start: int = find_element_start(input_file, 0, file_size)
+        if start == file_size:
+            return []
+
+        tail_start: int = max(start, file_size - XML_SEARCH_SIZE)
+        input_file.seek(tail_start)
+        end_position: int = input_file.read().rfind(b"</osm>")
+        if end_position == -1:
+            return []
+        end: int = tail_start + end_position
+
+        boundaries: list[int] = [start]
+        for index in range(1, count):
+            position: int = start + (end - start) * index // count
+            if position <= boundaries[-1]:
+                continue
+            boundary: int = find_element_start(input_file, position, end)
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+        if boundaries[-1] != end:
+            boundaries.append(end)
+
+    return [
+        (boundaries[index], boundaries[index + 1] - boundaries[index])
+        for index in range(len(boundaries) - 1)
+    ]
+
+
+def parse_xml_chunk(task: XMLChunkTask) -> XMLChunk:
+    """
+    Parse top-level elements of OSM XML file chunk.  Nodes of ways are not
+    resolved, since they may be in other chunks.
+    """
+    path, offset, size, metadata_mode = task
+    with path.open("rb") as input_file:
+        input_file.seek(offset)
+        data: bytes = input_file.read(size)
+
+    osm_data: OSMData = OSMData(metadata_mode)
+    chunk: XMLChunk = XMLChunk(osm_data.node_table, [], [], [])
+
+    for element in iterate_xml_elements(BytesIO(b"<osm>" + data + b"</osm>")):
+        if element.tag == "node":
+            osm_data.parse_element(element)
+        elif element.tag == "way":
+            chunk.ways.append(
+                (
+                    OSMWay.from_xml_structure(
+                        element,
+                        None,
+                        osm_data.tag_table,
+                        osm_data.parse_metadata,
+                    ),
+                    get_xml_node_ids(element),
+                )
+            )
+        elif element.tag == "relation":
+            chunk.relations.append(
+                OSMRelation.from_xml_structure(
+                    element, osm_data.tag_table, osm_data.parse_metadata
+                )
+            )
+        elif element.tag == "bounds":
+            chunk.view_boxes.append(get_xml_boundary_box(element))
+        elif element.tag == "object":
+            chunk.equator_length = float(element.get("equator"))
+
+    chunk.node_table.trim()
+    return chunk
@@ -0,0 +1,151 @@
+"""
+Streaming reader of Overpass API JSON output.
+
+See https://wiki.openstreetmap.org/wiki/Overpass_API
+"""
+import io
+import json
+import re
+from pathlib import Path
+from typing import Any, Iterator, Optional, TextIO
+
+from map_machine.osm.compression import open_input_file
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+CHUNK_SIZE: int = 1 << 16
+WHITESPACE_PATTERN: re.Pattern = re.compile(r"[ \t\n\r]*")
+SEPARATOR_PATTERN: re.Pattern = re.compile(r"[ \t\n\r]*,[ \t\n\r]*")
+NUMBER_START: str = "-0123456789"
+NUMBER_END_PATTERN: re.Pattern = re.compile(r"[ \t\n\r,\]}]")
+
+
+class OverpassFormatException(Exception):
+    """Overpass JSON document is not well-formed."""
+
+
+class JSONStream:
+    """
+    JSON text read from the file by chunks.  Values are decoded one by one,
+    so the whole document is never loaded into memory.
+    """
+
+    def __init__(
+        self, input_file: TextIO, chunk_size: int = CHUNK_SIZE
+    ) -> None:
+        self.input_file: TextIO = input_file
+        self.chunk_size: int = chunk_size
+        self.decoder: json.JSONDecoder = json.JSONDecoder()
+        self.buffer: str = ""
+        self.position: int = 0
+
+    def fill(self) -> bool:
+        """
+        Read the next chunk, dropping already decoded text.
+
+        :return: false if the end of the file is reached
+        """
+        chunk: str = self.input_file.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.position :] + chunk
+        self.position = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and get the next character or "" at the end."""
+        while True:
+            self.position = WHITESPACE_PATTERN.match(
+                self.buffer, self.position
+            ).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill():
+                return ""
+
+    def expect(self, character: str) -> None:
+        """Skip the next character, that should be the specified one."""
+        if self.peek() != character:
+            raise OverpassFormatException(
+                f"Expected `{character}`, got `{self.peek()}`."
+            )
+        self.position += 1
+
+    def skip(self, character: str) -> bool:
+        """Skip the next character if it is the specified one."""
+        if self.peek() == character:
+            self.position += 1
+            return True
+        return False
+
+    def decode(self) -> Any:
+        """Decode the next JSON value."""
+        # Number at the end of the buffer may be truncated but still valid,
+        # so it is decoded only when it is followed by a delimiter.
+        character: str = self.peek()
+        if character and character in NUMBER_START:
+            while not NUMBER_END_PATTERN.search(self.buffer, self.position):
+                if not self.fill():
+                    break
+
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError as error:
+                # Value may be incomplete: try to read more.
+                if not self.fill():
+                    raise OverpassFormatException(str(error))
+                continue
+            self.position = end
+            return value
+
+    def iterate_array(self) -> Iterator[Any]:
+        """Decode array values one by one."""
+        self.expect("[")
+        if self.skip("]"):
+            return
+        while True:
+            yield self.decode()
+            # Fast path: separator and the start of the next value are in the
+            # buffer.
+            match: Optional[re.Match] = SEPARATOR_PATTERN.match(
+                self.buffer, self.position
+            )
+            if match and match.end() < len(self.buffer):
+                self.position = match.end()
+            elif not self.skip(","):
+                break
+        self.expect("]")
+
+
+def iterate_elements(
+    input_file: TextIO, chunk_size: int = CHUNK_SIZE
+) -> Iterator[dict[str, Any]]:
+    """
+    Decode elements of the Overpass JSON document one by one.  Other
+    top-level values are skipped.
+
+    :param input_file: text file with Overpass JSON document
+    :param chunk_size: number of characters to read at once
+    """
+    stream: JSONStream = JSONStream(input_file, chunk_size)
+
+    stream.expect("{")
+    if stream.skip("}"):
+        return
+    while True:
+        key: Any = stream.decode()
+        stream.expect(":")
+        if key == "elements":
+            yield from stream.iterate_array()
+        else:
+            stream.decode()
+        if not stream.skip(","):
+            break
+    stream.expect("}")
+
+
+def open_overpass_file(path: Path) -> TextIO:
+    """Open Overpass JSON file, that may be compressed."""
+    return io.TextIOWrapper(open_input_file(path), encoding="utf-8")
@@ -0,0 +1,841 @@
+"""
+Decode OpenStreetMap PBF files without external binaries.
+
+See https://wiki.openstreetmap.org/wiki/PBF_Format
+"""
+import lzma
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+import numpy as np
+
+from map_machine.geometry.boundary_box import BoundaryBox
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+# Protocol Buffers wire types.
+VARINT: int = 0
+FIXED_64: int = 1
+LENGTH_DELIMITED: int = 2
+FIXED_32: int = 5
+
+NANO: float = 1e-9
+MEMBER_TYPES: list[str] = ["node", "way", "relation"]
+# Relations of these types are drawn as areas, so all their member ways are
+# loaded when input files are filtered, even if they are outside the area.
+COMPLETE_RELATION_TYPES: set[str] = {"multipolygon", "boundary"}
+
+# Visible, changeset, timestamp, user, and uid, the same as for XML elements.
+Metadata = tuple[
+    Optional[str],
+    Optional[str],
+    Optional[datetime],
+    Optional[str],
+    Optional[str],
+]
+NO_METADATA: Metadata = (None, None, None, None, None)
+
+
+class PBFFormatException(Exception):
+    """PBF file is not well-formed or uses unsupported features."""
+
+
+@dataclass
+class BlockParameters:
+    """Parameters of the primitive block used to decode its primitives."""
+
+    strings: list[str]
+    granularity: int = 100
+    lat_offset: int = 0
+    lon_offset: int = 0
+    date_granularity: int = 1000
+    # Whether `Info` and `DenseInfo` messages should be decoded.
+    parse_metadata: bool = True
+
+
+@dataclass
+class PBFWay:
+    """Decoded way with node references as identifiers."""
+
+    id_: int
+    tags: dict[str, str]
+    refs: list[int]
+    metadata: Metadata = NO_METADATA
+
+
+@dataclass
+class PBFRelation:
+    """Decoded relation with members as (type, reference, role)."""
+
+    id_: int
+    tags: dict[str, str]
+    members: list[tuple[str, int, str]]
+    metadata: Metadata = NO_METADATA
+
+
+@dataclass
+class PBFBlock:
+    """Primitives decoded from one `OSMData` blob."""
+
+    node_ids: np.ndarray = field(
+        default_factory=lambda: np.empty(0, dtype=np.int64)
+    )
+    # Node coordinates in the form of N × (latitude, longitude).
+    node_coordinates: np.ndarray = field(
+        default_factory=lambda: np.empty((0, 2), dtype=np.float64)
+    )
+    # Node index in the block to tags, only for tagged nodes.
+    node_tags: dict[int, dict[str, str]] = field(default_factory=dict)
+    # Node index in the block to metadata, only for nodes with metadata.
+    node_metadata: dict[int, Metadata] = field(default_factory=dict)
+    ways: list[PBFWay] = field(default_factory=list)
+    relations: list[PBFRelation] = field(default_factory=list)
+    # Whether the block contained any nodes, ways, or relations before
+    # filtering.
+    has_nodes: bool = False
+    has_ways: bool = False
+    has_relations: bool = False
+
+
+@dataclass
+class BlockFilter:
+    """Primitives that should be decoded from blocks."""
+
+    # Nodes outside the boundary box are dropped.
+    boundary_box: Optional[BoundaryBox] = None
+    # Only nodes with these identifiers are decoded.
+    node_ids: Optional[frozenset[int]] = None
+    # Only ways that reference any of these nodes are decoded.
+    way_node_ids: Optional[frozenset[int]] = None
+    # Only ways with these identifiers are decoded.
+    way_ids: Optional[frozenset[int]] = None
+    nodes: bool = True
+    ways: bool = True
+    relations: bool = True
+
+    def keeps_way(self, way: PBFWay) -> bool:
+        """Check whether the decoded way passes the filter."""
+        if self.way_ids is not None and way.id_ not in self.way_ids:
+            return False
+        if self.way_node_ids is not None:
+            return any(x in self.way_node_ids for x in way.refs)
+        return True
+
+
+@dataclass
+class PBFData:
+    """All primitives decoded from the PBF file."""
+
+    view_box: Optional[BoundaryBox]
+    blocks: list[PBFBlock]
+
+
+def read_varint(data: bytes, position: int) -> tuple[int, int]:
+    """
+    Read unsigned variable-length integer.
+
+    :param data: encoded data
+    :param position: position of the first byte of the integer
+    :return: integer value and position of the next byte
+    """
+    result: int = 0
+    shift: int = 0
+    while True:
+        byte: int = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+
+def to_signed(value: int) -> int:
+    """Interpret 64-bit varint as two's complement signed integer."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def zigzag(value: int) -> int:
+    """Decode ZigZag-encoded signed integer."""
+    return (value >> 1) ^ -(value & 1)
+
+
+def iterate_fields(data: bytes) -> Iterator[tuple[int, Union[int, bytes]]]:
+    """
+    Iterate over fields of the Protocol Buffers message.
+
+    :param data: encoded message
+    :return: field numbers and values: integers for varints, bytes otherwise
+    """
+    position: int = 0
+    length: int = len(data)
+
+    while position < length:
+        key, position = read_varint(data, position)
+        field_number: int = key >> 3
+        wire_type: int = key & 7
+
+        if wire_type == VARINT:
+            value, position = read_varint(data, position)
+        elif wire_type == LENGTH_DELIMITED:
+            size, position = read_varint(data, position)
+            value = data[position : position + size]
+            position += size
+        elif wire_type == FIXED_64:
+            value = data[position : position + 8]
+            position += 8
+        elif wire_type == FIXED_32:
+            value = data[position : position + 4]
+            position += 4
+        else:
+            raise PBFFormatException(f"Unsupported wire type {wire_type}.")
+
+        yield field_number, value
+
+
+def decode_packed(data: bytes) -> list[int]:
+    """Decode packed repeated unsigned varints."""
+    result: list[int] = []
+    position: int = 0
+    length: int = len(data)
+    while position < length:
+        value, position = read_varint(data, position)
+        result.append(value)
+    return result
+
+
+def decode_packed_signed(data: bytes) -> np.ndarray:
+    """Decode packed repeated ZigZag-encoded varints (`sint32`, `sint64`)."""
+    values: np.ndarray = np.array(decode_packed(data), dtype=np.uint64)
+    return (values >> np.uint64(1)).astype(np.int64) ^ -(
+        values & np.uint64(1)
+    ).astype(np.int64)
+
+
+def decode_delta(data: bytes) -> np.ndarray:
+    """Decode packed delta-coded ZigZag varints."""
+    return np.cumsum(decode_packed_signed(data), dtype=np.int64)
+
+
+def decode_blob(data: bytes) -> bytes:
+    """
+    Decompress the `Blob` message.
+
+    :param data: encoded `Blob` message
+    :return: decompressed block data
+    """
+    raw_size: Optional[int] = None
+
+    for field_number, value in iterate_fields(data):
+        if field_number == 1:
+            return value
+        if field_number == 2:
+            raw_size = value
+        elif field_number == 3:
+            return zlib.decompress(value, bufsize=raw_size or zlib.DEF_BUF_SIZE)
+        elif field_number == 4:
+            return lzma.decompress(value)
+        elif field_number in (5, 6, 7):
+            raise PBFFormatException(
+                "Only raw, zlib, and LZMA blob compression is supported."
+            )
+
+    raise PBFFormatException("Blob has no data.")
+
+
+def decode_header_block(data: bytes) -> Optional[BoundaryBox]:
+    """
+    Decode `HeaderBlock` message and check required features.
+
+    :param data: decompressed header block
+    :return: boundary box of the file if it is specified
+    """
+    boundary_box: Optional[BoundaryBox] = None
+
+    for field_number, value in iterate_fields(data):
+        if field_number == 1:
+            box: dict[int, float] = {
+                number: zigzag(coordinate) * NANO
+                for number, coordinate in iterate_fields(value)
+            }
+            boundary_box = BoundaryBox(box[1], box[4], box[2], box[3])
+        elif field_number == 4:
+            feature: str = value.decode("utf-8")
+            if feature not in ("OsmSchema-V0.6", "DenseNodes"):
+                raise PBFFormatException(
+                    f"Required feature `{feature}` is not supported."
+                )
+
+    return boundary_box
+
+
+def decode_info(data: bytes, parameters: BlockParameters) -> Metadata:
+    """Decode `Info` message into element metadata."""
+    visible: Optional[str] = None
+    changeset: Optional[str] = None
+    timestamp: Optional[datetime] = None
+    user: Optional[str] = None
+    uid: Optional[str] = None
+
+    for field_number, value in iterate_fields(data):
+        if field_number == 2:
+            timestamp = get_time(value * parameters.date_granularity)
+        elif field_number == 3:
+            changeset = str(to_signed(value))
+        elif field_number == 4:
+            uid = str(to_signed(value))
+        elif field_number == 5:
+            user = parameters.strings[value]
+        elif field_number == 6:
+            visible = "true" if value else "false"
+
+    return visible, changeset, timestamp, user, uid
+
+
+def get_time(milliseconds: int) -> datetime:
+    """Convert milliseconds since epoch into naive UTC time."""
+    return datetime.fromtimestamp(milliseconds / 1000.0, timezone.utc).replace(
+        tzinfo=None
+    )
+
+
+def decode_tags(
+    keys: bytes, values: bytes, strings: list[str]
+) -> dict[str, str]:
+    """Decode tags from packed string table indices."""
+    return {
+        strings[key]: strings[value]
+        for key, value in zip(decode_packed(keys), decode_packed(values))
+    }
+
+
+class BlockDecoder:
+    """
+    Decoder of one `PrimitiveBlock` message.
+
+    Primitives that do not pass the filter are dropped while decoding, so
+    that they are never sent from worker processes.
+    """
+
+    def __init__(
+        self, block_filter: BlockFilter, parse_metadata: bool = True
+    ) -> None:
+        self.filter: BlockFilter = block_filter
+        self.parse_metadata: bool = parse_metadata
+
+        self.ids: list[np.ndarray] = []
+        self.coordinates: list[np.ndarray] = []
+        self.block: PBFBlock = PBFBlock()
+
+    def decode(self, data: bytes) -> PBFBlock:
+        """Decode primitive block."""
+        parameters: BlockParameters = BlockParameters(
+            [], parse_metadata=self.parse_metadata
+        )
+        groups: list[bytes] = []
+
+        for field_number, value in iterate_fields(data):
+            if field_number == 1:
+                parameters.strings = [
+                    string.decode("utf-8")
+                    for number, string in iterate_fields(value)
+                    if number == 1
+                ]
+            elif field_number == 2:
+                groups.append(value)
+            elif field_number == 17:
+                parameters.granularity = value
+            elif field_number == 18:
+                parameters.date_granularity = value
+            elif field_number == 19:
+                parameters.lat_offset = to_signed(value)
+            elif field_number == 20:
+                parameters.lon_offset = to_signed(value)
+
+        for group in groups:
+            self.decode_group(group, parameters)
+
+        if self.ids:
+            self.block.node_ids = np.concatenate(self.ids)
+            self.block.node_coordinates = np.concatenate(self.coordinates)
+
+        return self.block
+
+    def decode_group(self, data: bytes, parameters: BlockParameters) -> None:
+        """Decode `PrimitiveGroup` message."""
+        for field_number, value in iterate_fields(data):
+            if field_number in (1, 2):
+                self.block.has_nodes = True
+                if not self.filter.nodes:
+                    continue
+                if field_number == 1:
+                    self.decode_node(value, parameters)
+                else:
+                    self.decode_dense_nodes(value, parameters)
+            elif field_number == 3:
+                self.block.has_ways = True
+                if self.filter.ways:
+                    way: PBFWay = decode_way(value, parameters)
+                    if self.filter.keeps_way(way):
+                        self.block.ways.append(way)
+            elif field_number == 4:
+                self.block.has_relations = True
+                if self.filter.relations:
+                    self.block.relations.append(
+                        decode_relation(value, parameters)
+                    )
+
+    def get_mask(self, ids: np.ndarray, coordinates: np.ndarray) -> np.ndarray:
+        """Get mask of nodes that should be kept."""
+        node_ids: Optional[frozenset[int]] = self.filter.node_ids
+        if node_ids is not None:
+            return np.fromiter(
+                (id_ in node_ids for id_ in ids.tolist()),
+                dtype=bool,
+                count=len(ids),
+            )
+        boundary_box: Optional[BoundaryBox] = self.filter.boundary_box
+        if boundary_box is not None:
+            return (
+                (coordinates[:, 0] >= boundary_box.bottom)
+                & (coordinates[:, 0] <= boundary_box.top)
+                & (coordinates[:, 1] >= boundary_box.left)
+                & (coordinates[:, 1] <= boundary_box.right)
+            )
+        return np.ones(len(ids), dtype=bool)
+
+    def add_nodes(
+        self,
+        ids: np.ndarray,
+        coordinates: np.ndarray,
+        tags: list[dict[str, str]],
+        metadata: list[Metadata],
+    ) -> None:
+        """Add nodes that pass the filter to the block."""
+        mask: np.ndarray = self.get_mask(ids, coordinates)
+        start: int = sum(len(x) for x in self.ids)
+
+        for new_index, index in enumerate(np.flatnonzero(mask)):
+            if tags and tags[index]:
+                self.block.node_tags[start + new_index] = tags[index]
+            if metadata and metadata[index] != NO_METADATA:
+                self.block.node_metadata[start + new_index] = metadata[index]
+
+        self.ids.append(ids[mask])
+        self.coordinates.append(coordinates[mask])
+
+    def get_coordinates(
+        self, lat: np.ndarray, lon: np.ndarray, parameters: BlockParameters
+    ) -> np.ndarray:
+        """Convert encoded latitudes and longitudes into degrees."""
+        return np.column_stack(
+            (
+                (parameters.lat_offset + parameters.granularity * lat) * NANO,
+                (parameters.lon_offset + parameters.granularity * lon) * NANO,
+            )
+        )
+
+    def decode_node(self, data: bytes, parameters: BlockParameters) -> None:
+        """Decode `Node` message."""
+        id_: int = 0
+        lat: int = 0
+        lon: int = 0
+        keys: bytes = b""
+        values: bytes = b""
+        metadata: Metadata = NO_METADATA
+
+        for field_number, value in iterate_fields(data):
+            if field_number == 1:
+                id_ = zigzag(value)
+            elif field_number == 2:
+                keys = value
+            elif field_number == 3:
+                values = value
+            elif field_number == 4 and parameters.parse_metadata:
+                metadata = decode_info(value, parameters)
+            elif field_number == 8:
+                lat = zigzag(value)
+            elif field_number == 9:
+                lon = zigzag(value)
+
+        self.add_nodes(
+            np.array([id_], dtype=np.int64),
+            self.get_coordinates(
+                np.array([lat], dtype=np.int64),
+                np.array([lon], dtype=np.int64),
+                parameters,
+            ),
+            [decode_tags(keys, values, parameters.strings)],
+            [metadata],
+        )
+
+    def decode_dense_nodes(
+        self, data: bytes, parameters: BlockParameters
+    ) -> None:
+        """Decode `DenseNodes` message."""
+        ids: np.ndarray = np.empty(0, dtype=np.int64)
+        lat: np.ndarray = np.empty(0, dtype=np.int64)
+        lon: np.ndarray = np.empty(0, dtype=np.int64)
+        keys_values: list[int] = []
+        metadata: list[Metadata] = []
+
+        for field_number, value in iterate_fields(data):
+            if field_number == 1:
+                ids = decode_delta(value)
+            elif field_number == 5 and parameters.parse_metadata:
+                metadata = decode_dense_info(value, parameters)
+            elif field_number == 8:
+                lat = decode_delta(value)
+            elif field_number == 9:
+                lon = decode_delta(value)
+            elif field_number == 10:
+                keys_values = decode_packed(value)
+
+        tags: list[dict[str, str]] = []
+        if keys_values:
+            current: dict[str, str] = {}
+            index: int = 0
+            while index < len(keys_values):
+                if keys_values[index] == 0:
+                    tags.append(current)
+                    current = {}
+                    index += 1
+                    continue
+                key: str = parameters.strings[keys_values[index]]
+                current[key] = parameters.strings[keys_values[index + 1]]
+                index += 2
+
+        self.add_nodes(
+            ids, self.get_coordinates(lat, lon, parameters), tags, metadata
+        )
+
+
+def decode_dense_info(
+    data: bytes, parameters: BlockParameters
+) -> list[Metadata]:
+    """Decode `DenseInfo` message into metadata for every node."""
+    timestamps: Optional[np.ndarray] = None
+    changesets: Optional[np.ndarray] = None
+    uids: Optional[np.ndarray] = None
+    user_ids: Optional[np.ndarray] = None
+    visible: Optional[list[int]] = None
+
+    for field_number, value in iterate_fields(data):
+        if field_number == 2:
+            timestamps = decode_delta(value)
+        elif field_number == 3:
+            changesets = decode_delta(value)
+        elif field_number == 4:
+            uids = decode_delta(value)
+        elif field_number == 5:
+            user_ids = decode_delta(value)
+        elif field_number == 6:
+            visible = decode_packed(value)
+
+    size: int = max(
+        len(x)
+        for x in (timestamps, changesets, uids, user_ids, visible, [])
+        if x is not None
+    )
+    return [
+        (
+            None if visible is None else ("true" if visible[i] else "false"),
+            None if changesets is None else str(changesets[i]),
+            None
+            if timestamps is None
+            else get_time(int(timestamps[i]) * parameters.date_granularity),
+            None if user_ids is None else parameters.strings[user_ids[i]],
+            None if uids is None else str(uids[i]),
+        )
+        for i in range(size)
+    ]
+
+
+def decode_way(data: bytes, parameters: BlockParameters) -> PBFWay:
+    """Decode `Way` message."""
+    id_: int = 0
+    keys: bytes = b""
+    values: bytes = b""
+    refs: list[int] = []
+    metadata: Metadata = NO_METADATA
+
+    for field_number, value in iterate_fields(data):
+        if field_number == 1:
+            id_ = to_signed(value)
+        elif field_number == 2:
+            keys = value
+        elif field_number == 3:
+            values = value
+        elif field_number == 4 and parameters.parse_metadata:
+            metadata = decode_info(value, parameters)
+        elif field_number == 8:
+            refs = decode_delta(value).tolist()
+
+    return PBFWay(
+        id_, decode_tags(keys, values, parameters.strings), refs, metadata
+    )
+
+
+def decode_relation(data: bytes, parameters: BlockParameters) -> PBFRelation:
+    """Decode `Relation` message."""
+    id_: int = 0
+    keys: bytes = b""
+    values: bytes = b""
+    roles: list[int] = []
+    member_ids: list[int] = []
+    types: list[int] = []
+    metadata: Metadata = NO_METADATA
+
+    for field_number, value in iterate_fields(data):
+        if field_number == 1:
+            id_ = to_signed(value)
+        elif field_number == 2:
+            keys = value
+        elif field_number == 3:
+            values = value
+        elif field_number == 4 and parameters.parse_metadata:
+            metadata = decode_info(value, parameters)
+        elif field_number == 8:
+            roles = decode_packed(value)
+        elif field_number == 9:
+            member_ids = decode_delta(value).tolist()
+        elif field_number == 10:
+            types = decode_packed(value)
+
+    members: list[tuple[str, int, str]] = [
+        (MEMBER_TYPES[type_], member_id, parameters.strings[role])
+        for type_, member_id, role in zip(types, member_ids, roles)
+    ]
+    return PBFRelation(
+        id_, decode_tags(keys, values, parameters.strings), members, metadata
+    )
+
+
+def get_blob_positions(
+    path: Path,
+) -> tuple[Optional[BoundaryBox], list[tuple[int, int]]]:
+    """
+    Read blob headers of the PBF file.
+
+    :param path: PBF file path
+    :return: boundary box from the file header and (offset, size) of every
+        `OSMData` blob
+    """
+    boundary_box: Optional[BoundaryBox] = None
+    positions: list[tuple[int, int]] = []
+
+    with path.open("rb") as input_file:
+        while True:
+            size_data: bytes = input_file.read(4)
+            if not size_data:
+                break
+            if len(size_data) < 4:
+                raise PBFFormatException("Unexpected end of file.")
+
+            header_size: int = struct.unpack(">I", size_data)[0]
+            blob_type: str = ""
+            blob_size: int = 0
+            for field_number, value in iterate_fields(
+                input_file.read(header_size)
+            ):
+                if field_number == 1:
+                    blob_type = value.decode("utf-8")
+                elif field_number == 3:
+                    blob_size = value
+
+            if blob_type == "OSMHeader":
+                boundary_box = decode_header_block(
+                    decode_blob(input_file.read(blob_size))
+                )
+            elif blob_type == "OSMData":
+                positions.append((input_file.tell(), blob_size))
+                input_file.seek(blob_size, os.SEEK_CUR)
+            else:
+                input_file.seek(blob_size, os.SEEK_CUR)
+
+    return boundary_box, positions
+
+
+# File path, blob offset, blob size, and whether metadata should be decoded.
+BlockTask = tuple[Path, int, int, bool]
+
+# Filter of the current decoding pass, set once for every worker process, so
+# that large identifier sets are not sent with every task.
+block_filter: BlockFilter = BlockFilter()
+
+
+def set_block_filter(new_filter: BlockFilter) -> None:
+    """Set filter of the current decoding pass."""
+    global block_filter
+    block_filter = new_filter
+
+
+def decode_block(task: BlockTask) -> PBFBlock:
+    """
+    Read and decode one `OSMData` blob.  This function is executed in worker
+    processes.
+
+    :param task: blob position and decoding parameters
+    """
+    path, offset, size, parse_metadata = task
+    with path.open("rb") as input_file:
+        input_file.seek(offset)
+        data: bytes = decode_blob(input_file.read(size))
+    return BlockDecoder(block_filter, parse_metadata).decode(data)
+
+
+def read_pbf_file(
+    path: Path,
+    boundary_box: Optional[BoundaryBox] = None,
+    workers: Optional[int] = None,
+    parse_metadata: bool = True,
+) -> PBFData:
+    """
+    Decode PBF file.
+
+    If boundary box is specified, only nodes inside it, ways that reference
+    these nodes, and relations that reference these nodes and ways are kept.
+    All member ways of kept multipolygon and boundary relations and nodes
+    outside the boundary box referenced by kept ways are kept too, so the
+    geometry of ways and relations is complete.  Other primitives are dropped
+    by worker processes while decoding: the file is decoded in several passes
+    over the blocks that may contain required primitives.
+
+    :param path: PBF file path
+    :param boundary_box: area to filter primitives
+    :param workers: number of worker processes, all processors by default
+    :param parse_metadata: whether element metadata (visible, changeset,
+        timestamp, user, and uid) should be decoded
+    """
+    view_box, positions = get_blob_positions(path)
+    tasks: list[BlockTask] = [
+        (path, offset, size, parse_metadata) for offset, size in positions
+    ]
+
+    if boundary_box is None:
+        return PBFData(view_box, decode_blocks(tasks, workers, BlockFilter()))
+
+    # Nodes inside the boundary box.
+    blocks: list[PBFBlock] = decode_blocks(
+        tasks,
+        workers,
+        BlockFilter(boundary_box, ways=False, relations=False),
+    )
+    node_ids: set[int] = set()
+    for block in blocks:
+        node_ids.update(block.node_ids.tolist())
+
+    # Ways referencing these nodes, and all relations.
+    element_blocks: list[int] = [
+        index
+        for index, block in enumerate(blocks)
+        if block.has_ways or block.has_relations
+    ]
+    for index, block in zip(
+        element_blocks,
+        decode_blocks(
+            [tasks[x] for x in element_blocks],
+            workers,
+            BlockFilter(nodes=False, way_node_ids=frozenset(node_ids)),
+        ),
+    ):
+        blocks[index].ways = block.ways
+        blocks[index].relations = block.relations
+
+    way_ids: set[int] = {way.id_ for block in blocks for way in block.ways}
+    relation_ids: set[int] = set()
+    missing_ways: set[int] = set()
+    for block in blocks:
+        block.relations = [
+            relation
+            for relation in block.relations
+            if is_relation_kept(relation, node_ids, way_ids, relation_ids)
+        ]
+        for relation in block.relations:
+            relation_ids.add(relation.id_)
+            if relation.tags.get("type") in COMPLETE_RELATION_TYPES:
+                missing_ways.update(
+                    ref
+                    for type_, ref, _ in relation.members
+                    if type_ == "way" and ref not in way_ids
+                )
+
+    # Missing member ways of multipolygon and boundary relations.
+    if missing_ways:
+        way_blocks: list[int] = [
+            index for index, block in enumerate(blocks) if block.has_ways
+        ]
+        for index, block in zip(
+            way_blocks,
+            decode_blocks(
+                [tasks[x] for x in way_blocks],
+                workers,
+                BlockFilter(
+                    nodes=False,
+                    relations=False,
+                    way_ids=frozenset(missing_ways),
+                ),
+            ),
+        ):
+            blocks[index].ways += block.ways
+
+    # Nodes outside the boundary box referenced by kept ways.
+    missing: set[int] = {
+        x
+        for block in blocks
+        for way in block.ways
+        for x in way.refs
+        if x not in node_ids
+    }
+    if missing:
+        blocks += decode_blocks(
+            [task for task, block in zip(tasks, blocks) if block.has_nodes],
+            workers,
+            BlockFilter(
+                node_ids=frozenset(missing), ways=False, relations=False
+            ),
+        )
+
+    return PBFData(view_box, blocks)
+
+
+def is_relation_kept(
+    relation: PBFRelation,
+    node_ids: set[int],
+    way_ids: set[int],
+    relation_ids: set[int],
+) -> bool:
+    """Check whether relation references any kept element."""
+    for type_, ref, _ in relation.members:
+        if (
+            type_ == "node"
+            and ref in node_ids
+            or type_ == "way"
+            and ref in way_ids
+            or type_ == "relation"
+            and ref in relation_ids
+        ):
+            return True
+    return False
+
+
+def decode_blocks(
+    tasks: list[BlockTask], workers: Optional[int], new_filter: BlockFilter
+) -> list[PBFBlock]:
+    """Decode blobs in parallel preserving their order."""
+    set_block_filter(new_filter)
+    if workers == 1 or len(tasks) <= 1:
+        return [decode_block(task) for task in tasks]
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=set_block_filter,
+        initargs=(new_filter,),
+    ) as executor:
+        return list(executor.map(decode_block, tasks))
@@ -0,0 +1,310 @@
+"""
+Binary snapshots of parsed OpenStreetMap data.
+
+Parsing OSM XML is much slower than reading the same data in a binary form,
+so parsed data is stored next to the source file and is reused while the
+source file is not changed.  Snapshot layout:
+
+    magic | header size | objects size | header | objects | arrays
+
+Header is JSON with the source file key, metadata mode, and the array layout,
+objects is a pickled structure of tags, metadata, and relations, and arrays
+are raw NumPy arrays: node identifiers, node coordinates, and way node rows.
+Arrays are memory-mapped on load, so node coordinates are not read until
+they are used.
+"""
+import json
+import logging
+import mmap
+import os
+import pickle
+import struct
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Optional
+
+import numpy as np
+
+from map_machine.osm.osm_reader import (
+    MetadataMode,
+    NodeList,
+    NodeTable,
+    NodeView,
+    OSMData,
+    OSMWay,
+)
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+SNAPSHOT_MAGIC: bytes = b"MMSNAP\x00\x02"
+SNAPSHOT_SUFFIX: str = ".snapshot"
+SNAPSHOT_PREAMBLE: struct.Struct = struct.Struct("<8sQQ")
+ARRAY_ALIGNMENT: int = 64
+
+
+@dataclass
+class SnapshotKey:
+    """Source file state that snapshot is valid for."""
+
+    path: str
+    modification_time: int  # In nanoseconds.
+    size: int
+
+    @classmethod
+    def from_file(cls, path: Path) -> "SnapshotKey":
+        """Get the current state of the source file."""
+        status: os.stat_result = path.stat()
+        return cls(str(path.resolve()), status.st_mtime_ns, status.st_size)
+
+
+def get_snapshot_path(path: Path) -> Path:
+    """Get snapshot file path for the source file."""
+    return path.with_name(path.name + SNAPSHOT_SUFFIX)
+
+
+def write_snapshot(
+    osm_data: OSMData, path: Path, snapshot_path: Optional[Path] = None
+) -> Path:
+    """
+    Write snapshot of the data parsed from the source file.
+
+    Snapshot is written to a temporary file first and then is moved, so
+    concurrent readers never see a partially written snapshot.
+
+    :param osm_data: data parsed from the source file
+    :param path: source file
+    :param snapshot_path: snapshot file, next to the source file by default
+    :return: snapshot file path
+    """
+    if snapshot_path is None:
+        snapshot_path = get_snapshot_path(path)
+
+    table: NodeTable = osm_data.node_table
+    way_rows: list[np.ndarray] = []
+    ways: list[tuple] = []
+    for way in osm_data.ways.values():
+        if isinstance(way.nodes, NodeList) and way.nodes.table is table:
+            way_rows.append(way.nodes.rows)
+        else:
+            way_rows.append(table.get_rows(node.id_ for node in way.nodes))
+        ways.append(
+            (
+                way.id_,
+                way.tags,
+                way.visible,
+                way.changeset,
+                way.timestamp,
+                way.user,
+                way.uid,
+            )
+        )
+
+    arrays: dict[str, np.ndarray] = {
+        "ids": table.ids,
+        "coordinates": table.coordinates,
+        "way_offsets": np.cumsum(
+            [0] + [len(rows) for rows in way_rows], dtype=np.int64
+        ),
+        "way_rows": np.concatenate(way_rows).astype(np.int64)
+        if way_rows
+        else np.empty(0, dtype=np.int64),
+    }
+    objects: bytes = pickle.dumps(
+        {
+            "node_tags": table.tags,
+            "node_metadata": table.metadata,
+            "ways": ways,
+            "relations": osm_data.relations,
+            "levels": osm_data.levels,
+            "view_box": osm_data.view_box,
+            "boundary_box": osm_data.boundary_box,
+            "equator_length": osm_data.equator_length,
+        },
+        protocol=pickle.HIGHEST_PROTOCOL,
+    )
+
+    # Header contains array offsets, so they are stored relative to the
+    # aligned end of objects.
+    layout: dict[str, dict[str, Any]] = {}
+    offset: int = 0
+    for name, array in arrays.items():
+        layout[name] = {
+            "offset": offset,
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+        }
+        offset += align(array.nbytes)
+
+    header: bytes = json.dumps(
+        {
+            "key": asdict(SnapshotKey.from_file(path)),
+            "metadata_mode": osm_data.metadata_mode.value,
+            "arrays": layout,
+        }
+    ).encode("utf-8")
+
+    temporary_path: Path = snapshot_path.with_name(
+        f"{snapshot_path.name}.{os.getpid()}.tmp"
+    )
+    try:
+        with temporary_path.open("wb") as output_file:
+            output_file.write(
+                SNAPSHOT_PREAMBLE.pack(
+                    SNAPSHOT_MAGIC, len(header), len(objects)
+                )
+            )
+            output_file.write(header)
+            output_file.write(objects)
+            write_padding(output_file)
+            for array in arrays.values():
+                output_file.write(np.ascontiguousarray(array).tobytes())
+                write_padding(output_file)
+        os.replace(temporary_path, snapshot_path)
+    finally:
+        if temporary_path.exists():
+            temporary_path.unlink()
+
+    return snapshot_path
+
+
+def read_snapshot(
+    path: Path,
+    snapshot_path: Optional[Path] = None,
+    metadata_mode: MetadataMode = MetadataMode.FULL,
+) -> Optional[OSMData]:
+    """
+    Read data from the snapshot if it is valid for the current state of the
+    source file.
+
+    :param path: source file
+    :param snapshot_path: snapshot file, next to the source file by default
+    :param metadata_mode: required metadata, snapshot with full metadata
+        satisfies any mode
+    :return: data or `None` if there is no valid snapshot
+    """
+    if snapshot_path is None:
+        snapshot_path = get_snapshot_path(path)
+    if not snapshot_path.is_file():
+        return None
+
+    with snapshot_path.open("rb") as input_file:
+        preamble: bytes = input_file.read(SNAPSHOT_PREAMBLE.size)
+        if len(preamble) < SNAPSHOT_PREAMBLE.size:
+            return None
+        magic, header_size, objects_size = SNAPSHOT_PREAMBLE.unpack(preamble)
+        if magic != SNAPSHOT_MAGIC:
+            return None
+        try:
+            header: dict[str, Any] = json.loads(input_file.read(header_size))
+        except ValueError:
+            return None
+        if header.get("key") != asdict(SnapshotKey.from_file(path)):
+            return None
+        snapshot_mode: MetadataMode = MetadataMode(header["metadata_mode"])
+        if snapshot_mode not in (MetadataMode.FULL, metadata_mode):
+            return None
+        objects: dict[str, Any] = pickle.loads(input_file.read(objects_size))
+
+        # The whole file is mapped once, arrays are views of the mapping and
+        # keep it alive.
+        buffer: mmap.mmap = mmap.mmap(
+            input_file.fileno(), 0, access=mmap.ACCESS_READ
+        )
+
+    arrays_offset: int = align(
+        SNAPSHOT_PREAMBLE.size + header_size + objects_size
+    )
+    arrays: dict[str, np.ndarray] = {}
+    for name, description in header["arrays"].items():
+        shape: tuple[int, ...] = tuple(description["shape"])
+        arrays[name] = np.frombuffer(
+            buffer,
+            dtype=np.dtype(description["dtype"]),
+            count=int(np.prod(shape)),
+            offset=arrays_offset + description["offset"],
+        ).reshape(shape)
+
+    osm_data: OSMData = OSMData(snapshot_mode)
+
+    # Memory-mapped arrays are read-only and have no free capacity, so the
+    # table grows into new in-memory arrays if nodes are added later.
+    table: NodeTable = NodeTable(0)
+    table.size = len(arrays["ids"])
+    table.id_buffer = arrays["ids"]
+    table.coordinates_buffer = arrays["coordinates"]
+    table.index = dict(zip(table.id_buffer.tolist(), range(table.size)))
+    table.tags = objects["node_tags"]
+    table.metadata = objects["node_metadata"]
+    osm_data.node_table = table
+    osm_data.nodes = NodeView(table)
+
+    way_offsets: list[int] = arrays["way_offsets"].tolist()
+    way_rows: np.ndarray = arrays["way_rows"]
+    for index, (id_, tags, *metadata) in enumerate(objects["ways"]):
+        osm_data.ways[id_] = OSMWay(
+            tags,
+            id_,
+            NodeList(
+                table, way_rows[way_offsets[index] : way_offsets[index + 1]]
+            ),
+            *metadata,
+        )
+
+    osm_data.relations = objects["relations"]
+    osm_data.levels = objects["levels"]
+    osm_data.view_box = objects["view_box"]
+    osm_data.boundary_box = objects["boundary_box"]
+    osm_data.equator_length = objects["equator_length"]
+
+    return osm_data
+
+
+def read_osm_data(
+    path: Path, metadata_mode: MetadataMode = MetadataMode.FULL
+) -> OSMData:
+    """
+    Read data from the snapshot of the file or parse the file and store its
+    snapshot for the next time.
+
+    :param path: OSM XML, Overpass JSON, or PBF file
+    :param metadata_mode: which metadata of elements should be parsed
+    """
+    try:
+        osm_data: Optional[OSMData] = read_snapshot(
+            path, metadata_mode=metadata_mode
+        )
+    except (
+        OSError,
+        pickle.UnpicklingError,
+        EOFError,
+        KeyError,
+        ValueError,
+    ) as error:
+        logging.warning(f"Cannot read snapshot of {path}: {error}.")
+        osm_data = None
+
+    if osm_data is not None:
+        logging.debug(f"Data for {path} is read from the snapshot.")
+        return osm_data
+
+    osm_data = OSMData(metadata_mode)
+    osm_data.parse_file(path)
+
+    try:
+        write_snapshot(osm_data, path)
+    except OSError as error:
+        logging.warning(f"Cannot write snapshot of {path}: {error}.")
+
+    return osm_data
+
+
+def align(size: int) -> int:
+    """Round size up to the array alignment."""
+    return -(-size // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+
+
+def write_padding(output_file: BinaryIO) -> None:
+    """Pad file with zeros up to the array alignment."""
+    position: int = output_file.tell()
+    output_file.write(b"\x00" * (align(position) - position))
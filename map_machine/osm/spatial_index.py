@@ -0,0 +1,296 @@
+"""
+Spatial index over OpenStreetMap data for boundary box queries.
+
+Nodes and ways are put into cells of a uniform grid over the data extent.
+Cell contents are packed into flat arrays sorted by cell, so the elements of
+one grid row inside the query range are read as one slice.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from map_machine.geometry.boundary_box import BoundaryBox
+from map_machine.osm.osm_reader import NodeTable, OSMData, get_coordinates
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+# Average number of nodes in one grid cell.
+NODES_PER_CELL: int = 32
+MAX_GRID_SIZE: int = 1024
+# Minimal cell size in degrees, used if all elements are in one point.
+MIN_CELL_SIZE: float = 1e-7
+# Ways covering more cells are not put into the grid and are checked one by
+# one, e.g. coastlines or administrative boundaries.
+MAX_WAY_CELLS: int = 256
+
+
+@dataclass
+class QueryResult:
+    """Elements intersecting the boundary box."""
+
+    # Rows of the node table in ascending order.
+    node_rows: np.ndarray
+    # Way and relation identifiers in the order of the map.
+    way_ids: list[int]
+    relation_ids: list[int]
+
+
+def get_boundary_boxes(coordinates: list[np.ndarray]) -> np.ndarray:
+    """
+    Get boundary boxes of coordinate arrays in the form of N × (minimum
+    latitude, minimum longitude, maximum latitude, maximum longitude).  Empty
+    arrays get boxes that intersect nothing.
+    """
+    boxes: np.ndarray = np.empty((len(coordinates), 4), dtype=np.float64)
+    boxes[:, :2] = np.inf
+    boxes[:, 2:] = -np.inf
+    for index, array in enumerate(coordinates):
+        if len(array):
+            boxes[index, :2] = array.min(axis=0)
+            boxes[index, 2:] = array.max(axis=0)
+    return boxes
+
+
+def intersect(boxes: np.ndarray, boundary_box: BoundaryBox) -> np.ndarray:
+    """Check which boundary boxes intersect the boundary box."""
+    return (
+        (boxes[:, 0] <= boundary_box.top)
+        & (boxes[:, 2] >= boundary_box.bottom)
+        & (boxes[:, 1] <= boundary_box.right)
+        & (boxes[:, 3] >= boundary_box.left)
+    )
+
+
+def get_relation_box(osm_data: OSMData, relation_id: int) -> np.ndarray:
+    """Get boundary box of the relation members."""
+    boundary_box: Optional[BoundaryBox] = osm_data.get_element_boundary_box(
+        "relation", relation_id
+    )
+    if boundary_box is None:
+        return np.array((np.inf, np.inf, -np.inf, -np.inf))
+    return np.array(
+        (
+            boundary_box.bottom,
+            boundary_box.left,
+            boundary_box.top,
+            boundary_box.right,
+        )
+    )
+
+
+def scan(osm_data: OSMData, boundary_box: BoundaryBox) -> QueryResult:
+    """
+    Get nodes, ways, and relations intersecting the boundary box by checking
+    all of them.  Suits one query, when building of the index does not pay
+    off.
+    """
+    coordinates: np.ndarray = osm_data.node_table.coordinates
+    node_rows: np.ndarray = np.flatnonzero(
+        (coordinates[:, 0] >= boundary_box.bottom)
+        & (coordinates[:, 0] <= boundary_box.top)
+        & (coordinates[:, 1] >= boundary_box.left)
+        & (coordinates[:, 1] <= boundary_box.right)
+    )
+
+    way_ids: list[int] = list(osm_data.ways)
+    way_boxes: np.ndarray = get_boundary_boxes(
+        [get_coordinates(way.nodes) for way in osm_data.ways.values()]
+    )
+    relation_ids: list[int] = list(osm_data.relations)
+    relation_boxes: np.ndarray = np.array(
+        [get_relation_box(osm_data, x) for x in relation_ids],
+        dtype=np.float64,
+    ).reshape(-1, 4)
+
+    return QueryResult(
+        node_rows,
+        [
+            way_ids[x]
+            for x in np.flatnonzero(intersect(way_boxes, boundary_box))
+        ],
+        [
+            relation_ids[x]
+            for x in np.flatnonzero(intersect(relation_boxes, boundary_box))
+        ],
+    )
+
+
+class SpatialIndex:
+    """
+    Uniform grid over nodes and ways of the map.  Relations are usually few,
+    so their boundary boxes are checked one by one.
+
+    Index is built for the current state of the map and should be rebuilt
+    after the map is changed.
+    """
+
+    def __init__(self, osm_data: OSMData) -> None:
+        self.osm_data: OSMData = osm_data
+
+        table: NodeTable = osm_data.node_table
+        self.node_rows: np.ndarray = np.fromiter(
+            table.index.values(), dtype=np.int64, count=len(table.index)
+        )
+        node_coordinates: np.ndarray = table.coordinates_buffer[self.node_rows]
+
+        self.way_ids: list[int] = list(osm_data.ways)
+        self.way_boxes: np.ndarray = get_boundary_boxes(
+            [get_coordinates(way.nodes) for way in osm_data.ways.values()]
+        )
+        self.relation_ids: list[int] = list(osm_data.relations)
+        self.relation_boxes: np.ndarray = np.array(
+            [get_relation_box(osm_data, x) for x in self.relation_ids],
+            dtype=np.float64,
+        ).reshape(-1, 4)
+
+        # Grid covers all nodes and ways.
+        minimum: np.ndarray = np.minimum(
+            node_coordinates.min(axis=0, initial=np.inf),
+            self.way_boxes[:, :2].min(axis=0, initial=np.inf),
+        )
+        maximum: np.ndarray = np.maximum(
+            node_coordinates.max(axis=0, initial=-np.inf),
+            self.way_boxes[:, 2:].max(axis=0, initial=-np.inf),
+        )
+        if not np.all(np.isfinite(minimum)):
+            minimum = maximum = np.zeros(2)
+        self.minimum: np.ndarray = minimum
+        self.size: int = int(
+            np.clip(
+                np.ceil(np.sqrt(len(self.node_rows) / NODES_PER_CELL)),
+                1,
+                MAX_GRID_SIZE,
+            )
+        )
+        # Cell size in the form of (latitude, longitude).
+        self.cell: np.ndarray = np.maximum(
+            (maximum - minimum) / self.size, MIN_CELL_SIZE
+        )
+
+        cells: np.ndarray = self.get_cells(node_coordinates)
+        order: np.ndarray = np.argsort(cells, kind="stable")
+        self.node_rows = self.node_rows[order]
+        self.node_offsets: np.ndarray = np.searchsorted(
+            cells[order], np.arange(self.size * self.size + 1)
+        )
+
+        self.build_way_grid()
+
+    def get_grid_coordinates(self, coordinates: np.ndarray) -> np.ndarray:
+        """
+        Get grid row and column of coordinates, coordinates outside the grid
+        are clamped to the border cells.
+
+        :param coordinates: N × (latitude, longitude)
+        :return: N × (row, column)
+        """
+        return np.clip(
+            (coordinates - self.minimum) / self.cell, 0, self.size - 1
+        ).astype(np.int64)
+
+    def get_cells(self, coordinates: np.ndarray) -> np.ndarray:
+        """Get cell indices of coordinates."""
+        grid: np.ndarray = self.get_grid_coordinates(coordinates)
+        return grid[:, 0] * self.size + grid[:, 1]
+
+    def build_way_grid(self) -> None:
+        """Put ways into all cells covered by their boundary boxes."""
+        valid: np.ndarray = np.isfinite(self.way_boxes[:, 0])
+        positions: np.ndarray = np.flatnonzero(valid)
+        first: np.ndarray = self.get_grid_coordinates(
+            self.way_boxes[positions, :2]
+        )
+        last: np.ndarray = self.get_grid_coordinates(
+            self.way_boxes[positions, 2:]
+        )
+        heights: np.ndarray = last[:, 0] - first[:, 0] + 1
+        widths: np.ndarray = last[:, 1] - first[:, 1] + 1
+        counts: np.ndarray = heights * widths
+
+        large: np.ndarray = counts > MAX_WAY_CELLS
+        self.large_ways: np.ndarray = positions[large]
+        positions = positions[~large]
+        first = first[~large]
+        widths = widths[~large]
+        counts = counts[~large]
+
+        # Enumerate covered cells of all ways at once: for every entry, its
+        # way and its number inside the way rectangle.
+        entry_ways: np.ndarray = np.repeat(np.arange(len(positions)), counts)
+        starts: np.ndarray = np.cumsum(counts) - counts
+        local: np.ndarray = np.arange(counts.sum()) - np.repeat(starts, counts)
+        entry_widths: np.ndarray = widths[entry_ways]
+        rows: np.ndarray = first[entry_ways, 0] + local // entry_widths
+        columns: np.ndarray = first[entry_ways, 1] + local % entry_widths
+        cells: np.ndarray = rows * self.size + columns
+
+        order: np.ndarray = np.argsort(cells, kind="stable")
+        self.way_positions: np.ndarray = positions[entry_ways[order]]
+        self.way_offsets: np.ndarray = np.searchsorted(
+            cells[order], np.arange(self.size * self.size + 1)
+        )
+
+    def get_candidates(
+        self,
+        offsets: np.ndarray,
+        values: np.ndarray,
+        boundary_box: BoundaryBox,
+    ) -> np.ndarray:
+        """Get values from grid cells covered by the boundary box."""
+        first, last = self.get_grid_coordinates(
+            np.array(
+                (
+                    (boundary_box.bottom, boundary_box.left),
+                    (boundary_box.top, boundary_box.right),
+                )
+            )
+        )
+        parts: list[np.ndarray] = [values[:0]]
+        for row in range(first[0], last[0] + 1):
+            start: int = row * self.size + first[1]
+            end: int = row * self.size + last[1] + 1
+            parts.append(values[offsets[start] : offsets[end]])
+        return np.concatenate(parts)
+
+    def query(self, boundary_box: BoundaryBox) -> QueryResult:
+        """
+        Get nodes, ways, and relations intersecting the boundary box.  Ways
+        and relations are checked by their boundary boxes.
+        """
+        table: NodeTable = self.osm_data.node_table
+
+        node_rows: np.ndarray = self.get_candidates(
+            self.node_offsets, self.node_rows, boundary_box
+        )
+        coordinates: np.ndarray = table.coordinates_buffer[node_rows]
+        node_rows = node_rows[
+            (coordinates[:, 0] >= boundary_box.bottom)
+            & (coordinates[:, 0] <= boundary_box.top)
+            & (coordinates[:, 1] >= boundary_box.left)
+            & (coordinates[:, 1] <= boundary_box.right)
+        ]
+
+        way_positions: np.ndarray = np.unique(
+            np.concatenate(
+                (
+                    self.get_candidates(
+                        self.way_offsets, self.way_positions, boundary_box
+                    ),
+                    self.large_ways,
+                )
+            )
+        )
+        way_positions = way_positions[
+            intersect(self.way_boxes[way_positions], boundary_box)
+        ]
+        relation_positions: np.ndarray = np.flatnonzero(
+            intersect(self.relation_boxes, boundary_box)
+        )
+
+        return QueryResult(
+            np.sort(node_rows),
+            [self.way_ids[x] for x in way_positions.tolist()],
+            [self.relation_ids[x] for x in relation_positions.tolist()],
+        )
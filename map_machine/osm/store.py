@@ -0,0 +1,405 @@
+"""
+Local on-disk store of OpenStreetMap data.
+
+Elements are stored in SQLite database with R*Tree indices, so map data for
+any boundary box may be constructed without reading the whole data.  The
+store is filled once from files or downloads and is then queried for every
+rendered tile.
+
+Database is in the write-ahead log mode, so several processes may read it
+concurrently.  Every process should open its own store.
+"""
+import json
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional
+
+import numpy as np
+
+from map_machine.geometry.boundary_box import BoundaryBox
+from map_machine.osm.osm_reader import (
+    MetadataMode,
+    NodeList,
+    NodeTable,
+    OSMData,
+    OSMMember,
+    OSMRelation,
+    OSMWay,
+    get_coordinates,
+)
+from map_machine.osm.pbf_reader import NO_METADATA, Metadata, get_time
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+# Number of rows inserted in one transaction.
+BATCH_SIZE: int = 10_000
+# Number of identifiers in one `IN (...)` query, SQLite limits the number of
+# query parameters.
+QUERY_SIZE: int = 500
+
+SCHEMA: list[str] = [
+    "CREATE TABLE IF NOT EXISTS nodes ("
+    "id INTEGER PRIMARY KEY, latitude REAL, longitude REAL, tags TEXT, "
+    "metadata TEXT)",
+    "CREATE TABLE IF NOT EXISTS ways ("
+    "id INTEGER PRIMARY KEY, tags TEXT, metadata TEXT, nodes BLOB)",
+    "CREATE TABLE IF NOT EXISTS relations ("
+    "id INTEGER PRIMARY KEY, tags TEXT, metadata TEXT, members TEXT)",
+    # Only tagged nodes are indexed: untagged nodes are read as nodes of
+    # ways.
+    "CREATE VIRTUAL TABLE IF NOT EXISTS node_index USING rtree("
+    "id, min_latitude, max_latitude, min_longitude, max_longitude)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS way_index USING rtree("
+    "id, min_latitude, max_latitude, min_longitude, max_longitude)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS relation_index USING rtree("
+    "id, min_latitude, max_latitude, min_longitude, max_longitude)",
+    # Areas with complete data: imported files and downloads.
+    "CREATE TABLE IF NOT EXISTS areas ("
+    "left REAL, bottom REAL, right REAL, top REAL)",
+]
+# Timestamps are stored as milliseconds since epoch: parsing formatted time is
+# too slow for every query.
+EPOCH: datetime = datetime(1970, 1, 1)
+INTERSECTION_CONDITION: str = (
+    "min_latitude <= ? AND max_latitude >= ? "
+    "AND min_longitude <= ? AND max_longitude >= ?"
+)
+
+
+def encode_metadata(metadata: Metadata) -> Optional[str]:
+    """Encode visible, changeset, timestamp, user, and uid as JSON."""
+    if all(x is None for x in metadata):
+        return None
+    visible, changeset, timestamp, user, uid = metadata
+    return json.dumps(
+        [
+            visible,
+            changeset,
+            (timestamp - EPOCH) // timedelta(milliseconds=1)
+            if timestamp
+            else None,
+            user,
+            uid,
+        ]
+    )
+
+
+def decode_metadata(text: Optional[str], parse_metadata: bool) -> Metadata:
+    """Decode metadata encoded by `encode_metadata`."""
+    if text is None or not parse_metadata:
+        return NO_METADATA
+    visible, changeset, timestamp, user, uid = json.loads(text)
+    return (
+        visible,
+        changeset,
+        get_time(timestamp) if timestamp is not None else None,
+        user,
+        uid,
+    )
+
+
+def get_box_parameters(boundary_box: BoundaryBox) -> tuple[float, ...]:
+    """Get query parameters for `INTERSECTION_CONDITION`."""
+    return (
+        boundary_box.top,
+        boundary_box.bottom,
+        boundary_box.right,
+        boundary_box.left,
+    )
+
+
+def get_index_row(id_: int, coordinates: np.ndarray) -> tuple:
+    """Get R*Tree row for the element with coordinates."""
+    minimum: np.ndarray = coordinates.min(axis=0)
+    maximum: np.ndarray = coordinates.max(axis=0)
+    return (
+        id_,
+        float(minimum[0]),
+        float(maximum[0]),
+        float(minimum[1]),
+        float(maximum[1]),
+    )
+
+
+def get_batches(rows: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    """Split rows into lists of the specified size."""
+    batch: list[Any] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class OSMStore:
+    """SQLite database with OpenStreetMap nodes, ways, and relations."""
+
+    def __init__(self, path: Path, read_only: bool = False) -> None:
+        """
+        :param path: database file, it is created if it does not exist
+        :param read_only: open existing database only for reading
+        """
+        self.path: Path = path
+        if read_only:
+            self.connection: sqlite3.Connection = sqlite3.connect(
+                f"{path.absolute().as_uri()}?mode=ro", uri=True
+            )
+        else:
+            self.connection = sqlite3.connect(path)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            with self.connection:
+                for statement in SCHEMA:
+                    self.connection.execute(statement)
+
+    def close(self) -> None:
+        """Close database connection."""
+        self.connection.close()
+
+    def __enter__(self) -> "OSMStore":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def insert(self, statement: str, rows: Iterable[tuple]) -> None:
+        """Insert rows in batched transactions."""
+        for batch in get_batches(rows, BATCH_SIZE):
+            with self.connection:
+                self.connection.executemany(statement, batch)
+
+    def add_osm_data(
+        self, osm_data: OSMData, area: Optional[BoundaryBox] = None
+    ) -> None:
+        """
+        Add all elements of the map, replacing elements with the same
+        identifiers.
+
+        :param osm_data: map data
+        :param area: area where the map data is complete, usually the
+            boundary box of the downloaded data
+        """
+        table = osm_data.node_table
+
+        self.insert(
+            "INSERT OR REPLACE INTO nodes VALUES (?, ?, ?, ?, ?)",
+            (
+                (
+                    id_,
+                    float(table.coordinates_buffer[row, 0]),
+                    float(table.coordinates_buffer[row, 1]),
+                    json.dumps(table.tags[row]) if row in table.tags else None,
+                    encode_metadata(table.metadata.get(row, NO_METADATA)),
+                )
+                for id_, row in table.index.items()
+            ),
+        )
+        self.insert(
+            "INSERT OR REPLACE INTO node_index VALUES (?, ?, ?, ?, ?)",
+            (
+                get_index_row(
+                    int(table.id_buffer[row]), table.coordinates_buffer[[row]]
+                )
+                for row in table.tags
+            ),
+        )
+
+        self.insert(
+            "INSERT OR REPLACE INTO ways VALUES (?, ?, ?, ?)",
+            (
+                (
+                    way.id_,
+                    json.dumps(way.tags),
+                    encode_metadata(
+                        (
+                            way.visible,
+                            way.changeset,
+                            way.timestamp,
+                            way.user,
+                            way.uid,
+                        )
+                    ),
+                    np.asarray(
+                        way.nodes.ids
+                        if isinstance(way.nodes, NodeList)
+                        else [node.id_ for node in way.nodes],
+                        dtype=np.int64,
+                    ).tobytes(),
+                )
+                for way in osm_data.ways.values()
+            ),
+        )
+        self.insert(
+            "INSERT OR REPLACE INTO way_index VALUES (?, ?, ?, ?, ?)",
+            (
+                get_index_row(way.id_, get_coordinates(way.nodes))
+                for way in osm_data.ways.values()
+                if way.nodes
+            ),
+        )
+
+        self.insert(
+            "INSERT OR REPLACE INTO relations VALUES (?, ?, ?, ?)",
+            (
+                (
+                    relation.id_,
+                    json.dumps(relation.tags),
+                    encode_metadata(
+                        (
+                            relation.visible,
+                            relation.changeset,
+                            relation.timestamp,
+                            relation.user,
+                            relation.uid,
+                        )
+                    ),
+                    json.dumps(
+                        [[x.type_, x.ref, x.role] for x in relation.members]
+                    ),
+                )
+                for relation in osm_data.relations.values()
+            ),
+        )
+        relation_boxes: Iterator[tuple[int, Optional[BoundaryBox]]] = (
+            (id_, osm_data.get_element_boundary_box("relation", id_))
+            for id_ in osm_data.relations
+        )
+        self.insert(
+            "INSERT OR REPLACE INTO relation_index VALUES (?, ?, ?, ?, ?)",
+            (
+                (id_, box.bottom, box.top, box.left, box.right)
+                for id_, box in relation_boxes
+                if box is not None
+            ),
+        )
+
+        if area is not None:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT INTO areas VALUES (?, ?, ?, ?)",
+                    (area.left, area.bottom, area.right, area.top),
+                )
+
+    def import_file(self, path: Path, workers: Optional[int] = None) -> None:
+        """
+        Parse OSM XML, Overpass JSON, or PBF file and add its elements.  The
+        boundary box of the file is marked as complete.
+
+        :param path: input file
+        :param workers: number of worker processes to parse the file
+        """
+        osm_data: OSMData = OSMData()
+        osm_data.parse_file(path, workers=workers)
+        self.add_osm_data(osm_data, osm_data.view_box)
+
+    def covers(self, boundary_box: BoundaryBox) -> bool:
+        """Check whether the store has complete data for the boundary box."""
+        return (
+            self.connection.execute(
+                "SELECT 1 FROM areas WHERE left <= ? AND bottom <= ? "
+                "AND right >= ? AND top >= ? LIMIT 1",
+                (
+                    boundary_box.left,
+                    boundary_box.bottom,
+                    boundary_box.right,
+                    boundary_box.top,
+                ),
+            ).fetchone()
+            is not None
+        )
+
+    def get_osm_data(
+        self,
+        boundary_box: BoundaryBox,
+        metadata_mode: MetadataMode = MetadataMode.FULL,
+    ) -> OSMData:
+        """
+        Construct map data for the boundary box: tagged nodes inside it, ways
+        and relations intersecting it, and all nodes of these ways.
+
+        :param boundary_box: area of interest
+        :param metadata_mode: which metadata of elements should be read
+        """
+        osm_data: OSMData = OSMData(metadata_mode)
+        parse_metadata: bool = osm_data.parse_metadata
+        parameters: tuple[float, ...] = get_box_parameters(boundary_box)
+
+        ways: list[tuple] = self.connection.execute(
+            "SELECT ways.id, tags, metadata, nodes FROM way_index "
+            "JOIN ways ON ways.id = way_index.id "
+            f"WHERE {INTERSECTION_CONDITION} ORDER BY ways.id",
+            parameters,
+        ).fetchall()
+        way_nodes: list[np.ndarray] = [
+            np.frombuffer(x[3], dtype=np.int64) for x in ways
+        ]
+
+        nodes: list[tuple] = self.connection.execute(
+            "SELECT nodes.* FROM node_index "
+            "JOIN nodes ON nodes.id = node_index.id "
+            f"WHERE {INTERSECTION_CONDITION}",
+            parameters,
+        ).fetchall()
+        missing: set[int] = set(
+            np.concatenate(way_nodes).tolist() if way_nodes else []
+        ) - {x[0] for x in nodes}
+        for batch in get_batches(sorted(missing), QUERY_SIZE):
+            nodes += self.connection.execute(
+                "SELECT * FROM nodes "
+                f"WHERE id IN ({', '.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+
+        node_table: NodeTable = NodeTable(max(len(nodes), 1))
+        for id_, latitude, longitude, tags, metadata in sorted(nodes):
+            node_table.add(
+                id_,
+                (latitude, longitude),
+                json.loads(tags) if tags else {},
+                decode_metadata(metadata, parse_metadata),
+            )
+        osm_data.add_node_table(node_table)
+
+        # Nodes missing in the store are skipped, as in incomplete extracts.
+        table = osm_data.node_table
+        for (id_, tags, metadata, _), node_ids in zip(ways, way_nodes):
+            osm_data.add_way(
+                OSMWay(
+                    json.loads(tags),
+                    id_,
+                    NodeList(
+                        table,
+                        table.get_rows(
+                            x for x in node_ids.tolist() if x in table.index
+                        ),
+                    ),
+                    *decode_metadata(metadata, parse_metadata),
+                )
+            )
+
+        for id_, tags, metadata, members in self.connection.execute(
+            "SELECT relations.* FROM relation_index "
+            "JOIN relations ON relations.id = relation_index.id "
+            f"WHERE {INTERSECTION_CONDITION} ORDER BY relations.id",
+            parameters,
+        ):
+            osm_data.add_relation(
+                OSMRelation(
+                    json.loads(tags),
+                    id_,
+                    [OSMMember(*member) for member in json.loads(members)],
+                    *decode_metadata(metadata, parse_metadata),
+                )
+            )
+
+        osm_data.view_box = BoundaryBox(
+            boundary_box.left,
+            boundary_box.bottom,
+            boundary_box.right,
+            boundary_box.top,
+        )
+        return osm_data
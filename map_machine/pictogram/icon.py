@@ -2,7 +2,7 @@
 import json
 import logging
 import re
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from typing import Any, Optional
 from xml.etree import ElementTree
@@ -541,10 +541,11 @@ class Icon:
         """
         svg: Drawing = Drawing(str(file_name), (16, 16))
 
+        # Icon may be shared, so it is recolored as a copy.
+        icon: Icon = self.get_recolored(color) if color else self
+
         if outline:
-            for shape_specification in self.shape_specifications:
-                if color:
-                    shape_specification.color = color
+            for shape_specification in icon.shape_specifications:
                 shape_specification.draw(
                     svg,
                     np.array((8.0, 8.0)),
@@ -552,9 +553,7 @@ class Icon:
                     outline_opacity=outline_opacity,
                 )
 
-        for shape_specification in self.shape_specifications:
-            if color:
-                shape_specification.color = color
+        for shape_specification in icon.shape_specifications:
             shape_specification.draw(svg, np.array((8.0, 8.0)))
 
         with file_name.open("w", encoding="utf-8") as output_file:
@@ -575,6 +574,16 @@ class Icon:
             else:
                 shape_specification.color = color
 
+    def get_recolored(
+        self, color: Color, white: Optional[Color] = None
+    ) -> "Icon":
+        """Get copy of the icon with all shapes painted in the color."""
+        icon: Icon = Icon(
+            [replace(x) for x in self.shape_specifications], self.opacity
+        )
+        icon.recolor(color, white)
+        return icon
+
     def add_specifications(
         self, specifications: list[ShapeSpecification]
     ) -> None:
@@ -592,12 +601,12 @@ class Icon:
         ) < "".join([x.shape.get_full_id() for x in other.shape_specifications])
 
 
-@dataclass
+@dataclass(frozen=True)
 class IconSet:
     """Node representation: icons and color."""
 
     main_icon: Icon
-    extra_icons: list[Icon]
+    extra_icons: tuple[Icon, ...]
 
     # Icon to use if the point is hidden by overlapped icons but still need to
     # be shown.
@@ -605,4 +614,4 @@ class IconSet:
 
     # Tag keys that were processed to create icon set (other tag keys should be
     # displayed by text or ignored)
-    processed: set[str]
+    processed: frozenset[str]
@@ -15,6 +15,17 @@ from map_machine.text import Label
 __author__ = "Sergey Vartanov"
 __email__ = "me@enzet.ru"
 
+# Labels longer than this number of characters are truncated.
+MAX_LABEL_LENGTH: int = 26
+# Approximate width of one label character in pixels.
+LABEL_CHARACTER_WIDTH: float = 6.0
+# Maximum distance in pixels from the point position to the border of its
+# icons and labels: half of the longest label with ellipsis and outline, or
+# main icon, extra icons, and several labels below the point.
+MAX_POINT_EXTENT: float = (
+    MAX_LABEL_LENGTH + 3
+) * LABEL_CHARACTER_WIDTH / 2.0 + 16.0
+
 
 class Occupied:
     """
@@ -199,7 +210,9 @@ class Point(Tagged):
             text = label.text
             text = text.replace("&quot;", '"')
             text = text.replace("&amp;", "&")
-            text = text[:26] + ("..." if len(text) > 26 else "")
+            text = text[:MAX_LABEL_LENGTH] + (
+                "..." if len(text) > MAX_LABEL_LENGTH else ""
+            )
             point = self.point + np.array((0.0, self.y + 2.0))
             self.draw_text(
                 svg,
@@ -1,17 +1,18 @@
 """Map Machine drawing scheme."""
 import logging
 import re
+from collections import OrderedDict, defaultdict
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from typing import Any, Optional, Union
+from typing import Any, Callable, Hashable, Optional, TypeVar, Union
 
 import numpy as np
 import yaml
 from colour import Color
 
 from map_machine.feature.direction import DirectionSet
-from map_machine.osm.osm_reader import Tagged, Tags
+from map_machine.osm.osm_reader import FrozenTags, Tagged, Tags
 from map_machine.pictogram.icon import (
     DEFAULT_SHAPE_ID,
     Icon,
@@ -28,6 +29,13 @@ __email__ = "me@enzet.ru"
 IconDescription = list[Union[str, dict[str, str]]]
 
 DEFAULT_COLOR: Color = Color("black")
+# Maximum number of tag sets with memoized way style, road matcher, and area
+# classification.
+TAG_MEMO_SIZE: int = 10_000
+# Maximum number of cached icon sets.
+ICON_MEMO_SIZE: int = 10_000
+
+T = TypeVar("T")
 
 
 @dataclass
@@ -208,6 +216,115 @@ def get_shape_specifications(
     return shapes
 
 
+def get_tags_key(tags: Tags) -> FrozenTags:
+    """
+    Get hashable signature of tags that does not depend on the order of tags.
+    """
+    # Tags shared by the reader have precomputed hash.
+    return tags if isinstance(tags, FrozenTags) else FrozenTags(tags)
+
+
+@dataclass
+class MemoStatistics:
+    """Counters of memo usage."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class TagMemo:
+    """
+    Memo of values computed from tags.  The number of values is limited, and
+    least recently used values are dropped.
+    """
+
+    def __init__(self, max_size: int = TAG_MEMO_SIZE) -> None:
+        self.max_size: int = max_size
+        self.values: OrderedDict[Hashable, Any] = OrderedDict()
+        self.statistics: MemoStatistics = MemoStatistics()
+
+    def get(
+        self,
+        tags: Tags,
+        compute: Callable[[Tags], T],
+        parameters: tuple[Hashable, ...] = (),
+    ) -> T:
+        """
+        Get memoized value for tags or compute it.
+
+        :param tags: element tags
+        :param compute: function that computes value from tags
+        :param parameters: other values the result depends on
+        """
+        key: Hashable = (
+            (get_tags_key(tags), parameters)
+            if parameters
+            else get_tags_key(tags)
+        )
+        if key in self.values:
+            self.values.move_to_end(key)
+            self.statistics.hits += 1
+            return self.values[key]
+
+        self.statistics.misses += 1
+        value: T = compute(tags)
+        self.values[key] = value
+        if len(self.values) > self.max_size:
+            self.values.popitem(last=False)
+            self.statistics.evictions += 1
+        return value
+
+
+class MatcherIndex:
+    """
+    Index of matchers by tags they require.
+
+    Matcher may match only tags that contain all its tag keys, so it is
+    stored under one of its tags: the tag with exact value if there is one,
+    or only the tag key if all values are wildcards or regular expressions.
+    Only matchers stored under element tags or keys are then checked.
+    """
+
+    def __init__(self, matchers: list[Matcher]) -> None:
+        # Matcher indices by tag keys and exact values.
+        self.by_tag: dict[tuple[str, str], list[int]] = defaultdict(list)
+        # Matcher indices by tag keys, for wildcard and regular expression
+        # values.
+        self.by_key: dict[str, list[int]] = defaultdict(list)
+        # Indices of matchers without tags.
+        self.any_tags: list[int] = []
+
+        for index, matcher in enumerate(matchers):
+            exact: list[tuple[str, str]] = [
+                (key, value)
+                for key, value in matcher.tags.items()
+                if isinstance(value, str)
+                and value != "*"
+                and not value.startswith("^")
+            ]
+            if exact:
+                self.by_tag[exact[0]].append(index)
+            elif matcher.tags:
+                self.by_key[next(iter(matcher.tags))].append(index)
+            else:
+                self.any_tags.append(index)
+
+    def get_candidates(self, tags: Tags) -> list[int]:
+        """
+        Get indices of matchers that may match tags, in the order of
+        matchers.
+        """
+        indices: list[int] = list(self.any_tags)
+        for key, value in tags.items():
+            if (key, value) in self.by_tag:
+                indices += self.by_tag[(key, value)]
+            if key in self.by_key:
+                indices += self.by_key[key]
+        indices.sort()
+        return indices
+
+
 class NodeMatcher(Matcher):
     """Tag specification matcher."""
 
@@ -320,6 +437,7 @@ class Scheme:
             for group in content["node_icons"]:
                 for element in group["tags"]:
                     self.node_matchers.append(NodeMatcher(element, group))
+        self.node_matcher_index: MatcherIndex = MatcherIndex(self.node_matchers)
 
         options = content.get("options", {})
 
@@ -357,8 +475,13 @@ class Scheme:
         self.prefix_to_skip: list[str] = content.get("prefix_to_skip", [])
         self.tags_to_skip: dict[str, str] = content.get("tags_to_skip", {})
 
-        # Storage for created icon sets.
-        self.cache: dict[str, tuple[IconSet, int]] = {}
+        # Created icon sets with priorities and processed tag keys.
+        self.icon_memo: TagMemo = TagMemo(ICON_MEMO_SIZE)
+
+        # Way classification results by tags.
+        self.style_memo: TagMemo = TagMemo()
+        self.road_memo: TagMemo = TagMemo()
+        self.area_memo: TagMemo = TagMemo()
 
     @classmethod
     def from_file(cls, file_name: Path) -> Optional["Scheme"]:
@@ -487,11 +610,13 @@ class Scheme:
         show_overlapped: bool = False,
     ) -> tuple[Optional[IconSet], int]:
         """
-        Construct icon set.
+        Get icon set.  Icon sets are cached and shared, so they should not be
+        modified.
 
         :param extractor: extractor with icon specifications
         :param tags: OpenStreetMap element tags dictionary
-        :param processed: set of already processed tag keys
+        :param processed: set of already processed tag keys, tag keys
+            processed to create icon set are added to it
         :param country: country to match location restrictions
         :param zoom_level: current map zoom level
         :param ignore_level_matching: do not check level for the icon
@@ -499,18 +624,48 @@ class Scheme:
             overlapped by some other points
         :return (icon set, icon priority)
         """
-        tags_hash: str = (
-            ",".join(tags.keys()) + ":" + ",".join(map(str, tags.values()))
+        icon_set: Optional[IconSet]
+        priority: int
+        icon_processed: frozenset[str]
+        icon_set, priority, icon_processed = self.icon_memo.get(
+            tags,
+            lambda x: self.construct_icon(
+                extractor,
+                x,
+                country,
+                zoom_level,
+                ignore_level_matching,
+                show_overlapped,
+            ),
+            (country, zoom_level, ignore_level_matching, show_overlapped),
         )
-        if tags_hash in self.cache:
-            return self.cache[tags_hash]
+        processed |= icon_processed
+        return icon_set, priority
 
+    def construct_icon(
+        self,
+        extractor: ShapeExtractor,
+        tags: dict[str, Any],
+        country: Optional[str],
+        zoom_level: float,
+        ignore_level_matching: bool,
+        show_overlapped: bool,
+    ) -> tuple[Optional[IconSet], int, frozenset[str]]:
+        """
+        Construct icon set.
+
+        :return (icon set, icon priority, processed tag keys)
+        """
+        processed: set[str] = set()
         main_icon: Optional[Icon] = None
         extra_icons: list[Icon] = []
         priority: int = 0
         color: Optional[Color] = None
 
-        for index, matcher in enumerate(self.node_matchers):
+        # Only matchers that may match the tags are checked, in the order of
+        # the scheme.
+        for index in self.node_matcher_index.get_candidates(tags):
+            matcher: NodeMatcher = self.node_matchers[index]
             if not matcher.replace_shapes and main_icon:
                 continue
             matching, groups = matcher.is_matched(tags, country)
@@ -519,7 +674,7 @@ class Scheme:
             if not ignore_level_matching and not matcher.check_zoom_level(
                 zoom_level
             ):
-                return None, 0
+                return None, 0, frozenset(processed)
             matcher_tags: set[str] = set(matcher.tags.keys())
             priority = len(self.node_matchers) - index
             if not matcher.draw:
@@ -585,11 +740,6 @@ class Scheme:
             )
             default_icon = Icon([small_dot_spec])
 
-        returned: IconSet = IconSet(
-            main_icon, extra_icons, default_icon, processed
-        )
-        self.cache[tags_hash] = returned, priority
-
         for key in "direction", "camera:direction":
             if key in tags:
                 for specification in main_icon.shape_specifications:
@@ -601,10 +751,23 @@ class Scheme:
                     ):
                         specification.flip_horizontally = True
 
-        return returned, priority
+        return (
+            IconSet(
+                main_icon,
+                tuple(extra_icons),
+                default_icon,
+                frozenset(processed),
+            ),
+            priority,
+            frozenset(processed),
+        )
 
     def get_style(self, tags: dict[str, Any]) -> list[LineStyle]:
         """Get line style based on tags and scale."""
+        return list(self.style_memo.get(tags, self.match_style))
+
+    def match_style(self, tags: dict[str, Any]) -> list[LineStyle]:
+        """Get line style checking all way matchers."""
         line_styles = []
 
         for matcher in self.way_matchers:
@@ -621,6 +784,10 @@ class Scheme:
 
     def get_road(self, tags: dict[str, Any]) -> Optional[RoadMatcher]:
         """Get road matcher if tags are matched."""
+        return self.road_memo.get(tags, self.match_road)
+
+    def match_road(self, tags: dict[str, Any]) -> Optional[RoadMatcher]:
+        """Get road matcher checking all road matchers."""
         for matcher in self.road_matchers:
             matching, _ = matcher.is_matched(tags)
             if not matching:
@@ -630,12 +797,24 @@ class Scheme:
 
     def is_area(self, tags: Tags) -> bool:
         """Check whether way described by tags is area."""
+        return self.area_memo.get(tags, self.match_area)
+
+    def match_area(self, tags: Tags) -> bool:
+        """Check whether tags describe area checking all area matchers."""
         for matcher in self.area_matchers:
             matching, _ = matcher.is_matched(tags)
             if matching:
                 return True
         return False
 
+    def get_memo_statistics(self) -> dict[str, MemoStatistics]:
+        """Get usage of way style, road, and area memos."""
+        return {
+            "style": self.style_memo.statistics,
+            "road": self.road_memo.statistics,
+            "area": self.area_memo.statistics,
+        }
+
     def process_ignored(self, tags: Tags, processed: set[str]) -> None:
         """
         Mark all ignored tag as processed.
@@ -1,13 +1,18 @@
 """Map Machine tile server for slippy maps."""
 import argparse
+import json
 import logging
+from dataclasses import asdict
 from http.server import HTTPServer, SimpleHTTPRequestHandler
 from pathlib import Path
 from typing import Optional
 
 import cairosvg
 
+from map_machine.cache import CacheManager
 from map_machine.map_configuration import MapConfiguration
+from map_machine.osm.compression import Compression
+from map_machine.osm.store import OSMStore
 from map_machine.slippy.tile import Tile
 from map_machine.workspace import workspace
 
@@ -21,6 +26,9 @@ class TileServerHandler(SimpleHTTPRequestHandler):
     cache: Path = Path("cache")
     update_cache: bool = False
     options: Optional[argparse.Namespace] = None
+    store_path: Optional[Path] = None
+    cache_manager: Optional[CacheManager] = None
+    compression: Compression = Compression.NONE
 
     def __init__(
         self,
@@ -33,6 +41,10 @@ class TileServerHandler(SimpleHTTPRequestHandler):
 
     def do_GET(self) -> None:
         """Serve a GET request."""
+        if self.path == "/cache" and self.cache_manager is not None:
+            self.send_cache_statistics()
+            return
+
         parts: list[str] = self.path.split("/")
         if not (len(parts) == 5 and not parts[0] and parts[1] == "tiles"):
             return
@@ -41,31 +53,67 @@ class TileServerHandler(SimpleHTTPRequestHandler):
         x: int = int(parts[3])
         y: int = int(parts[4])
         tile: Tile = Tile(x, y, zoom_level)
-        tile_path: Path = workspace.get_tile_path()
-        svg_path: Path = tile.get_file_name(tile_path)
-        png_path: Path = svg_path.with_suffix(".png")
-
-        if self.update_cache:
-            if not png_path.exists():
-                if not svg_path.exists():
-                    tile.draw(
-                        tile_path,
-                        self.cache,
-                        MapConfiguration(zoom_level=zoom_level),
-                    )
-                with svg_path.open(encoding="utf-8") as input_file:
-                    cairosvg.svg2png(
-                        file_obj=input_file, write_to=str(png_path)
-                    )
-                logging.info(f"SVG file is rasterized to {png_path}.")
+
+        # Tiles generated with the `tile` command are served as is.
+        png_path: Path = tile.get_file_name(
+            workspace.get_tile_path()
+        ).with_suffix(".png")
+        if png_path.exists():
+            self.send_tile(png_path)
+            return
+
+        # Tiles drawn by the server are stored in the cache directory, so that
+        # they are removed with other cached files if the cache is too large.
+        svg_path: Path = tile.get_file_name(self.cache)
+        png_path = svg_path.with_suffix(".png")
+        exists: bool = (
+            png_path.exists()
+            if self.cache_manager is None
+            else self.cache_manager.lookup(png_path)
+        )
+
+        if self.update_cache and not exists:
+            if not svg_path.exists():
+                store: Optional[OSMStore] = (
+                    OSMStore(self.store_path) if self.store_path else None
+                )
+                tile.draw(
+                    self.cache,
+                    self.cache,
+                    MapConfiguration(zoom_level=zoom_level),
+                    store,
+                    self.cache_manager,
+                    self.compression,
+                )
+                if store is not None:
+                    store.close()
+            with svg_path.open(encoding="utf-8") as input_file:
+                cairosvg.svg2png(file_obj=input_file, write_to=str(png_path))
+            logging.info(f"SVG file is rasterized to {png_path}.")
+            if self.cache_manager is not None:
+                self.cache_manager.add(png_path)
 
         if png_path.exists():
-            with png_path.open("rb") as input_file:
-                self.send_response(200)
-                self.send_header("Content-type", "image/png")
-                self.end_headers()
-                self.wfile.write(input_file.read())
-                return
+            self.send_tile(png_path)
+
+    def send_tile(self, png_path: Path) -> None:
+        """Send PNG tile."""
+        with png_path.open("rb") as input_file:
+            self.send_response(200)
+            self.send_header("Content-type", "image/png")
+            self.end_headers()
+            self.wfile.write(input_file.read())
+
+    def send_cache_statistics(self) -> None:
+        """Send cache usage counters and the cache size as JSON."""
+        structure: dict[str, int] = asdict(self.cache_manager.statistics)
+        structure["size"] = self.cache_manager.get_size()
+        content: bytes = json.dumps(structure).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-type", "application/json")
+        self.end_headers()
+        self.wfile.write(content)
 
 
 def run_server(options: argparse.Namespace) -> None:
@@ -75,6 +123,10 @@ def run_server(options: argparse.Namespace) -> None:
         handler = TileServerHandler
         handler.cache = Path(options.cache)
         handler.options = options
+        handler.cache_manager = CacheManager.from_options(options)
+        handler.compression = Compression(options.cache_compression)
+        if options.store:
+            handler.store_path = Path(options.store)
         server = HTTPServer(("", options.port), handler)
         logging.info(f"Server started on port {options.port}.")
         server.serve_forever()
@@ -15,13 +15,18 @@ import numpy as np
 import svgwrite
 from PIL import Image
 
+from map_machine.cache import CacheManager
 from map_machine.constructor import Constructor
 from map_machine.geometry.boundary_box import BoundaryBox
 from map_machine.geometry.flinger import MercatorFlinger
 from map_machine.map_configuration import MapConfiguration
 from map_machine.mapper import Map
+from map_machine.osm.compression import Compression
 from map_machine.osm.osm_getter import NetworkError, get_osm
-from map_machine.osm.osm_reader import OSMData
+from map_machine.osm.osm_reader import MetadataMode, OSMData
+from map_machine.osm.snapshot import read_osm_data
+from map_machine.osm.spatial_index import SpatialIndex
+from map_machine.osm.store import OSMStore
 from map_machine.pictogram.icon import ShapeExtractor
 from map_machine.scheme import Scheme
 from map_machine.workspace import workspace
@@ -33,6 +38,45 @@ TILE_WIDTH, TILE_HEIGHT = 256, 256
 EXTEND_TO_BIGGER_TILE: bool = False
 
 
+def load_osm_data(
+    boundary_box: BoundaryBox,
+    cache_path: Path,
+    metadata_mode: MetadataMode = MetadataMode.FULL,
+    compression: Compression = Compression.NONE,
+    store: Optional[OSMStore] = None,
+    cache_manager: Optional[CacheManager] = None,
+) -> OSMData:
+    """
+    Construct map data for the boundary box.  If the store has no data for
+    it, data is downloaded into the cache file and added to the store.
+
+    :param boundary_box: area of the map
+    :param cache_path: directory to store OSM data files
+    :param metadata_mode: which metadata of elements should be parsed
+    :param compression: compression of downloaded OSM data files
+    :param store: local store of OSM data
+    :param cache_manager: manager of the cache directory size
+    """
+    if store is not None and store.covers(boundary_box):
+        return store.get_osm_data(boundary_box, metadata_mode)
+
+    cache_file_path: Path = (
+        cache_path / f"{boundary_box.get_format()}.osm{compression.suffix}"
+    )
+    get_osm(
+        boundary_box,
+        cache_file_path,
+        compression=compression,
+        cache_manager=cache_manager,
+    )
+
+    if store is None:
+        return read_osm_data(cache_file_path, metadata_mode)
+
+    store.import_file(cache_file_path)
+    return store.get_osm_data(boundary_box, metadata_mode)
+
+
 @dataclass
 class Tile:
     """
@@ -95,21 +139,31 @@ class Tile:
             point_1[1], point_2[0], point_2[1], point_1[0]
         ).round()
 
-    def load_osm_data(self, cache_path: Path) -> OSMData:
+    def load_osm_data(
+        self,
+        cache_path: Path,
+        metadata_mode: MetadataMode = MetadataMode.FULL,
+        compression: Compression = Compression.NONE,
+        store: Optional[OSMStore] = None,
+        cache_manager: Optional[CacheManager] = None,
+    ) -> OSMData:
         """
         Construct map data from extended boundary box.
 
         :param cache_path: directory to store OSM data files
+        :param metadata_mode: which metadata of elements should be parsed
+        :param compression: compression of downloaded OSM data files
+        :param store: local store of OSM data
+        :param cache_manager: manager of the cache directory size
         """
-        cache_file_path: Path = (
-            cache_path / f"{self.get_extended_boundary_box().get_format()}.osm"
+        return load_osm_data(
+            self.get_extended_boundary_box(),
+            cache_path,
+            metadata_mode,
+            compression,
+            store,
+            cache_manager,
         )
-        get_osm(self.get_extended_boundary_box(), cache_file_path)
-
-        osm_data: OSMData = OSMData()
-        osm_data.parse_osm_file(cache_file_path)
-
-        return osm_data
 
     def get_file_name(self, directory_name: Path) -> Path:
         """Get tile output SVG file path."""
@@ -131,6 +185,9 @@ class Tile:
         directory_name: Path,
         cache_path: Path,
         configuration: MapConfiguration,
+        store: Optional[OSMStore] = None,
+        cache_manager: Optional[CacheManager] = None,
+        compression: Compression = Compression.NONE,
     ) -> None:
         """
         Draw tile to SVG and PNG files.
@@ -138,21 +195,44 @@ class Tile:
         :param directory_name: output directory to storing tiles
         :param cache_path: directory to store SVG and PNG tiles
         :param configuration: drawing configuration
+        :param store: local store of OSM data
+        :param cache_manager: manager of the cache directory size
+        :param compression: compression of downloaded OSM data files
         """
         try:
-            osm_data: OSMData = self.load_osm_data(cache_path)
+            osm_data: OSMData = self.load_osm_data(
+                cache_path,
+                configuration.get_metadata_mode(),
+                compression,
+                store,
+                cache_manager,
+            )
         except NetworkError as error:
             raise NetworkError(f"Map is not loaded. {error.message}")
 
-        self.draw_with_osm_data(osm_data, directory_name, configuration)
+        self.draw_with_osm_data(
+            osm_data, directory_name, configuration, cache_manager=cache_manager
+        )
 
     def draw_with_osm_data(
         self,
         osm_data: OSMData,
         directory_name: Path,
         configuration: MapConfiguration,
+        spatial_index: Optional[SpatialIndex] = None,
+        cache_manager: Optional[CacheManager] = None,
     ) -> None:
-        """Draw SVG and PNG tile using OpenStreetMap data."""
+        """
+        Draw SVG and PNG tile using OpenStreetMap data.
+
+        :param osm_data: OpenStreetMap data
+        :param directory_name: output directory to storing tiles
+        :param configuration: drawing configuration
+        :param spatial_index: index of OpenStreetMap data, should be specified
+            if the data covers much more than the tile
+        :param cache_manager: manager of the cache directory size, tiles are
+            managed if they are stored in the cache directory
+        """
         top, left = self.get_coordinates()
         bottom, right = Tile(
             self.x + 1, self.y + 1, self.zoom_level
@@ -174,7 +254,7 @@ class Tile:
             workspace.ICONS_PATH, workspace.ICONS_CONFIG_PATH
         )
         constructor: Constructor = Constructor(
-            osm_data, flinger, icon_extractor, configuration
+            osm_data, flinger, icon_extractor, configuration, spatial_index
         )
         constructor.construct()
 
@@ -186,11 +266,15 @@ class Tile:
         with output_file_name.open("w", encoding="utf-8") as output_file:
             svg.write(output_file)
         logging.info(f"Tile is drawn to {output_file_name}.")
+        if cache_manager is not None:
+            cache_manager.add(output_file_name)
 
         output_path: Path = output_file_name.with_suffix(".png")
         with output_file_name.open(encoding="utf-8") as input_file:
             cairosvg.svg2png(file_obj=input_file, write_to=str(output_path))
         logging.info(f"SVG file is rasterized to {output_path}.")
+        if cache_manager is not None:
+            cache_manager.add(output_path)
 
     def subdivide(self, zoom_level: int) -> list["Tile"]:
         """Get subtiles of the tile."""
@@ -251,17 +335,31 @@ class Tiles:
 
         return cls(tiles, tile_1, tile_2, zoom_level, extended_boundary_box)
 
-    def load_osm_data(self, cache_path: Path) -> OSMData:
-        """Load OpenStreetMap data."""
-        cache_file_path: Path = (
-            cache_path / f"{self.boundary_box.get_format()}.osm"
-        )
-        get_osm(self.boundary_box, cache_file_path)
-
-        osm_data: OSMData = OSMData()
-        osm_data.parse_osm_file(cache_file_path)
+    def load_osm_data(
+        self,
+        cache_path: Path,
+        metadata_mode: MetadataMode = MetadataMode.FULL,
+        compression: Compression = Compression.NONE,
+        store: Optional[OSMStore] = None,
+        cache_manager: Optional[CacheManager] = None,
+    ) -> OSMData:
+        """
+        Load OpenStreetMap data.
 
-        return osm_data
+        :param cache_path: directory to store OSM data files
+        :param metadata_mode: which metadata of elements should be parsed
+        :param compression: compression of downloaded OSM data files
+        :param store: local store of OSM data
+        :param cache_manager: manager of the cache directory size
+        """
+        return load_osm_data(
+            self.boundary_box,
+            cache_path,
+            metadata_mode,
+            compression,
+            store,
+            cache_manager,
+        )
 
     def draw_separately(
         self, directory: Path, cache_path: Path, configuration: MapConfiguration
@@ -274,12 +372,18 @@ class Tiles:
         :param cache_path: directory for temporary OSM files
         :param configuration: drawing configuration
         """
-        osm_data: OSMData = self.load_osm_data(cache_path)
+        osm_data: OSMData = self.load_osm_data(
+            cache_path, configuration.get_metadata_mode()
+        )
+        # Every tile covers only a small part of the data.
+        spatial_index: SpatialIndex = SpatialIndex(osm_data)
 
         for tile in self.tiles:
             file_path: Path = tile.get_file_name(directory)
             if not file_path.exists():
-                tile.draw_with_osm_data(osm_data, directory, configuration)
+                tile.draw_with_osm_data(
+                    osm_data, directory, configuration, spatial_index
+                )
             else:
                 logging.debug(f"File {file_path} already exists.")
 
@@ -305,6 +409,8 @@ class Tiles:
         configuration: MapConfiguration,
         osm_data: OSMData,
         redraw: bool = False,
+        cache_manager: Optional[CacheManager] = None,
+        spatial_index: Optional[SpatialIndex] = None,
     ) -> None:
         """
         Draw one PNG image with all tiles and split it into a set of separate
@@ -315,12 +421,20 @@ class Tiles:
         :param configuration: drawing configuration
         :param osm_data: OpenStreetMap data
         :param redraw: update cache
+        :param cache_manager: manager of the cache directory size
+        :param spatial_index: index of OpenStreetMap data, should be specified
+            if the data covers much more than the tiles
         """
         if self.tiles_exist(directory) and not redraw:
             return
 
         self.draw_image_from_osm_data(
-            cache_path, configuration, osm_data, redraw
+            cache_path,
+            configuration,
+            osm_data,
+            redraw,
+            cache_manager,
+            spatial_index,
         )
         input_path: Path = self.get_file_path(cache_path).with_suffix(".png")
 
@@ -360,7 +474,9 @@ class Tiles:
         :param cache_path: directory for temporary SVG file and OSM files
         :param configuration: drawing configuration
         """
-        osm_data: OSMData = self.load_osm_data(cache_path)
+        osm_data: OSMData = self.load_osm_data(
+            cache_path, configuration.get_metadata_mode()
+        )
         self.draw_image_from_osm_data(cache_path, configuration, osm_data)
 
     def draw_image_from_osm_data(
@@ -369,11 +485,21 @@ class Tiles:
         configuration: MapConfiguration,
         osm_data: OSMData,
         redraw: bool = False,
+        cache_manager: Optional[CacheManager] = None,
+        spatial_index: Optional[SpatialIndex] = None,
     ) -> None:
-        """Draw all tiles using OSM data."""
+        """
+        Draw all tiles using OSM data.  Only map elements near the tiles are
+        constructed.
+        """
         output_path: Path = self.get_file_path(cache_path)
+        exists: bool = (
+            output_path.exists()
+            if cache_manager is None
+            else cache_manager.lookup(output_path)
+        )
 
-        if not output_path.exists() or redraw:
+        if not exists or redraw:
             top, left = self.tile_1.get_coordinates()
             bottom, right = Tile(
                 self.tile_2.x + 1,
@@ -390,7 +516,7 @@ class Tiles:
                 workspace.ICONS_PATH, workspace.ICONS_CONFIG_PATH
             )
             constructor: Constructor = Constructor(
-                osm_data, flinger, extractor, configuration
+                osm_data, flinger, extractor, configuration, spatial_index
             )
             constructor.construct()
 
@@ -403,6 +529,8 @@ class Tiles:
             logging.info(f"Writing output SVG {output_path}...")
             with output_path.open("w+", encoding="utf-8") as output_file:
                 svg.write(output_file)
+            if cache_manager is not None:
+                cache_manager.add(output_path)
         else:
             logging.debug(f"File {output_path} already exists.")
 
@@ -412,6 +540,8 @@ class Tiles:
             with output_path.open(encoding="utf-8") as input_file:
                 cairosvg.svg2png(file_obj=input_file, write_to=str(png_path))
             logging.info(f"SVG file is rasterized to {png_path}.")
+            if cache_manager is not None:
+                cache_manager.add(png_path)
         else:
             logging.debug(f"File {png_path} already exists.")
 
@@ -473,85 +603,161 @@ def generate_tiles(options: argparse.Namespace) -> None:
     scheme: Scheme = Scheme.from_file(
         workspace.find_scheme_path(options.scheme)
     )
+    metadata_mode: MetadataMode = MapConfiguration.from_options(
+        scheme, options, min_zoom_level
+    ).get_metadata_mode()
+    store: Optional[OSMStore] = (
+        OSMStore(Path(options.store)) if options.store else None
+    )
+    cache_manager: CacheManager = CacheManager.from_options(options)
+
+    try:
+        if options.input_file_name:
+            # If boundary box is specified, only tiles inside it are drawn, so
+            # the rest of the input file is not loaded.
+            boundary_box: Optional[BoundaryBox] = None
+            if options.boundary_box:
+                boundary_box = BoundaryBox.from_text(options.boundary_box)
+                if boundary_box is None:
+                    logging.fatal("Failed to parse boundary box.")
+                    sys.exit(1)
+
+            osm_data: OSMData = OSMData(metadata_mode)
+            osm_data.parse_file(
+                Path(options.input_file_name),
+                boundary_box,
+                options.parse_workers,
+            )
 
-    if options.input_file_name:
-        osm_data: OSMData = OSMData()
-        osm_data.parse_osm_file(Path(options.input_file_name))
+            if boundary_box is None:
+                boundary_box = osm_data.view_box
+            if boundary_box is None:
+                logging.fatal(
+                    "Failed to parse boundary box input file "
+                    f"{options.input_file_name}."
+                )
+                sys.exit(1)
+            if store is not None:
+                # Tiles are constructed from the store, as for downloaded data.
+                store.add_osm_data(osm_data, boundary_box)
+                osm_data = store.get_osm_data(boundary_box, metadata_mode)
 
-        if osm_data.view_box is None:
-            logging.fatal(
-                "Failed to parse boundary box input file "
-                f"{options.input_file_name}."
+            # Tiles of higher zoom levels cover only a small part of the data.
+            spatial_index: SpatialIndex = SpatialIndex(osm_data)
+
+            for zoom_level in zoom_levels:
+                configuration: MapConfiguration = MapConfiguration.from_options(
+                    scheme, options, zoom_level
+                )
+                tiles: Tiles = Tiles.from_boundary_box(boundary_box, zoom_level)
+                tiles.draw(
+                    directory,
+                    Path(options.cache),
+                    configuration,
+                    osm_data,
+                    cache_manager=cache_manager,
+                    spatial_index=spatial_index,
+                )
+
+        elif options.coordinates:
+            coordinates: list[float] = list(
+                map(float, options.coordinates.strip().split(","))
             )
-            sys.exit(1)
+            min_tile: Tile = Tile.from_coordinates(
+                np.array(coordinates), min_zoom_level
+            )
+            try:
+                osm_data: OSMData = min_tile.load_osm_data(
+                    Path(options.cache),
+                    metadata_mode,
+                    Compression(options.cache_compression),
+                    store,
+                    cache_manager,
+                )
+            except NetworkError as error:
+                raise NetworkError(f"Map is not loaded. {error.message}")
+
+            # Tiles of higher zoom levels cover only a small part of the data.
+            spatial_index: SpatialIndex = SpatialIndex(osm_data)
 
-        boundary_box: BoundaryBox = osm_data.view_box
+            for zoom_level in zoom_levels:
+                tile: Tile = Tile.from_coordinates(
+                    np.array(coordinates), zoom_level
+                )
+                try:
+                    configuration = MapConfiguration.from_options(
+                        scheme, options, zoom_level
+                    )
+                    tile.draw_with_osm_data(
+                        osm_data, directory, configuration, spatial_index
+                    )
+                except NetworkError as error:
+                    logging.fatal(error.message)
 
-        for zoom_level in zoom_levels:
+        elif options.tile:
+            zoom_level, x, y = map(int, options.tile.split("/"))
+            tile: Tile = Tile(x, y, zoom_level)
             configuration: MapConfiguration = MapConfiguration.from_options(
                 scheme, options, zoom_level
             )
-            tiles: Tiles = Tiles.from_boundary_box(boundary_box, zoom_level)
-            tiles.draw(directory, Path(options.cache), configuration, osm_data)
+            tile.draw(
+                directory,
+                Path(options.cache),
+                configuration,
+                store,
+                cache_manager,
+                Compression(options.cache_compression),
+            )
 
-    elif options.coordinates:
-        coordinates: list[float] = list(
-            map(float, options.coordinates.strip().split(","))
-        )
-        min_tile: Tile = Tile.from_coordinates(
-            np.array(coordinates), min_zoom_level
-        )
-        try:
-            osm_data: OSMData = min_tile.load_osm_data(Path(options.cache))
-        except NetworkError as error:
-            raise NetworkError(f"Map is not loaded. {error.message}")
+        elif options.boundary_box:
+            boundary_box: Optional[BoundaryBox] = BoundaryBox.from_text(
+                options.boundary_box
+            )
+            if boundary_box is None:
+                logging.fatal("Failed to parse boundary box.")
+                sys.exit(1)
 
-        for zoom_level in zoom_levels:
-            tile: Tile = Tile.from_coordinates(
-                np.array(coordinates), zoom_level
+            min_tiles: Tiles = Tiles.from_boundary_box(
+                boundary_box, min_zoom_level
             )
             try:
-                configuration: MapConfiguration = MapConfiguration.from_options(
-                    scheme, options, zoom_level
+                osm_data: OSMData = min_tiles.load_osm_data(
+                    Path(options.cache),
+                    metadata_mode,
+                    Compression(options.cache_compression),
+                    store,
+                    cache_manager,
                 )
-                tile.draw_with_osm_data(osm_data, directory, configuration)
             except NetworkError as error:
-                logging.fatal(error.message)
+                raise NetworkError(f"Map is not loaded. {error.message}")
 
-    elif options.tile:
-        zoom_level, x, y = map(int, options.tile.split("/"))
-        tile: Tile = Tile(x, y, zoom_level)
-        configuration: MapConfiguration = MapConfiguration.from_options(
-            scheme, options, zoom_level
-        )
-        tile.draw(directory, Path(options.cache), configuration)
+            spatial_index: SpatialIndex = SpatialIndex(osm_data)
 
-    elif options.boundary_box:
-        boundary_box: Optional[BoundaryBox] = BoundaryBox.from_text(
-            options.boundary_box
-        )
-        if boundary_box is None:
-            logging.fatal("Failed to parse boundary box.")
-            sys.exit(1)
-
-        min_tiles: Tiles = Tiles.from_boundary_box(boundary_box, min_zoom_level)
-        try:
-            osm_data: OSMData = min_tiles.load_osm_data(Path(options.cache))
-        except NetworkError as error:
-            raise NetworkError(f"Map is not loaded. {error.message}")
+            for zoom_level in zoom_levels:
+                if EXTEND_TO_BIGGER_TILE:
+                    tiles: Tiles = min_tiles.subdivide(zoom_level)
+                else:
+                    tiles: Tiles = Tiles.from_boundary_box(
+                        boundary_box, zoom_level
+                    )
+                configuration: MapConfiguration = MapConfiguration.from_options(
+                    scheme, options, zoom_level
+                )
+                tiles.draw(
+                    directory,
+                    Path(options.cache),
+                    configuration,
+                    osm_data,
+                    cache_manager=cache_manager,
+                    spatial_index=spatial_index,
+                )
 
-        for zoom_level in zoom_levels:
-            if EXTEND_TO_BIGGER_TILE:
-                tiles: Tiles = min_tiles.subdivide(zoom_level)
-            else:
-                tiles: Tiles = Tiles.from_boundary_box(boundary_box, zoom_level)
-            configuration: MapConfiguration = MapConfiguration.from_options(
-                scheme, options, zoom_level
+        else:
+            logging.fatal(
+                "Specify either --coordinates, --boundary-box, --tile, or "
+                "--input."
             )
-            tiles.draw(directory, Path(options.cache), configuration, osm_data)
-
-    else:
-        logging.fatal(
-            "Specify either --coordinates, --boundary-box, --tile, or --input."
-        )
-        sys.exit(1)
+            sys.exit(1)
+    finally:
+        if store is not None:
+            store.close()
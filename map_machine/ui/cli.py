@@ -3,6 +3,7 @@ import argparse
 
 from map_machine import __version__
 from map_machine.map_configuration import BuildingMode, DrawingMode, LabelMode
+from map_machine.osm.compression import Compression
 from map_machine.osm.osm_reader import STAGES_OF_DECAY
 
 __author__ = "Sergey Vartanov"
@@ -236,11 +237,27 @@ def add_tile_arguments(parser: argparse.ArgumentParser) -> None:
         default="cache",
         metavar="<path>",
     )
+    parser.add_argument(
+        "--cache-compression",
+        metavar="<format>",
+        default="none",
+        choices=[compression.value for compression in Compression],
+        help="compression of downloaded OSM files: "
+        + ", ".join(compression.value for compression in Compression),
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=float,
+        metavar="<megabytes>",
+        help="maximum size of the cache directory; least recently used files "
+        "are removed",
+    )
     parser.add_argument(
         "-b",
         "--boundary-box",
         help="construct the minimum amount of tiles that cover the requested "
-        "boundary box",
+        "boundary box; with --input, only this part of the input file is "
+        "loaded",
         metavar="<lon1>,<lat1>,<lon2>,<lat2>",
     )
     parser.add_argument(
@@ -257,8 +274,22 @@ def add_tile_arguments(parser: argparse.ArgumentParser) -> None:
         "--input",
         dest="input_file_name",
         metavar="<path>",
-        help="input OSM XML file name (if not specified, the file will be "
-        "downloaded using the OpenStreetMap API)",
+        help="input OSM XML, Overpass JSON, or PBF file name (if not "
+        "specified, the file will be downloaded using the OpenStreetMap API)",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        dest="parse_workers",
+        type=int,
+        metavar="<integer>",
+        help="number of processes to parse input file; by default, OSM XML "
+        "is parsed in one process and PBF in all processors",
+    )
+    parser.add_argument(
+        "--store",
+        metavar="<path>",
+        help="SQLite database with OSM data; downloaded and input data is "
+        "added to it and tiles are constructed from it",
     )
 
 
@@ -270,6 +301,27 @@ def add_server_arguments(parser: argparse.ArgumentParser) -> None:
         default="cache",
         metavar="<path>",
     )
+    parser.add_argument(
+        "--cache-compression",
+        metavar="<format>",
+        default="none",
+        choices=[compression.value for compression in Compression],
+        help="compression of downloaded OSM files: "
+        + ", ".join(compression.value for compression in Compression),
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=float,
+        metavar="<megabytes>",
+        help="maximum size of the cache directory; least recently used files "
+        "are removed",
+    )
+    parser.add_argument(
+        "--store",
+        metavar="<path>",
+        help="SQLite database with OSM data; downloaded data is added to "
+        "it and tiles are constructed from it",
+    )
     parser.add_argument(
         "--port",
         help="port number",
@@ -294,8 +346,16 @@ def add_render_arguments(parser: argparse.ArgumentParser) -> None:
         dest="input_file_names",
         metavar="<path>",
         nargs="*",
-        help="input XML file name or names (if not specified, file will be "
-        "downloaded using the OpenStreetMap API)",
+        help="input OSM XML, Overpass JSON, or PBF file name or names (if not "
+        "specified, file will be downloaded using the OpenStreetMap API)",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        dest="parse_workers",
+        type=int,
+        metavar="<integer>",
+        help="number of processes to parse input files; by default, OSM XML "
+        "is parsed in one process and PBF in all processors",
     )
     parser.add_argument(
         "-o",
@@ -317,6 +377,21 @@ def add_render_arguments(parser: argparse.ArgumentParser) -> None:
         default="cache",
         metavar="<path>",
     )
+    parser.add_argument(
+        "--cache-compression",
+        metavar="<format>",
+        default="none",
+        choices=[compression.value for compression in Compression],
+        help="compression of downloaded OSM files: "
+        + ", ".join(compression.value for compression in Compression),
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=float,
+        metavar="<megabytes>",
+        help="maximum size of the cache directory; least recently used files "
+        "are removed",
+    )
     parser.add_argument(
         "-z",
         "--zoom",
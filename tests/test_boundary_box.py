@@ -43,3 +43,29 @@ def test_boundary_box_parsing() -> None:
 
     # Too big boundary box.
     assert BoundaryBox.from_text("-20,-20,20,20") is None
+
+
+def test_extend() -> None:
+    """Test extending boundary box by the fraction of its size."""
+    box: BoundaryBox = BoundaryBox(10.0, 20.0, 12.0, 21.0)
+    assert box.extend(0.5) == BoundaryBox(9.0, 19.5, 13.0, 21.5)
+    assert box == BoundaryBox(10.0, 20.0, 12.0, 21.0)
+
+
+def test_subtract() -> None:
+    """Test parts of boundary box not covered by another one."""
+    box: BoundaryBox = BoundaryBox(0.0, 0.0, 4.0, 4.0)
+
+    assert box.subtract(BoundaryBox(1.0, 1.0, 2.0, 2.0)) == [
+        BoundaryBox(0.0, 0.0, 4.0, 1.0),
+        BoundaryBox(0.0, 2.0, 4.0, 4.0),
+        BoundaryBox(0.0, 1.0, 1.0, 2.0),
+        BoundaryBox(2.0, 1.0, 4.0, 2.0),
+    ]
+    assert box.subtract(BoundaryBox(-1.0, 2.0, 5.0, 5.0)) == [
+        BoundaryBox(0.0, 0.0, 4.0, 2.0)
+    ]
+    assert box.subtract(BoundaryBox(-1.0, -1.0, 5.0, 5.0)) == []
+    assert box.subtract(BoundaryBox(4.0, 0.0, 5.0, 4.0)) == [box]
+    assert box.contains(BoundaryBox(1.0, 1.0, 2.0, 2.0))
+    assert not box.contains(BoundaryBox(1.0, 1.0, 5.0, 2.0))
@@ -0,0 +1,94 @@
+"""Test cache directory with limited size."""
+import os
+from pathlib import Path
+
+from map_machine.cache import CacheManager
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+
+def write(path: Path, size: int, access_time: float) -> Path:
+    """Write file of the size with the modification time."""
+    path.write_bytes(b"0" * size)
+    os.utime(path, (access_time, access_time))
+    return path
+
+
+def test_eviction(tmp_path: Path) -> None:
+    """Test that least recently used files are removed."""
+    for index in range(3):
+        write(tmp_path / f"{index}.osm", 100, 1000.0 + index)
+    write(tmp_path / "0.osm.snapshot", 100, 1000.0)
+    write(tmp_path / "map.db", 1000, 0.0)
+
+    cache_manager: CacheManager = CacheManager(tmp_path, 350)
+    assert cache_manager.get_size() == 400
+
+    # Access makes the oldest file the newest one.
+    assert cache_manager.lookup(tmp_path / "0.osm")
+    assert not cache_manager.lookup(tmp_path / "3.osm")
+    cache_manager.add(write(tmp_path / "3.osm", 100, 1000.0))
+
+    assert sorted(x.name for x in tmp_path.glob("*.osm*")) == [
+        "0.osm",
+        "0.osm.snapshot",
+        "3.osm",
+    ]
+    assert (tmp_path / "map.db").exists()
+    assert cache_manager.statistics.hits == 1
+    assert cache_manager.statistics.misses == 1
+    assert cache_manager.statistics.evictions == 2
+    assert cache_manager.statistics.evicted_size == 200
+
+
+def test_new_file_is_kept(tmp_path: Path) -> None:
+    """Test that the new file is not removed even if it is too large."""
+    write(tmp_path / "0.svg", 100, 1000.0)
+    cache_manager: CacheManager = CacheManager(tmp_path, 50)
+
+    cache_manager.add(write(tmp_path / "1.png", 100, 1000.0))
+
+    assert not (tmp_path / "0.svg").exists()
+    assert (tmp_path / "1.png").exists()
+
+
+def test_access_index(tmp_path: Path) -> None:
+    """Test that access times are shared through the index file."""
+    write(tmp_path / "0.osm", 100, 1000.0)
+    write(tmp_path / "1.osm", 100, 2000.0)
+    cache_manager: CacheManager = CacheManager(tmp_path)
+    cache_manager.lookup(tmp_path / "0.osm")
+    cache_manager.save()
+
+    cache_manager = CacheManager(tmp_path, 150)
+    cache_manager.evict(set())
+
+    assert (tmp_path / "0.osm").exists()
+    assert not (tmp_path / "1.osm").exists()
+
+
+def test_access_is_saved(tmp_path: Path) -> None:
+    """Test that access to cached file is saved without adding files."""
+    write(tmp_path / "0.osm", 100, 1000.0)
+    write(tmp_path / "1.osm", 100, 2000.0)
+    CacheManager(tmp_path).lookup(tmp_path / "0.osm")
+
+    cache_manager: CacheManager = CacheManager(tmp_path, 150)
+    cache_manager.evict(set())
+
+    assert (tmp_path / "0.osm").exists()
+    assert not (tmp_path / "1.osm").exists()
+
+
+def test_outside_file_is_not_managed(tmp_path: Path) -> None:
+    """Test that files outside of the cache directory are not removed."""
+    cache_path: Path = tmp_path / "cache"
+    cache_manager: CacheManager = CacheManager(cache_path, 150)
+    write(cache_path / "0.svg", 100, 1000.0)
+    cache_manager.add(write(tmp_path / "1.svg", 100, 2000.0))
+    cache_manager.add(write(cache_path / "2.svg", 100, 3000.0))
+
+    assert (tmp_path / "1.svg").exists()
+    assert not (cache_path / "0.svg").exists()
+    assert "1.svg" not in cache_manager.access_times
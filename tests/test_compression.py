@@ -0,0 +1,75 @@
+"""Test reading compressed OSM data files."""
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from map_machine.osm.compression import (
+    Compression,
+    compress,
+    detect_compression,
+    get_uncompressed_name,
+)
+from map_machine.osm.osm_reader import OSMData
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+OSM_PATH: Path = Path("tests/data/39.999,49.999,40.002,50.002.osm")
+
+
+def write_compressed(
+    path: Path, compression: Compression, source_path: Path = OSM_PATH
+) -> Path:
+    """Write compressed copy of the file."""
+    with source_path.open("rb") as input_file:
+        content: bytes = input_file.read()
+    with path.open("wb") as output_file:
+        output_file.write(compress(content, compression))
+    return path
+
+
+@pytest.mark.parametrize("compression", list(Compression))
+def test_parse_compressed(tmp_path: Path, compression: Compression) -> None:
+    """Test that compressed file is parsed the same way as the raw one."""
+    path: Path = write_compressed(
+        tmp_path / f"map.osm{compression.suffix}", compression
+    )
+    assert detect_compression(path) == compression
+
+    expected: OSMData = OSMData()
+    expected.parse_file(OSM_PATH)
+    osm_data: OSMData = OSMData()
+    osm_data.parse_file(path)
+
+    assert osm_data.nodes == expected.nodes
+    assert osm_data.ways == expected.ways
+    assert osm_data.relations == expected.relations
+    assert osm_data.view_box == expected.view_box
+
+    # Compressed file cannot be split, but parallel parsing still works.
+    osm_data = OSMData()
+    osm_data.parse_osm_file(path, workers=2)
+    assert osm_data.ways == expected.ways
+
+
+def test_detect_by_content(tmp_path: Path) -> None:
+    """Test that compression is detected regardless of the file name."""
+    path: Path = write_compressed(tmp_path / "map.osm", Compression.XZ)
+    assert detect_compression(path) == Compression.XZ
+
+    expected: OSMData = OSMData()
+    expected.parse_file(OSM_PATH)
+    osm_data: OSMData = OSMData()
+    osm_data.parse_file(path)
+    assert np.array_equal(
+        osm_data.node_table.coordinates, expected.node_table.coordinates
+    )
+    assert osm_data.ways == expected.ways
+
+
+def test_uncompressed_name() -> None:
+    """Test removing compression suffix from file name."""
+    assert get_uncompressed_name(Path("map.osm.bz2")) == "map.osm"
+    assert get_uncompressed_name(Path("map.json.gz")) == "map.json"
+    assert get_uncompressed_name(Path("map.osm")) == "map.osm"
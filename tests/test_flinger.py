@@ -1,11 +1,16 @@
 """Test coordinates computation."""
 import numpy as np
 
+from map_machine.geometry.boundary_box import BoundaryBox
 from map_machine.geometry.flinger import (
+    CachedFlinger,
+    MercatorFlinger,
     osm_zoom_level_to_pixels_per_meter,
     pseudo_mercator,
 )
 
+from map_machine.osm.osm_reader import NodeList, NodeTable, OSMNode
+
 __author__ = "Sergey Vartanov"
 __email__ = "me@enzet.ru"
 
@@ -24,3 +29,108 @@ def test_osm_zoom_level_to_pixels_per_meter() -> None:
     assert np.allclose(
         osm_zoom_level_to_pixels_per_meter(18, 40_075_017.0), 1.6745810488364858
     )
+
+
+def test_fling_many() -> None:
+    """Test that vectorized projection gives the same points."""
+    flinger: MercatorFlinger = MercatorFlinger(
+        BoundaryBox(-0.01, -0.01, 0.01, 0.01), 18, 40_075_017.0
+    )
+    coordinates: np.ndarray = np.array(
+        ((0.0, 0.0), (0.005, -0.003), (-0.01, 0.01), (60.0, 30.0))
+    )
+    assert np.allclose(
+        flinger.fling_many(coordinates),
+        np.array([flinger.fling(x) for x in coordinates]),
+    )
+    assert np.allclose(
+        flinger.get_scale_many(coordinates),
+        np.array([flinger.get_scale(x) for x in coordinates]),
+    )
+    assert flinger.fling_many(np.empty((0, 2))).shape == (0, 2)
+
+
+def test_cached_flinger() -> None:
+    """Test that every node is projected once."""
+    flinger: MercatorFlinger = MercatorFlinger(
+        BoundaryBox(-0.01, -0.01, 0.01, 0.01), 18, 40_075_017.0
+    )
+    table: NodeTable = NodeTable()
+    for index in range(4):
+        table.add(index + 1, np.array((index / 1000.0, 0.002)), {})
+    cached: CachedFlinger = CachedFlinger(flinger, table)
+    nodes: NodeList = NodeList(table, np.array((0, 1, 2, 1)))
+
+    assert np.allclose(
+        cached.fling_nodes(nodes), flinger.fling_many(nodes.coordinates)
+    )
+    assert cached.statistics.projected == 3
+    assert cached.statistics.hits == 1
+
+    # Nodes not backed by the table are found by identifier.
+    assert np.allclose(
+        cached.fling_node(table.get_node(3)),
+        flinger.fling(table.coordinates[3]),
+    )
+    assert cached.fling_nodes([table.get_node(0), table.get_node(3)]).shape == (
+        2,
+        2,
+    )
+    assert cached.statistics.projected == 4
+    assert cached.statistics.hits == 3
+
+    unknown: OSMNode = OSMNode({}, 100, np.array((0.0, 0.0)))
+    assert np.allclose(
+        cached.fling_node(unknown), flinger.fling(unknown.coordinates)
+    )
+    assert cached.statistics.uncached == 1
+
+
+def test_world_coordinates() -> None:
+    """Test that cached pseudo-Mercator coordinates serve all zoom levels."""
+    table: NodeTable = NodeTable()
+    for index in range(4):
+        table.add(index + 1, np.array((index / 1000.0, 0.002)), {})
+    rows: np.ndarray = np.array((3, 0, 2))
+
+    for zoom_level in 12, 18:
+        flinger: MercatorFlinger = MercatorFlinger(
+            BoundaryBox(-0.01, -0.01, 0.01, 0.01), zoom_level, 40_075_017.0
+        )
+        assert np.allclose(
+            flinger.fling_table(table, rows),
+            flinger.fling_many(table.coordinates[rows]),
+        )
+        assert np.allclose(
+            flinger.get_scale_table(table, rows),
+            flinger.get_scale_many(table.coordinates[rows]),
+        )
+    assert table.world_size == 4
+
+    table.set_node(0, OSMNode({}, 1, np.array((0.005, 0.005))))
+    assert np.allclose(
+        table.get_world_coordinates(np.array((0,))),
+        pseudo_mercator(np.array((0.005, 0.005))),
+    )
+    assert np.allclose(
+        table.get_scale_factors(np.array((0,))),
+        1.0 / np.cos(0.005 / 180.0 * np.pi),
+    )
+
+
+def test_extended_boundaries() -> None:
+    """Test extension of the flinger boundary box in pixels."""
+    flinger: MercatorFlinger = MercatorFlinger(
+        BoundaryBox(10.0, 20.0, 10.01, 20.01), 18, 40_075_017.0
+    )
+    boundary_box: BoundaryBox = flinger.get_extended_boundaries(10.0)
+
+    # Image size is rounded down to whole pixels.
+    assert np.allclose(
+        flinger.fling(boundary_box.get_left_top()), (-10.0, -10.0), atol=1.0
+    )
+    assert np.allclose(
+        flinger.fling(boundary_box.get_right_bottom()),
+        flinger.size + 10.0,
+        atol=1.0,
+    )
@@ -209,3 +209,26 @@ def test_diving_tower() -> None:
         },
         [("diving_4_platforms", DEFAULT_COLOR)],
     )
+
+
+def test_cached_icon_set() -> None:
+    """
+    Check that cached icon set reports processed tag keys and is not shared
+    between configurations.
+    """
+    tags: Tags = {"amenity": "vending_machine", "vending": "drinks"}
+    for _ in range(2):
+        processed: set[str] = set()
+        icon_set, _ = CONFIGURATION.get_icon(SHAPE_EXTRACTOR, tags, processed)
+        assert processed == {"amenity", "vending"}
+        assert icon_set.processed == processed
+
+    overlapped, _ = MapConfiguration(SCHEME, show_overlapped=True).get_icon(
+        SHAPE_EXTRACTOR, tags, set()
+    )
+    assert icon_set.default_icon is None
+    assert overlapped.default_icon is not None
+
+    recolored: Icon = icon_set.main_icon.get_recolored(Color("#FF0000"))
+    assert recolored.shape_specifications[0].color == Color("#FF0000")
+    assert icon_set.main_icon.shape_specifications[0].color == DEFAULT_COLOR
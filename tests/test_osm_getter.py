@@ -0,0 +1,334 @@
+"""Test downloading OpenStreetMap data with a local HTTP server."""
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator, Optional
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from map_machine.cache import CacheManager
+from map_machine.geometry.boundary_box import BoundaryBox
+from map_machine.osm.download_cache import get_uncovered_parts
+from map_machine.osm.osm_getter import Downloader, NetworkError, RateLimiter
+from map_machine.osm.osm_reader import OSMData
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+
+# Server data: grid of nodes with the step in degrees, and ways along grid
+# rows of the specified number of nodes starting at zero longitude.
+STEP: float = 0.0005
+WAY_LENGTH: int = 40
+
+
+def get_grid(boundary_box: BoundaryBox) -> tuple[range, range]:
+    """Get rows and columns of grid nodes inside the boundary box."""
+    return (
+        range(
+            math.ceil(boundary_box.bottom / STEP - 1e-6),
+            math.floor(boundary_box.top / STEP + 1e-6) + 1,
+        ),
+        range(
+            math.ceil(boundary_box.left / STEP - 1e-6),
+            math.floor(boundary_box.right / STEP + 1e-6) + 1,
+        ),
+    )
+
+
+def get_osm_text(boundary_box: BoundaryBox) -> str:
+    """
+    Get OSM XML data as returned by the OpenStreetMap API: nodes inside the
+    boundary box, ways that reference them, and all nodes of these ways.
+    """
+    rows, columns = get_grid(boundary_box)
+    nodes: set[tuple[int, int]] = {(i, j) for i in rows for j in columns}
+    ways: list[int] = [
+        i for i in rows if columns.start < WAY_LENGTH and columns.stop > 0
+    ]
+    nodes |= {(i, j) for i in ways for j in range(WAY_LENGTH)}
+
+    lines: list[str] = ['<osm version="0.6">']
+    lines += [
+        f'<node id="{i * 100_000 + j + 1}" lat="{i * STEP:.7f}" '
+        f'lon="{j * STEP:.7f}"/>'
+        for i, j in sorted(nodes)
+    ]
+    for i in ways:
+        lines.append(f'<way id="{i + 1}">')
+        lines += [
+            f'<nd ref="{i * 100_000 + j + 1}"/>' for j in range(WAY_LENGTH)
+        ]
+        lines.append("</way>")
+    lines.append("</osm>")
+    return "\n".join(lines)
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Handler that fails the first requests and then returns OSM data."""
+
+    failures: int = 0
+    # Maximum number of nodes inside the requested boundary box.
+    node_limit: Optional[int] = None
+    requests: list[str] = []
+    active: int = 0
+    max_active: int = 0
+    lock: threading.Lock = threading.Lock()
+
+    def do_GET(self) -> None:
+        """Serve a GET request."""
+        with self.lock:
+            Handler.requests.append(self.path)
+            Handler.active += 1
+            Handler.max_active = max(Handler.max_active, Handler.active)
+            failed: bool = Handler.failures > 0
+            Handler.failures -= 1
+
+        time.sleep(0.05)
+        with self.lock:
+            Handler.active -= 1
+
+        if failed:
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        boundary_box: BoundaryBox = BoundaryBox.from_text(
+            parse_qs(urlparse(self.path).query)["bbox"][0]
+        )
+        rows, columns = get_grid(boundary_box)
+        if self.node_limit is not None and (
+            len(rows) * len(columns) > self.node_limit
+        ):
+            content: bytes = (
+                b"You requested too many nodes (limit is 50000). Either "
+                b"request a smaller area, or use planet.osm"
+            )
+            self.send_response(400)
+        else:
+            content = get_osm_text(boundary_box).encode()
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *_) -> None:
+        """Do not log requests."""
+
+
+@pytest.fixture
+def address() -> Iterator[str]:
+    """Run local HTTP server."""
+    Handler.failures = 0
+    Handler.node_limit = None
+    Handler.requests = []
+    Handler.active = Handler.max_active = 0
+    server: ThreadingHTTPServer = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread: threading.Thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/api/0.6/map"
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def get_downloader(address: str, **kwargs) -> Downloader:
+    """Create downloader without rate limiting and with short backoff."""
+    parameters: dict = {"rate": 1000.0, "burst_size": 100}
+    parameters.update(kwargs)
+    return Downloader(address, backoff_time=0.01, **parameters)
+
+
+def test_get_osm(address: str, tmp_path: Path) -> None:
+    """Test that downloaded data is written to the cache."""
+    downloader: Downloader = get_downloader(address)
+    path: Path = tmp_path / "map.osm"
+    boundary_box: BoundaryBox = BoundaryBox(10.0, 20.0, 10.001, 20.001)
+
+    content: str = downloader.get_osm(boundary_box, path)
+
+    assert content.startswith("<osm")
+    assert path.read_text() == content
+    assert downloader.get_osm(boundary_box, path) == content
+    assert len(Handler.requests) == 1
+
+
+def test_retry(address: str, tmp_path: Path) -> None:
+    """Test that failed requests are retried."""
+    Handler.failures = 2
+    downloader: Downloader = get_downloader(address)
+
+    downloader.get_osm(BoundaryBox(10.0, 20.0, 10.001, 20.001), tmp_path / "a")
+
+    assert len(Handler.requests) == 3
+
+
+def test_too_many_attempts(address: str, tmp_path: Path) -> None:
+    """Test that the request fails after the last attempt."""
+    Handler.failures = 10
+    downloader: Downloader = get_downloader(address, attempts=3)
+
+    with pytest.raises(NetworkError):
+        downloader.get_osm(
+            BoundaryBox(10.0, 20.0, 10.001, 20.001), tmp_path / "a"
+        )
+    assert len(Handler.requests) == 3
+
+
+def test_get_osm_many(address: str, tmp_path: Path) -> None:
+    """Test simultaneous downloads."""
+    downloader: Downloader = get_downloader(address, max_downloads=3)
+    boundary_boxes: list[BoundaryBox] = [
+        BoundaryBox(10.0 + i / 100.0, 20.0, 10.001 + i / 100.0, 20.001)
+        for i in range(9)
+    ]
+
+    paths: list[Path] = downloader.get_osm_many(boundary_boxes, tmp_path)
+
+    assert len(Handler.requests) == 9
+    assert 1 < Handler.max_active <= 3
+    for boundary_box, path in zip(boundary_boxes, paths):
+        osm_data: OSMData = OSMData()
+        osm_data.parse_osm_file(path)
+        assert osm_data.nodes
+        for node in osm_data.nodes.values():
+            assert boundary_box.left - STEP <= node.coordinates[1]
+            assert node.coordinates[1] <= boundary_box.right + STEP
+
+
+def test_rate_limiter() -> None:
+    """Test that requests after the burst wait for the rate."""
+    rate_limiter: RateLimiter = RateLimiter(50.0, 2)
+    start: float = time.monotonic()
+    for _ in range(7):
+        rate_limiter.acquire()
+
+    # 2 requests are sent at once, 5 more take 0.1 seconds.
+    assert time.monotonic() - start >= 0.09
+
+
+def get_elements(path: Path) -> tuple[set[int], set[int]]:
+    """Get node and way identifiers of OSM XML file."""
+    osm_data: OSMData = OSMData()
+    osm_data.parse_osm_file(path)
+    return set(osm_data.nodes), set(osm_data.ways)
+
+
+def test_cached_superset(address: str, tmp_path: Path) -> None:
+    """Test that data inside cached area is not downloaded."""
+    downloader: Downloader = get_downloader(address)
+    downloader.get_osm(BoundaryBox(0.0, 0.0, 0.004, 0.004), tmp_path / "a.osm")
+
+    boundary_box: BoundaryBox = BoundaryBox(0.001, 0.001, 0.003, 0.003)
+    path: Path = tmp_path / "b.osm"
+    downloader.get_osm(boundary_box, path)
+
+    assert len(Handler.requests) == 1
+    expected: Path = tmp_path / "expected.osm"
+    expected.write_text(get_osm_text(boundary_box))
+    assert get_elements(path) == get_elements(expected)
+
+
+def test_cached_rounded(address: str, tmp_path: Path) -> None:
+    """
+    Test that data extracted from cached files covers the rounded boundary
+    box, since it is stored in the file named by the rounded boundary box.
+    """
+    downloader: Downloader = get_downloader(address)
+    downloader.get_osm(BoundaryBox(0.0, 0.0, 0.004, 0.004), tmp_path / "a.osm")
+
+    boundary_box: BoundaryBox = BoundaryBox(0.0012, 0.0012, 0.0025, 0.0025)
+    wider: BoundaryBox = BoundaryBox(0.0011, 0.0011, 0.0029, 0.0029)
+    assert boundary_box.get_format() == wider.get_format()
+    path: Path = tmp_path / f"{boundary_box.get_format()}.osm"
+    downloader.get_osm(boundary_box, path)
+    downloader.get_osm(wider, path)
+
+    assert len(Handler.requests) == 1
+    expected: Path = tmp_path / "expected.osm"
+    expected.write_text(get_osm_text(BoundaryBox(0.001, 0.001, 0.003, 0.003)))
+    assert get_elements(path) == get_elements(expected)
+
+
+def test_cached_part(address: str, tmp_path: Path) -> None:
+    """Test that only the uncovered part is downloaded."""
+    downloader: Downloader = get_downloader(address)
+    downloader.get_osm(BoundaryBox(0.0, 0.0, 0.004, 0.004), tmp_path / "a.osm")
+    downloader.get_osm(
+        BoundaryBox(0.0, 0.005, 0.004, 0.008), tmp_path / "b.osm"
+    )
+
+    boundary_box: BoundaryBox = BoundaryBox(0.002, 0.002, 0.006, 0.006)
+    path: Path = tmp_path / "c.osm"
+    downloader.get_osm(boundary_box, path)
+
+    # Only the area not covered by the first two files is downloaded.
+    area: float = 0.0
+    for request in Handler.requests[2:]:
+        part: BoundaryBox = BoundaryBox.from_text(
+            parse_qs(urlparse(request).query)["bbox"][0]
+        )
+        area += (part.right - part.left) * (part.top - part.bottom)
+    assert math.isclose(area, 0.000010)
+    expected: Path = tmp_path / "expected.osm"
+    expected.write_text(get_osm_text(boundary_box))
+    assert get_elements(path) == get_elements(expected)
+
+
+def test_uncovered_parts() -> None:
+    """Test splitting of the area not covered by boundary boxes."""
+    parts: list[BoundaryBox] = get_uncovered_parts(
+        BoundaryBox(0.0, 0.0, 4.0, 4.0),
+        [BoundaryBox(1.0, 1.0, 2.0, 2.0), BoundaryBox(-1.0, -1.0, 5.0, 1.0)],
+    )
+    assert sum((x.right - x.left) * (x.top - x.bottom) for x in parts) == 11.0
+
+
+def test_split(address: str, tmp_path: Path) -> None:
+    """Test that boundary box with too many nodes is split into quadrants."""
+    Handler.node_limit = 30
+    downloader: Downloader = get_downloader(address)
+    boundary_box: BoundaryBox = BoundaryBox(0.0, 0.0, 0.004, 0.004)
+    path: Path = tmp_path / "a.osm"
+
+    downloader.get_osm(boundary_box, path)
+
+    # The whole box with 81 nodes and four quadrants with 25 nodes.
+    assert len(Handler.requests) == 5
+    expected: Path = tmp_path / "expected.osm"
+    expected.write_text(get_osm_text(boundary_box))
+    assert get_elements(path) == get_elements(expected)
+
+    # Known oversized box is split without trying.
+    downloader.get_osm(boundary_box, path, to_update=True)
+    assert len(Handler.requests) == 9
+    assert get_elements(path) == get_elements(expected)
+
+
+def test_split_limit(address: str, tmp_path: Path) -> None:
+    """Test that too small boundary boxes are not split."""
+    Handler.node_limit = 0
+    downloader: Downloader = get_downloader(address)
+
+    with pytest.raises(NetworkError):
+        downloader.get_osm(
+            BoundaryBox(0.0, 0.0, 0.004, 0.004), tmp_path / "a.osm"
+        )
+
+
+def test_cache_manager(address: str, tmp_path: Path) -> None:
+    """Test that downloads are reported to the cache manager."""
+    downloader: Downloader = get_downloader(address)
+    cache_manager: CacheManager = CacheManager(tmp_path)
+    boundary_box: BoundaryBox = BoundaryBox(0.0, 0.0, 0.004, 0.004)
+    path: Path = tmp_path / "a.osm"
+
+    downloader.get_osm(boundary_box, path, cache_manager=cache_manager)
+    downloader.get_osm(boundary_box, path, cache_manager=cache_manager)
+
+    assert cache_manager.statistics.misses == 1
+    assert cache_manager.statistics.hits == 1
+    assert "a.osm" in cache_manager.access_times
@@ -1,12 +1,26 @@
 """Test OSM XML parsing."""
+import pickle
+from pathlib import Path
+from xml.etree import ElementTree
+
 import numpy as np
+import pytest
 
+from map_machine.geometry.boundary_box import BoundaryBox
 from map_machine.osm.osm_reader import (
+    ChangeReport,
+    ElementChange,
+    FrozenTags,
+    MetadataMode,
+    NodeList,
+    NodeTable,
     OSMData,
     OSMNode,
     OSMRelation,
     OSMWay,
+    get_coordinates,
     parse_levels,
+    split_xml_file,
 )
 
 __author__ = "Sergey Vartanov"
@@ -104,6 +118,54 @@ def test_relation() -> None:
     assert relation.members[0].ref == 2
 
 
+def test_stream_parsing() -> None:
+    """Test that streaming parsing produces the same data as tree parsing."""
+    for path in Path("tests/data").glob("*.osm"):
+        streamed: OSMData = OSMData()
+        streamed.parse_osm_file(path)
+        parsed: OSMData = OSMData()
+        parsed.parse_osm(ElementTree.parse(path).getroot())
+
+        assert streamed.nodes == parsed.nodes
+        assert streamed.ways == parsed.ways
+        assert streamed.relations == parsed.relations
+        assert streamed.view_box == parsed.view_box
+        assert streamed.boundary_box == parsed.boundary_box
+        assert streamed.equator_length == parsed.equator_length
+        assert streamed.authors == parsed.authors
+        assert streamed.time == parsed.time
+
+
+def test_parallel_parsing() -> None:
+    """Test that parsing by chunks produces the same data as streaming."""
+    for path in Path("tests/data").glob("*.osm"):
+        ranges: list[tuple[int, int]] = split_xml_file(path, 8)
+        assert len(ranges) > 1
+        with path.open("rb") as input_file:
+            for offset, size in ranges:
+                input_file.seek(offset)
+                assert input_file.read(size).startswith(
+                    (b"<node", b"<way", b"<relation", b"<bounds", b"<object")
+                )
+
+        streamed: OSMData = OSMData()
+        streamed.parse_osm_file(path)
+        parsed: OSMData = OSMData()
+        parsed.parse_osm_file(path, workers=2)
+
+        assert parsed.nodes == streamed.nodes
+        assert np.array_equal(
+            parsed.node_table.coordinates, streamed.node_table.coordinates
+        )
+        assert parsed.ways == streamed.ways
+        assert parsed.relations == streamed.relations
+        assert parsed.view_box == streamed.view_box
+        assert parsed.boundary_box == streamed.boundary_box
+        assert parsed.equator_length == streamed.equator_length
+        assert parsed.authors == streamed.authors
+        assert parsed.time == streamed.time
+
+
 def test_parse_levels() -> None:
     """Test level parsing."""
     assert parse_levels("1") == [1]
@@ -118,3 +180,263 @@ def test_parse_levels_list() -> None:
     assert parse_levels("0;2") == [0, 2]
     assert parse_levels("0;2.5") == [0, 2.5]
     assert parse_levels("0;2,5") == [0, 2.5]
+
+
+def test_node_table() -> None:
+    """Test columnar node storage and node references in ways."""
+    osm_data: OSMData = OSMData()
+    osm_data.parse_osm_text(
+        """<?xml version="1.0"?>
+<osm>
+  <node id="1" lon="5" lat="10" />
+  <node id="2" lon="6" lat="11">
+    <tag k="key" v="value" />
+  </node>
+  <node id="3" lon="7" lat="12" />
+  <way id="4">
+    <nd ref="1" />
+    <nd ref="2" />
+    <nd ref="3" />
+    <nd ref="1" />
+  </way>
+</osm>"""
+    )
+    table: NodeTable = osm_data.node_table
+    assert np.array_equal(table.ids, [1, 2, 3])
+    assert np.allclose(table.coordinates, [[10, 5], [11, 6], [12, 7]])
+    assert list(table.tags.keys()) == [1]
+    assert np.array_equal(table.get_tagged_rows(), [1])
+
+    way: OSMWay = osm_data.ways[4]
+    assert isinstance(way.nodes, NodeList)
+    assert np.array_equal(way.nodes.rows, [0, 1, 2, 0])
+    assert np.allclose(get_coordinates(way.nodes)[1], [11, 6])
+    assert way.nodes[1] == osm_data.nodes[2]
+    assert way.nodes[1].tags == {"key": "value"}
+    assert [node.id_ for node in way.nodes[::-1]] == [1, 3, 2, 1]
+    assert way.is_cycle()
+
+
+def test_shared_tags() -> None:
+    """Test that identical tag sets are shared and strings are interned."""
+    osm_data: OSMData = OSMData()
+    osm_data.parse_osm_text(
+        """<?xml version="1.0"?>
+<osm>
+  <node id="1" lon="5" lat="10"><tag k="name" v="A" /></node>
+  <node id="2" lon="5" lat="10"><tag k="name" v="B" /></node>
+  <way id="3"><tag k="building" v="yes" /></way>
+  <way id="4"><tag k="building" v="yes" /></way>
+  <way id="5"><tag k="building" v="house" /></way>
+  <relation id="6"><tag k="building" v="yes" /></relation>
+</osm>"""
+    )
+    way_3: OSMWay = osm_data.ways[3]
+    way_4: OSMWay = osm_data.ways[4]
+    way_5: OSMWay = osm_data.ways[5]
+
+    assert way_3.tags == {"building": "yes"}
+    assert way_3.tags is way_4.tags
+    assert way_3.tags is osm_data.relations[6].tags
+    assert list(way_3.tags)[0] is list(way_5.tags)[0]
+    assert list(osm_data.nodes[1].tags)[0] is list(osm_data.nodes[2].tags)[0]
+    assert hash(way_3.tags) == hash(FrozenTags({"building": "yes"}))
+
+    with pytest.raises(TypeError):
+        way_3.tags["building"] = "house"
+    with pytest.raises(TypeError):
+        way_3.tags.update(building="house")
+    assert way_3.tags == {"building": "yes"}
+
+    assert pickle.loads(pickle.dumps(way_3.tags)) == way_3.tags
+
+    # Tags of elements added directly are shared too.
+    osm_data.add_way(OSMWay({"building": "yes"}, 7))
+    assert osm_data.ways[7].tags is way_3.tags
+
+
+METADATA_TEXT: str = """<?xml version="1.0"?>
+<osm>
+  <node id="1" lon="5" lat="10" user="A" timestamp="2000-01-01T00:00:00Z" />
+  <node id="2" lon="5" lat="10" user="B" timestamp="2002-01-01T00:00:00Z" />
+  <way id="3" user="C" changeset="4" timestamp="2001-01-01T00:00:00Z">
+    <nd ref="1" />
+  </way>
+</osm>"""
+
+
+def test_metadata() -> None:
+    """Test that authors and time are computed from element metadata."""
+    osm_data: OSMData = OSMData()
+    osm_data.parse_osm_text(METADATA_TEXT)
+
+    assert osm_data.authors == {"A", "B", "C"}
+    assert osm_data.time.min_.year == 2000
+    assert osm_data.time.max_.year == 2002
+    assert osm_data.ways[3].changeset == "4"
+
+    osm_data.add_node(OSMNode({}, 5, np.array((10.0, 5.0)), user="D"))
+    assert osm_data.authors == {"A", "B", "C", "D"}
+
+
+def test_skip_metadata() -> None:
+    """Test parsing without element metadata."""
+    osm_data: OSMData = OSMData(MetadataMode.SKIP)
+    osm_data.parse_osm_text(METADATA_TEXT)
+
+    assert osm_data.nodes[1].user is None
+    assert osm_data.nodes[1].timestamp is None
+    assert osm_data.ways[3].changeset is None
+    assert not osm_data.authors
+    assert osm_data.time.min_ is None
+
+
+FILTER_TEXT: str = """<?xml version="1.0"?>
+<osm>
+  <node id="1" lat="10.0" lon="20.0" />
+  <node id="2" lat="10.5" lon="20.5" />
+  <node id="3" lat="12.0" lon="22.0" />
+  <node id="4" lat="13.0" lon="23.0" />
+  <way id="5">
+    <nd ref="1" />
+    <nd ref="3" />
+  </way>
+  <way id="6">
+    <nd ref="3" />
+    <nd ref="4" />
+  </way>
+  <relation id="7">
+    <member type="way" ref="5" role="outer" />
+  </relation>
+  <relation id="8">
+    <member type="way" ref="6" role="outer" />
+  </relation>
+  <relation id="9">
+    <member type="relation" ref="7" role="" />
+  </relation>
+</osm>"""
+
+
+def test_parse_in_boundary_box(tmp_path: Path) -> None:
+    """Test that only elements inside the boundary box are parsed."""
+    path: Path = tmp_path / "map.osm"
+    with path.open("w", encoding="utf-8") as output_file:
+        output_file.write(FILTER_TEXT)
+
+    osm_data: OSMData = OSMData()
+    osm_data.parse_osm_file_in_box(path, BoundaryBox(19.9, 9.9, 20.9, 10.9))
+
+    # Node 3 is outside, but it is required by way 5.
+    assert set(osm_data.nodes) == {1, 2, 3}
+    assert list(osm_data.ways) == [5]
+    assert [x.id_ for x in osm_data.ways[5].nodes] == [1, 3]
+    assert set(osm_data.relations) == {7, 9}
+
+
+MULTIPOLYGON_TEXT: str = """<?xml version="1.0"?>
+<osm>
+  <node id="1" lat="10.0" lon="20.0" />
+  <node id="2" lat="10.0" lon="25.0" />
+  <node id="3" lat="15.0" lon="25.0" />
+  <node id="4" lat="15.0" lon="20.0" />
+  <node id="5" lat="17.0" lon="27.0" />
+  <way id="6">
+    <nd ref="1" />
+    <nd ref="2" />
+  </way>
+  <way id="7">
+    <nd ref="2" />
+    <nd ref="3" />
+    <nd ref="4" />
+  </way>
+  <way id="8">
+    <nd ref="4" />
+    <nd ref="1" />
+  </way>
+  <way id="9">
+    <nd ref="3" />
+    <nd ref="5" />
+  </way>
+  <relation id="10">
+    <member type="way" ref="6" role="outer" />
+    <member type="way" ref="7" role="outer" />
+    <member type="way" ref="8" role="outer" />
+    <tag k="type" v="multipolygon" />
+    <tag k="natural" v="water" />
+  </relation>
+</osm>"""
+
+
+def test_parse_multipolygon_in_boundary_box(tmp_path: Path) -> None:
+    """
+    Test that all member ways of multipolygon crossing the boundary box are
+    parsed with their nodes.
+    """
+    path: Path = tmp_path / "map.osm"
+    with path.open("w", encoding="utf-8") as output_file:
+        output_file.write(MULTIPOLYGON_TEXT)
+
+    osm_data: OSMData = OSMData()
+    osm_data.parse_osm_file_in_box(path, BoundaryBox(19.9, 9.9, 20.1, 10.1))
+
+    # Way 7 has no nodes inside the boundary box, but it is a part of the
+    # outer ring of relation 10.
+    assert set(osm_data.ways) == {6, 7, 8}
+    assert [x.id_ for x in osm_data.ways[7].nodes] == [2, 3, 4]
+    assert set(osm_data.nodes) == {1, 2, 3, 4}
+    assert set(osm_data.relations) == {10}
+
+
+CHANGE_TEXT: str = """<?xml version="1.0"?>
+<osmChange version="0.6">
+  <modify>
+    <node id="3" lat="12.5" lon="22.0">
+      <tag k="natural" v="tree" />
+    </node>
+  </modify>
+  <create>
+    <node id="10" lat="11.0" lon="21.0" />
+    <way id="11">
+      <nd ref="1" />
+      <nd ref="10" />
+    </way>
+  </create>
+  <delete>
+    <way id="6" />
+    <node id="4" />
+    <relation id="8" />
+  </delete>
+</osmChange>"""
+
+
+def test_apply_change(tmp_path: Path) -> None:
+    """Test applying osmChange file and reporting touched elements."""
+    osm_data: OSMData = OSMData()
+    osm_data.parse_osm_text(FILTER_TEXT)
+    path: Path = tmp_path / "change.osc"
+    with path.open("w", encoding="utf-8") as output_file:
+        output_file.write(CHANGE_TEXT)
+
+    report: ChangeReport = osm_data.apply_change(path)
+
+    assert np.array_equal(osm_data.nodes[3].coordinates, (12.5, 22.0))
+    assert osm_data.nodes[3].tags == {"natural": "tree"}
+    assert np.array_equal(osm_data.ways[5].nodes[1].coordinates, (12.5, 22.0))
+    assert 4 not in osm_data.nodes
+    assert set(osm_data.ways) == {5, 11}
+    assert [x.id_ for x in osm_data.ways[11].nodes] == [1, 10]
+    assert set(osm_data.relations) == {7, 9}
+
+    # Way 5 is not in the file, but its node is moved.
+    assert report.get_ids("node") == {3, 4, 10}
+    assert report.get_ids("way") == {5, 6, 11}
+    assert report.get_ids("relation") == {8}
+    way_change: ElementChange = report.changes[("way", 5)]
+    assert way_change.old_boundary_box == BoundaryBox(20.0, 10.0, 22.0, 12.0)
+    assert way_change.new_boundary_box == BoundaryBox(20.0, 10.0, 22.0, 12.5)
+    assert report.changes[("node", 10)].old_boundary_box is None
+    assert report.changes[("way", 6)].new_boundary_box is None
+    assert report.changes[("relation", 8)].old_boundary_box == BoundaryBox(
+        22.0, 12.0, 23.0, 13.0
+    )
+    assert report.get_boundary_box() == BoundaryBox(20.0, 10.0, 23.0, 13.0)
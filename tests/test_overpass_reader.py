@@ -0,0 +1,86 @@
+"""Test Overpass JSON parsing."""
+import io
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from map_machine.osm.compression import Compression, compress
+from map_machine.osm.osm_reader import OSMData
+from map_machine.osm.overpass_reader import (
+    OverpassFormatException,
+    iterate_elements,
+)
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+STRUCTURE: dict = {
+    "version": 0.6,
+    "generator": "Overpass API",
+    "osm3s": {"copyright": "OpenStreetMap contributors"},
+    "elements": [
+        {"type": "way", "id": 3, "nodes": [1, 2], "tags": {"highway": "path"}},
+        {"type": "relation", "id": 4, "members": [
+            {"type": "way", "ref": 3, "role": "outer"},
+        ], "tags": {"type": "multipolygon"}},
+        {"type": "node", "id": 1, "lat": 10.0, "lon": 20.0},
+        {"type": "node", "id": 2, "lat": 10.5, "lon": 20.25,
+         "tags": {"name": 'Ä " ]}'}},
+        {"type": "way", "id": 5, "nodes": [2, 1]},
+    ],
+    "remark": 1234567,
+}  # fmt: skip
+
+
+def test_iterate_elements() -> None:
+    """Test decoding elements with chunks smaller than one element."""
+    text: str = json.dumps(STRUCTURE, indent=1, ensure_ascii=False)
+    for chunk_size in 1, 7, 1000:
+        elements: list[dict] = list(
+            iterate_elements(io.StringIO(text), chunk_size)
+        )
+        assert elements == STRUCTURE["elements"]
+
+
+def test_iterate_empty() -> None:
+    """Test documents without elements."""
+    assert not list(iterate_elements(io.StringIO("{}")))
+    assert not list(iterate_elements(io.StringIO('{"elements": [ ]}')))
+
+
+def test_iterate_malformed() -> None:
+    """Test that malformed document raises exception."""
+    with pytest.raises(OverpassFormatException):
+        list(iterate_elements(io.StringIO('{"elements": [{"id": 1}')))
+    with pytest.raises(OverpassFormatException):
+        list(iterate_elements(io.StringIO("[]")))
+
+
+@pytest.mark.parametrize("compression", list(Compression))
+def test_parse_overpass(tmp_path: Path, compression: Compression) -> None:
+    """Test parsing with ways preceding their nodes."""
+    path: Path = tmp_path / f"map.json{compression.suffix}"
+    content: bytes = json.dumps(STRUCTURE).encode("utf-8")
+    with path.open("wb") as output_file:
+        output_file.write(compress(content, compression))
+
+    osm_data: OSMData = OSMData()
+    osm_data.parse_file(path)
+
+    assert list(osm_data.ways) == [3, 5]
+    assert [x.id_ for x in osm_data.ways[3].nodes] == [1, 2]
+    assert [x.id_ for x in osm_data.ways[5].nodes] == [2, 1]
+    assert osm_data.ways[3].tags == {"highway": "path"}
+    assert osm_data.relations[4].members[0].ref == 3
+    assert osm_data.nodes[2].tags == {"name": 'Ä " ]}'}
+    assert np.allclose(
+        (
+            osm_data.view_box.left,
+            osm_data.view_box.bottom,
+            osm_data.view_box.right,
+            osm_data.view_box.top,
+        ),
+        (20.0, 10.0, 20.25, 10.5),
+    )
@@ -0,0 +1,208 @@
+"""Test OSM PBF parsing."""
+import struct
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from map_machine.geometry.boundary_box import BoundaryBox
+from map_machine.osm.osm_reader import OSMData
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+XML_DATA: str = """<?xml version="1.0"?>
+<osm>
+  <bounds minlat="10" minlon="5" maxlat="10.01" maxlon="5.01" />
+  <node id="1" lat="10" lon="5" user="Temp" uid="1" changeset="3" />
+  <node id="2" lat="10.001" lon="5.002">
+    <tag k="natural" v="tree" />
+  </node>
+  <node id="3" lat="10.2" lon="5.2" />
+  <node id="4" lat="10.3" lon="5.3" />
+  <way id="5">
+    <nd ref="1" />
+    <nd ref="2" />
+    <nd ref="3" />
+    <tag k="highway" v="footway" />
+  </way>
+  <way id="6">
+    <nd ref="3" />
+    <nd ref="4" />
+  </way>
+  <relation id="7">
+    <member type="way" ref="5" role="outer" />
+    <tag k="type" v="multipolygon" />
+  </relation>
+</osm>"""
+
+
+def encode_varint(value: int) -> bytes:
+    """Encode unsigned varint."""
+    result: bytearray = bytearray()
+    while value >= 0x80:
+        result.append(value & 0x7F | 0x80)
+        value >>= 7
+    result.append(value)
+    return bytes(result)
+
+
+def encode_zigzag(value: int) -> int:
+    """Encode signed integer with ZigZag."""
+    return (value << 1) ^ (value >> 63)
+
+
+def encode_field(field_number: int, value) -> bytes:
+    """Encode varint or length-delimited field."""
+    if isinstance(value, int):
+        return encode_varint(field_number << 3) + encode_varint(value)
+    return (
+        encode_varint(field_number << 3 | 2) + encode_varint(len(value)) + value
+    )
+
+
+def encode_packed(values: list[int], signed: bool = False) -> bytes:
+    """Encode packed repeated varints."""
+    return b"".join(
+        encode_varint(encode_zigzag(x) if signed else x) for x in values
+    )
+
+
+def encode_delta(values: list[int]) -> bytes:
+    """Encode packed delta-coded signed varints."""
+    return encode_packed(
+        [y - x for x, y in zip([0] + values[:-1], values)], signed=True
+    )
+
+
+def encode_blob(blob_type: str, data: bytes) -> bytes:
+    """Encode zlib-compressed blob with its header."""
+    blob: bytes = encode_field(2, len(data)) + encode_field(
+        3, zlib.compress(data)
+    )
+    header: bytes = encode_field(1, blob_type.encode()) + encode_field(
+        3, len(blob)
+    )
+    return struct.pack(">I", len(header)) + header + blob
+
+
+def write_pbf_file(path: Path, member_ways: tuple[int, ...] = (5,)) -> None:
+    """
+    Write PBF file with the same content as `XML_DATA`.
+
+    :param path: output file path
+    :param member_ways: identifiers of member ways of relation 7
+    """
+    strings: list[str] = [
+        "", "natural", "tree", "highway", "footway", "type",
+        "multipolygon", "outer", "Temp",
+    ]  # fmt: skip
+    string_table: bytes = b"".join(encode_field(1, x.encode()) for x in strings)
+
+    box: bytes = b"".join(
+        encode_field(number, encode_zigzag(int(value * 1e9)))
+        for number, value in ((1, 5), (2, 5.01), (3, 10.01), (4, 10))
+    )
+    header: bytes = encode_field(1, box) + encode_field(4, b"OsmSchema-V0.6")
+    dense_info: bytes = (
+        encode_field(3, encode_delta([3, 0, 0, 0]))
+        + encode_field(4, encode_delta([1, 0, 0, 0]))
+        + encode_field(5, encode_delta([8, 0, 0, 0]))
+    )
+    # Coordinates in units of 100 nanodegrees.
+    latitudes: list[int] = [100_000_000, 100_010_000, 102_000_000, 103_000_000]
+    longitudes: list[int] = [50_000_000, 50_020_000, 52_000_000, 53_000_000]
+    dense: bytes = (
+        encode_field(1, encode_delta([1, 2, 3, 4]))
+        + encode_field(5, dense_info)
+        + encode_field(8, encode_delta(latitudes))
+        + encode_field(9, encode_delta(longitudes))
+        + encode_field(10, encode_packed([0, 1, 2, 0, 0, 0]))
+    )
+    ways: bytes = encode_field(
+        3,
+        encode_field(1, 5)
+        + encode_field(2, encode_packed([3]))
+        + encode_field(3, encode_packed([4]))
+        + encode_field(8, encode_delta([1, 2, 3])),
+    ) + encode_field(
+        3, encode_field(1, 6) + encode_field(8, encode_delta([3, 4]))
+    )
+    relation: bytes = encode_field(
+        4,
+        encode_field(1, 7)
+        + encode_field(2, encode_packed([5]))
+        + encode_field(3, encode_packed([6]))
+        + encode_field(8, encode_packed([7] * len(member_ways)))
+        + encode_field(9, encode_delta(list(member_ways)))
+        + encode_field(10, encode_packed([1] * len(member_ways))),
+    )
+    block: bytes = (
+        encode_field(1, string_table)
+        + encode_field(2, encode_field(2, dense))
+        + encode_field(2, ways)
+        + encode_field(2, relation)
+    )
+    with path.open("wb") as output_file:
+        output_file.write(encode_blob("OSMHeader", header))
+        output_file.write(encode_blob("OSMData", block))
+
+
+def test_pbf(tmp_path: Path) -> None:
+    """Test that PBF parsing produces the same data as XML parsing."""
+    path: Path = tmp_path / "test.osm.pbf"
+    write_pbf_file(path)
+
+    pbf_data: OSMData = OSMData()
+    pbf_data.parse_file(path)
+    xml_data: OSMData = OSMData()
+    xml_data.parse_osm_text(XML_DATA)
+
+    assert list(pbf_data.nodes) == list(xml_data.nodes)
+    assert np.allclose(
+        pbf_data.node_table.coordinates, xml_data.node_table.coordinates
+    )
+    assert pbf_data.nodes[2].tags == {"natural": "tree"}
+    assert pbf_data.nodes[1].user == "Temp"
+    assert pbf_data.nodes[1].changeset == "3"
+    assert pbf_data.authors == xml_data.authors
+    assert [x.id_ for x in pbf_data.ways[5].nodes] == [1, 2, 3]
+    assert pbf_data.ways[5].tags == {"highway": "footway"}
+    assert pbf_data.relations == xml_data.relations
+    assert np.allclose(
+        [pbf_data.view_box.left, pbf_data.view_box.top], [5, 10.01]
+    )
+
+
+def test_pbf_boundary_box(tmp_path: Path) -> None:
+    """Test filtering PBF data by boundary box while decoding."""
+    path: Path = tmp_path / "test.osm.pbf"
+    write_pbf_file(path)
+
+    osm_data: OSMData = OSMData()
+    osm_data.parse_pbf_file(path, BoundaryBox(4.9, 9.9, 5.1, 10.1), workers=1)
+
+    # Node 3 is outside the boundary box, but it is required for the complete
+    # geometry of way 5.  Node 4 and way 6 are outside.
+    assert sorted(osm_data.nodes) == [1, 2, 3]
+    assert list(osm_data.ways) == [5]
+    assert list(osm_data.relations) == [7]
+
+
+def test_pbf_boundary_box_multipolygon(tmp_path: Path) -> None:
+    """
+    Test that all member ways of multipolygon crossing the boundary box are
+    kept with their nodes.
+    """
+    path: Path = tmp_path / "test.osm.pbf"
+    write_pbf_file(path, (5, 6))
+
+    osm_data: OSMData = OSMData()
+    osm_data.parse_pbf_file(path, BoundaryBox(4.9, 9.9, 5.1, 10.1), workers=1)
+
+    # Way 6 has no nodes inside the boundary box, but it is a part of the
+    # outer ring of relation 7.
+    assert sorted(osm_data.nodes) == [1, 2, 3, 4]
+    assert sorted(osm_data.ways) == [5, 6]
+    assert [x.id_ for x in osm_data.ways[6].nodes] == [3, 4]
+    assert list(osm_data.relations) == [7]
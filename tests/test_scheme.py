@@ -1,7 +1,7 @@
 """Test scheme parsing."""
 from typing import Any
 
-from map_machine.scheme import Scheme
+from map_machine.scheme import MemoStatistics, Scheme, TagMemo
 
 
 def test_verification_right() -> None:
@@ -22,3 +22,36 @@ def test_verification_wrong() -> None:
         "node_icons": [{"tags": [{"tags": {"a": 0}}]}],
     }
     assert Scheme(tags).node_matchers[0].verify() is False
+
+
+def test_way_memo() -> None:
+    """Test that way classification is memoized by tags."""
+    scheme: Scheme = Scheme(
+        {
+            "colors": {"default": "#444444"},
+            "ways": [
+                {"tags": {"natural": "wood"}, "style": {"fill": "#00FF00"}}
+            ],
+            "area_tags": [{"tags": {"natural": "*"}}],
+        }
+    )
+
+    assert scheme.is_area({"natural": "wood", "name": "A"})
+    assert scheme.is_area({"name": "A", "natural": "wood"})
+    assert not scheme.is_area({"highway": "path"})
+    assert len(scheme.get_style({"natural": "wood"})) == 1
+    assert scheme.get_road({"natural": "wood"}) is None
+
+    statistics: dict[str, MemoStatistics] = scheme.get_memo_statistics()
+    assert statistics["area"] == MemoStatistics(hits=1, misses=2)
+    assert statistics["style"] == MemoStatistics(misses=1)
+
+
+def test_tag_memo_eviction() -> None:
+    """Test that least recently used values are dropped."""
+    memo: TagMemo = TagMemo(2)
+    for value in "a", "b", "a", "c", "a", "b":
+        memo.get({"key": value}, lambda x: x["key"])
+
+    assert memo.statistics == MemoStatistics(hits=2, misses=4, evictions=2)
+    assert [x["key"] for x in memo.values] == ["a", "b"]
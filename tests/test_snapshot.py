@@ -0,0 +1,129 @@
+"""Test binary snapshots of parsed OSM data."""
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from map_machine.osm.osm_reader import MetadataMode, OSMData, OSMNode
+from map_machine.osm.snapshot import (
+    get_snapshot_path,
+    read_osm_data,
+    read_snapshot,
+    write_snapshot,
+)
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+OSM_TEXT: str = """<?xml version="1.0"?>
+<osm>
+  <bounds minlat="10" minlon="20" maxlat="10.01" maxlon="20.01" />
+  <node id="1" lat="10" lon="20" user="Temp" timestamp="2000-01-01T00:00:00Z">
+    <tag k="natural" v="tree" />
+  </node>
+  <node id="2" lat="10.001" lon="20.001" timestamp="2001-01-01T00:00:00Z" />
+  <node id="3" lat="10.002" lon="20" timestamp="2002-01-01T00:00:00Z" />
+  <way id="4">
+    <nd ref="1" />
+    <nd ref="2" />
+    <nd ref="3" />
+    <nd ref="1" />
+    <tag k="building" v="yes" />
+  </way>
+  <way id="5" />
+  <relation id="6">
+    <member type="way" ref="4" role="outer" />
+    <tag k="type" v="multipolygon" />
+  </relation>
+</osm>"""
+
+
+def write_osm_file(path: Path) -> Path:
+    """Write test OSM XML file."""
+    with path.open("w", encoding="utf-8") as output_file:
+        output_file.write(OSM_TEXT)
+    return path
+
+
+def test_snapshot(tmp_path: Path) -> None:
+    """Test that data read from snapshot is the same as parsed data."""
+    path: Path = write_osm_file(tmp_path / "map.osm")
+    osm_data: OSMData = OSMData()
+    osm_data.parse_osm_file(path)
+    write_snapshot(osm_data, path)
+
+    snapshot: OSMData = read_snapshot(path)
+
+    assert snapshot is not None
+    assert dict(snapshot.nodes) == dict(osm_data.nodes)
+    assert np.array_equal(
+        snapshot.node_table.coordinates, osm_data.node_table.coordinates
+    )
+    assert snapshot.ways == osm_data.ways
+    assert snapshot.ways[4].is_cycle()
+    assert snapshot.relations == osm_data.relations
+    assert snapshot.authors == {"Temp"}
+    assert snapshot.time == osm_data.time
+    assert snapshot.view_box == osm_data.view_box
+    assert snapshot.boundary_box == osm_data.boundary_box
+
+    # Memory-mapped node table should grow on adding new nodes.
+    snapshot.add_node(
+        OSMNode({}, 7, np.array((1.0, 2.0)), timestamp=osm_data.time.max_)
+    )
+    assert np.array_equal(snapshot.nodes[7].coordinates, (1, 2))
+    assert snapshot.nodes[2] == osm_data.nodes[2]
+
+
+def test_snapshot_invalidation(tmp_path: Path) -> None:
+    """Test that snapshot is not used after the source file is changed."""
+    path: Path = write_osm_file(tmp_path / "map.osm")
+
+    read_osm_data(path)
+    assert get_snapshot_path(path).is_file()
+    assert read_snapshot(path) is not None
+
+    with path.open("a", encoding="utf-8") as output_file:
+        output_file.write("\n")
+    assert read_snapshot(path) is None
+
+    # Source file with the same size and content, but different modification
+    # time.
+    read_osm_data(path)
+    status: os.stat_result = path.stat()
+    os.utime(path, ns=(status.st_atime_ns, status.st_mtime_ns + 1_000_000))
+    assert read_snapshot(path) is None
+
+    # Snapshot of another file.
+    other_path: Path = tmp_path / "other.osm"
+    shutil.copy(path, other_path)
+    shutil.copy(get_snapshot_path(path), get_snapshot_path(other_path))
+    assert read_snapshot(other_path) is None
+
+    assert read_osm_data(path).ways.keys() == {4, 5}
+    assert read_snapshot(path) is not None
+
+
+def test_corrupted_snapshot(tmp_path: Path) -> None:
+    """Test that corrupted snapshot is ignored."""
+    path: Path = write_osm_file(tmp_path / "map.osm")
+    with get_snapshot_path(path).open("wb") as output_file:
+        output_file.write(b"corrupted")
+
+    assert read_snapshot(path) is None
+    assert len(read_osm_data(path).nodes) == 3
+
+
+def test_snapshot_metadata_mode(tmp_path: Path) -> None:
+    """Test that snapshot without metadata is not used if it is required."""
+    path: Path = write_osm_file(tmp_path / "map.osm")
+
+    assert not read_osm_data(path, MetadataMode.SKIP).authors
+    assert read_snapshot(path, metadata_mode=MetadataMode.SKIP) is not None
+    assert read_snapshot(path, metadata_mode=MetadataMode.FULL) is None
+
+    assert read_osm_data(path, MetadataMode.FULL).authors == {"Temp"}
+    snapshot: OSMData = read_snapshot(path, metadata_mode=MetadataMode.SKIP)
+    assert snapshot.metadata_mode == MetadataMode.FULL
+    assert snapshot.authors == {"Temp"}
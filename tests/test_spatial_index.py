@@ -0,0 +1,131 @@
+"""Test spatial index over OpenStreetMap data."""
+import numpy as np
+import pytest
+
+from map_machine.geometry.boundary_box import BoundaryBox
+from map_machine.osm import spatial_index
+from map_machine.osm.osm_reader import (
+    NodeList,
+    OSMData,
+    OSMMember,
+    OSMNode,
+    OSMRelation,
+    OSMWay,
+)
+from map_machine.osm.spatial_index import QueryResult, SpatialIndex, scan
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+SIZE: int = 40
+
+
+def get_osm_data() -> OSMData:
+    """
+    Create grid of nodes with short ways, one long diagonal way, and
+    relations.
+    """
+    osm_data: OSMData = OSMData()
+    for i in range(SIZE):
+        for j in range(SIZE):
+            osm_data.add_node(
+                OSMNode({}, i * SIZE + j, np.array((i * 0.001, j * 0.001)))
+            )
+    table = osm_data.node_table
+    for i in range(SIZE - 1):
+        for j in range(0, SIZE - 1, 3):
+            ids: list[int] = [i * SIZE + j, (i + 1) * SIZE + j + 1]
+            osm_data.add_way(
+                OSMWay(
+                    {}, len(osm_data.ways), NodeList(table, table.get_rows(ids))
+                )
+            )
+    diagonal: list[int] = [i * SIZE + i for i in range(SIZE)]
+    osm_data.add_way(
+        OSMWay({}, 10_000, NodeList(table, table.get_rows(diagonal)))
+    )
+    osm_data.add_way(OSMWay({}, 10_001))
+    osm_data.add_relation(OSMRelation({}, 1, [OSMMember("way", 0, "outer")]))
+    osm_data.add_relation(
+        OSMRelation({}, 2, [OSMMember("node", SIZE * SIZE - 1, "")])
+    )
+    return osm_data
+
+
+def query(osm_data: OSMData, boundary_box: BoundaryBox) -> QueryResult:
+    """Find elements intersecting the boundary box by checking all of them."""
+    coordinates: np.ndarray = osm_data.node_table.coordinates
+    node_rows: np.ndarray = np.flatnonzero(
+        (coordinates[:, 0] >= boundary_box.bottom)
+        & (coordinates[:, 0] <= boundary_box.top)
+        & (coordinates[:, 1] >= boundary_box.left)
+        & (coordinates[:, 1] <= boundary_box.right)
+    )
+
+    def intersects(type_: str, id_: int) -> bool:
+        box = osm_data.get_element_boundary_box(type_, id_)
+        return (
+            box is not None
+            and box.left <= boundary_box.right
+            and box.right >= boundary_box.left
+            and box.bottom <= boundary_box.top
+            and box.top >= boundary_box.bottom
+        )
+
+    return QueryResult(
+        node_rows,
+        [x for x in osm_data.ways if intersects("way", x)],
+        [x for x in osm_data.relations if intersects("relation", x)],
+    )
+
+
+@pytest.mark.parametrize("max_way_cells", [1, 256])
+def test_query(monkeypatch: pytest.MonkeyPatch, max_way_cells: int) -> None:
+    """Test that query results are the same as checking all elements."""
+    monkeypatch.setattr(spatial_index, "MAX_WAY_CELLS", max_way_cells)
+    osm_data: OSMData = get_osm_data()
+    index: SpatialIndex = SpatialIndex(osm_data)
+
+    random: np.random.Generator = np.random.default_rng(0)
+    for _ in range(100):
+        latitude, longitude = random.uniform(-0.005, 0.04, 2)
+        height, width = random.uniform(0.0, 0.02, 2)
+        boundary_box: BoundaryBox = BoundaryBox(
+            longitude, latitude, longitude + width, latitude + height
+        )
+        result: QueryResult = index.query(boundary_box)
+        expected: QueryResult = query(osm_data, boundary_box)
+
+        assert np.array_equal(result.node_rows, expected.node_rows)
+        assert result.way_ids == expected.way_ids
+        assert result.relation_ids == expected.relation_ids
+
+
+def test_scan() -> None:
+    """Test that scan results are the same as index query results."""
+    osm_data: OSMData = get_osm_data()
+    index: SpatialIndex = SpatialIndex(osm_data)
+
+    for boundary_box in (
+        BoundaryBox(0.005, 0.005, 0.015, 0.012),
+        BoundaryBox(0.0, 0.0, 0.001, 0.001),
+        BoundaryBox(1.0, 1.0, 2.0, 2.0),
+    ):
+        result: QueryResult = scan(osm_data, boundary_box)
+        expected: QueryResult = index.query(boundary_box)
+
+        assert np.array_equal(result.node_rows, expected.node_rows)
+        assert result.way_ids == expected.way_ids
+        assert result.relation_ids == expected.relation_ids
+
+
+def test_empty_query() -> None:
+    """Test query outside the data and index over empty data."""
+    index: SpatialIndex = SpatialIndex(get_osm_data())
+    result: QueryResult = index.query(BoundaryBox(1.0, 1.0, 2.0, 2.0))
+    assert not len(result.node_rows)
+    assert not result.way_ids
+    assert not result.relation_ids
+
+    result = SpatialIndex(OSMData()).query(BoundaryBox(0.0, 0.0, 1.0, 1.0))
+    assert not len(result.node_rows)
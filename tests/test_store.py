@@ -0,0 +1,126 @@
+"""Test local store of OpenStreetMap data."""
+from pathlib import Path
+
+import numpy as np
+
+from map_machine.geometry.boundary_box import BoundaryBox
+from map_machine.osm import store as store_module
+from map_machine.osm.osm_reader import MetadataMode, OSMData
+from map_machine.osm.store import OSMStore
+
+__author__ = "Sergey Vartanov"
+__email__ = "me@enzet.ru"
+
+OSM_TEXT: str = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+ <bounds minlat="0" minlon="0" maxlat="1" maxlon="1"/>
+ <node id="1" lat="0.1" lon="0.1" user="Temp" timestamp="2000-01-01T00:00:00Z">
+  <tag k="amenity" v="bench"/>
+ </node>
+ <node id="2" lat="0.1" lon="0.2"/>
+ <node id="3" lat="0.2" lon="0.2"/>
+ <node id="4" lat="0.8" lon="0.8">
+  <tag k="natural" v="tree"/>
+ </node>
+ <node id="5" lat="0.9" lon="0.9"/>
+ <way id="10" user="Temp" timestamp="2001-01-01T00:00:00Z">
+  <nd ref="2"/>
+  <nd ref="3"/>
+  <nd ref="5"/>
+  <tag k="highway" v="path"/>
+ </way>
+ <way id="11">
+  <nd ref="4"/>
+  <nd ref="5"/>
+  <tag k="barrier" v="fence"/>
+ </way>
+ <relation id="20">
+  <member type="way" ref="11" role="outer"/>
+  <tag k="type" v="multipolygon"/>
+ </relation>
+</osm>
+"""
+
+
+def create_store(tmp_path: Path) -> OSMStore:
+    """Import test file into a new store."""
+    path: Path = tmp_path / "map.osm"
+    path.write_text(OSM_TEXT, encoding="utf-8")
+    store: OSMStore = OSMStore(tmp_path / "map.db")
+    store.import_file(path)
+    return store
+
+
+def test_whole_map(tmp_path: Path) -> None:
+    """Test that the whole map is read back unchanged."""
+    path: Path = tmp_path / "map.osm"
+    path.write_text(OSM_TEXT, encoding="utf-8")
+    osm_data: OSMData = OSMData()
+    osm_data.parse_osm_file(path)
+
+    with create_store(tmp_path) as store:
+        result: OSMData = store.get_osm_data(BoundaryBox(0, 0, 1, 1))
+
+    assert list(result.nodes) == list(osm_data.nodes)
+    for id_, node in osm_data.nodes.items():
+        assert result.nodes[id_] == node
+        assert result.nodes[id_].tags == node.tags
+    assert result.ways == osm_data.ways
+    assert result.relations == osm_data.relations
+    assert result.authors == {"Temp"}
+
+
+def test_boundary_box(tmp_path: Path) -> None:
+    """Test that only elements intersecting the boundary box are read."""
+    with create_store(tmp_path) as store:
+        result: OSMData = store.get_osm_data(BoundaryBox(0.05, 0.05, 0.3, 0.3))
+
+    assert list(result.ways) == [10]
+    assert not result.relations
+    # Tagged node inside the box and all nodes of the way.
+    assert sorted(result.nodes) == [1, 2, 3, 5]
+    assert np.allclose(
+        result.ways[10].nodes.coordinates,
+        ((0.1, 0.2), (0.2, 0.2), (0.9, 0.9)),
+    )
+    assert result.view_box.left == 0.05
+
+
+def test_relation(tmp_path: Path) -> None:
+    """Test that relations are found by the boundary box of members."""
+    with create_store(tmp_path) as store:
+        result: OSMData = store.get_osm_data(
+            BoundaryBox(0.85, 0.85, 0.95, 0.95), MetadataMode.SKIP
+        )
+
+    assert sorted(result.ways) == [10, 11]
+    assert list(result.relations) == [20]
+    assert not result.authors
+
+
+def test_covers(tmp_path: Path) -> None:
+    """Test that imported areas are recorded."""
+    with create_store(tmp_path) as store:
+        assert store.covers(BoundaryBox(0.1, 0.1, 0.9, 0.9))
+        assert not store.covers(BoundaryBox(0.5, 0.5, 1.5, 1.5))
+
+
+def test_concurrent_readers(tmp_path: Path) -> None:
+    """Test that read-only connections see imported data."""
+    with create_store(tmp_path) as store:
+        with OSMStore(tmp_path / "map.db", read_only=True) as reader:
+            result: OSMData = reader.get_osm_data(BoundaryBox(0, 0, 1, 1))
+            assert len(result.ways) == 2
+            assert len(store.get_osm_data(BoundaryBox(0, 0, 1, 1)).nodes) == 5
+
+
+def test_batches(tmp_path: Path, monkeypatch) -> None:
+    """Test import and query with batches smaller than the data."""
+    monkeypatch.setattr(store_module, "BATCH_SIZE", 2)
+    monkeypatch.setattr(store_module, "QUERY_SIZE", 2)
+
+    with create_store(tmp_path) as store:
+        result: OSMData = store.get_osm_data(BoundaryBox(0, 0, 1, 1))
+
+    assert len(result.nodes) == 5
+    assert len(result.ways) == 2
@@ -6,12 +6,18 @@ expected figures in the expected order.
 """
 import numpy as np
 
-from map_machine.constructor import Constructor
+from map_machine.constructor import Constructor, glue
 from map_machine.figure import Figure
 from map_machine.geometry.boundary_box import BoundaryBox
 from map_machine.geometry.flinger import MercatorFlinger
 from map_machine.map_configuration import MapConfiguration
-from map_machine.osm.osm_reader import OSMData, OSMWay, OSMNode, Tags
+from map_machine.osm.osm_reader import (
+    EARTH_EQUATOR_LENGTH,
+    OSMData,
+    OSMWay,
+    OSMNode,
+    Tags,
+)
 from tests import SCHEME, SHAPE_EXTRACTOR
 
 CONFIGURATION: MapConfiguration = MapConfiguration(SCHEME)
@@ -80,3 +86,88 @@ def test_empty_ways() -> None:
     osm_data.add_way(OSMWay({"waterway": "river"}, 2))
 
     assert not get_constructor(osm_data).get_sorted_figures()
+
+
+def test_clip() -> None:
+    """Ways outside the clip boundary box are not constructed."""
+    osm_data: OSMData = OSMData()
+    create_way(osm_data, {"natural": "wood"}, 1)
+    nodes: list[OSMNode] = [
+        OSMNode({}, 3, np.array((1.0, 1.0))),
+        OSMNode({}, 4, np.array((1.01, 1.01))),
+    ]
+    for node in nodes:
+        osm_data.add_node(node)
+    osm_data.add_way(OSMWay({"waterway": "river"}, 2, nodes))
+
+    figures: list[Figure] = get_constructor(osm_data).get_sorted_figures()
+
+    assert len(figures) == 1
+    assert figures[0].tags["natural"] == "wood"
+
+    flinger: MercatorFlinger = MercatorFlinger(
+        BoundaryBox(-0.01, -0.01, 0.01, 0.01), 18, osm_data.equator_length
+    )
+    constructor: Constructor = Constructor(
+        osm_data,
+        flinger,
+        SHAPE_EXTRACTOR,
+        CONFIGURATION,
+        clip_boundary_box=BoundaryBox(0.5, 0.5, 1.5, 1.5),
+    )
+    constructor.construct_ways()
+    figures = constructor.get_sorted_figures()
+
+    assert len(figures) == 1
+    assert figures[0].tags["waterway"] == "river"
+
+
+def test_clip_tile_border() -> None:
+    """
+    Points outside the tile are constructed if their icons and labels may
+    reach into the tile, so that there are no seams between tiles.
+    """
+    flinger: MercatorFlinger = MercatorFlinger(
+        BoundaryBox(0.0, 0.0, 0.001, 0.001), 18, EARTH_EQUATOR_LENGTH
+    )
+    # Distance in degrees of 1 pixel near the tile.
+    pixel: float = 0.001 / flinger.size[0]
+
+    osm_data: OSMData = OSMData()
+    for id_, pixels in (1, 50.0), (2, 1000.0):
+        osm_data.add_node(
+            OSMNode(
+                {"natural": "tree"},
+                id_,
+                np.array((0.0005, 0.001 + pixels * pixel)),
+            )
+        )
+    constructor: Constructor = Constructor(
+        osm_data, flinger, SHAPE_EXTRACTOR, CONFIGURATION
+    )
+    constructor.construct_nodes()
+
+    assert len(constructor.points) == 1
+    assert constructor.points[0].point[0] > flinger.size[0] + 49.0
+
+
+def test_glue() -> None:
+    """Check that ways sharing endpoints are assembled into rings."""
+    nodes: list[OSMNode] = [
+        OSMNode({}, index, np.array((0.0, 0.0))) for index in range(6)
+    ]
+    ring: list[OSMNode] = nodes[:4] + [nodes[0]]
+    ways: list[OSMWay] = [
+        OSMWay({}, 1, ring[2:4]),
+        OSMWay({}, 2, list(reversed(ring[3:]))),
+        OSMWay({}, 3, ring[:3]),
+        OSMWay({}, 4, nodes[4:]),
+    ]
+
+    rings: list[list[OSMNode]] = glue(ways)
+
+    assert len(rings) == 2
+    closed: list[OSMNode] = next(x for x in rings if x[0] == x[-1])
+    assert len(closed) == 5
+    assert set(closed) == set(nodes[:4])
+    assert [x for x in rings if x is not closed] == [nodes[4:]]